@@ -0,0 +1,123 @@
+# bench_insert.py  –  mesure hors ligne de l'insertion save_results
+# ---------------------------------------------------
+# Compare, sur la base SQLite locale (shared_code.db) :
+#   • legacy : connexion par requête + un execute() par essai (ancien code)
+#   • bulk   : connexion de module + un executemany() par requête
+# Les deux modes tiennent dbo.resultats_agg (legacy : un execute() par
+# groupe) : même travail, seule la façon de l'envoyer diffère.
+# --rtt-ms simule la latence réseau d'Azure SQL : chaque aller-retour
+# (execute, executemany en fast_executemany, commit, connexion) attend
+# ce délai, ce qui donne l'ordre de grandeur du gain en production.
+#
+# Usage :  python api/bench_insert.py [--participants 200] [--rtt-ms 2]
+
+from __future__ import annotations
+import argparse, json, random, statistics, tempfile, time
+from contextlib import closing
+from pathlib import Path
+
+from shared_code import db
+
+N_TRIALS = 80
+
+
+def payload(pid: str, rng: random.Random) -> list:
+    """Résultats d'un participant, au format envoyé par voisins.js."""
+    return [{"word": f"MOT{i}", "rt_ms": rng.randint(250, 1500), "response": f"mot{i}",
+             "phase": "test", "participant": pid,
+             "groupe": rng.choice(("LOW_OLD", "HIGH_OLD", "LOW_PLD", "HIGH_PLD")),
+             "nblettres": rng.randint(4, 11)} for i in range(N_TRIALS)]
+
+
+class Slow:
+    """Connexion dont chaque aller-retour coûte `rtt` secondes."""
+
+    def __init__(self, cnx, rtt: float):
+        self.cnx, self.rtt = cnx, rtt
+        self.store = db.backend(cnx)
+        time.sleep(rtt)                                   # ouverture
+
+    def cursor(self):
+        return _SlowCursor(self.cnx.cursor(), self.rtt)
+
+    def commit(self):
+        time.sleep(self.rtt); self.cnx.commit()
+
+    def rollback(self):
+        self.cnx.rollback()
+
+    def close(self):
+        self.cnx.close()
+
+
+class _SlowCursor:
+    def __init__(self, cur, rtt):
+        self.cur, self.rtt = cur, rtt
+
+    def execute(self, sql, *args):
+        if not sql.startswith("BEGIN"):                   # implicite sur Azure SQL
+            time.sleep(self.rtt)
+        return self.cur.execute(sql, args)
+
+    def executemany(self, sql, rows):
+        time.sleep(self.rtt); return self.cur.executemany(sql, rows)
+
+    def close(self):
+        self.cur.close()
+
+
+def legacy(data: list, conn_str: str, rtt: float) -> None:
+    with closing(Slow(db.connect(conn_str), rtt)) as cnx:
+        cur = cnx.cursor()
+        for row in db.params(data):                       # un execute() par essai,
+            cur.execute(db.INSERT_SQL, *row)              # colonnes de INSERT_SQL
+        for agg in db.aggregates(data):                   # … puis par groupe
+            cur.execute(cnx.store.UPSERT_AGG, *agg)
+        cnx.commit()
+
+
+def run(participants: int, rtt_ms: float, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    loads = [payload(f"P{i:04d}", rng) for i in range(participants)]
+    rtt, out = rtt_ms / 1000, {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("legacy", "bulk"):
+            conn_str = f"{db.SQLITE}{Path(tmp) / mode}.db"
+            with closing(db.connect(conn_str)):           # schéma
+                pass
+            lat = []
+            tic = time.perf_counter()
+            if mode == "legacy":
+                for data in loads:
+                    t = time.perf_counter()
+                    legacy(data, conn_str, rtt)
+                    lat.append(time.perf_counter() - t)
+            else:
+                with closing(Slow(db.connect(conn_str), rtt)) as module_cnx:
+                    for data in loads:
+                        t = time.perf_counter()
+                        db.insert_results(data, module_cnx)
+                        lat.append(time.perf_counter() - t)
+            wall = time.perf_counter() - tic
+            with closing(db.connect(conn_str)) as cnx:
+                n, groups = (cnx.execute(f"SELECT COUNT(*) FROM dbo.{t}").fetchone()[0]
+                             for t in ("resultats", "resultats_agg"))
+            out[mode] = {"rows": n, "agg_rows": groups, "wall_s": round(wall, 3),
+                         "requests_per_s": round(participants / wall, 1),
+                         "p50_ms": round(statistics.median(lat) * 1e3, 2),
+                         "max_ms": round(max(lat) * 1e3, 2)}
+    out["speedup"] = round(out["legacy"]["wall_s"] / out["bulk"]["wall_s"], 1)
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Insertion save_results : ligne à ligne vs lot.")
+    ap.add_argument("--participants", type=int, default=200)
+    ap.add_argument("--rtt-ms", type=float, default=0.0,
+                    help="latence simulée par aller-retour SQL")
+    a = ap.parse_args()
+    print(json.dumps(run(a.participants, a.rtt_ms), indent=1))
+
+
+if __name__ == "__main__":
+    main()
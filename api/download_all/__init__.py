@@ -1,28 +1,59 @@
 # download_all  –  Azure Static Web App (Functions v1)
 # ---------------------------------------------------
-# Renvoie un fichier all_results.xlsx contenant :
+# Renvoie un fichier all_results.xlsx (défaut) contenant :
 #   • raw                : toutes les réponses (phase <> 'practice')
 #   • Stats_ByGroup      : stats RT par participant × groupe
 #   • Stats_ByLetters    : stats RT par participant × bloc de longueur
+#   • Stats_ByWord       : stats RT par mot
+#   • Stats_Timing       : télémétrie d'affichage par participant (essais
+#                          mesurés, avec image sautée, gigue maximale, durées
+#                          effectives moyennes de croix / mot / masque)
+# ?format=parquet | arrow | csv.gz : mêmes tables en colonnaire compressé
+# (zip d'un fichier par table, ou ?table=raw|Stats_ByGroup|… seule).
+# Brut rendu en flux depuis l'instantané incrémental de export_cache ;
+# stats recalculées sur ce même instantané.  ETag = rendu + MAX(id) :
+# If-None-Match identique → 304 sans relire la base.
+# Filtres (poussés dans le WHERE, index : store.OdbcStore.SCHEMA) :
+#   participant=P1,P2  groupe=G1,G2  from=2025-01-01  to=2025-02-01 (exclu)
+#   since_id=N  page_size=N [page=0,1,…]  (OFFSET / FETCH, trié par id)
+#   max_missed=N  max_jitter=MS  (exclut les essais mal présentés ; ceux
+#   sans télémétrie sont gardés)
+# Une réponse filtrée est lue en base (pas de cache) ; X-Next-Since-Id
+# donne le dernier id renvoyé pour la reprise par clé.
 
-import os, io
-import pandas as pd
-import pyodbc
+import hashlib, os
+from contextlib import closing
+from datetime import datetime
 import azure.functions as func
 
+from shared_code import db, export_cache, formats, timing
+
 # ---------- configuration ---------------------------------------------------
-SQL_CONN   = os.getenv("SQL_CONN")          # chaîne ODBC vers Azure SQL
 API_SECRET = os.getenv("API_SECRET")        # même secret que save_results
+PAGE_MAX   = 500_000                        # page_size maximal
 
-# ---------- bloc longueur ---------------------------------------------------
-def letters_block(n: int) -> str:
-    if n in (4, 5):
-        return "4_5"
-    if n in (6, 7):
-        return "6_7"
-    if n in (8, 9):
-        return "8_9"
-    return "10_11"                          # 10 ou 11 lettres
+# ---------- filtres ---------------------------------------------------------
+def _filters(params) -> tuple:
+    """(filtres pour db.where, taille de page ou None, numéro de page) ;
+    ValueError si un paramètre est invalide."""
+    f = {}
+    for key, name in (("participants", "participant"), ("groupes", "groupe")):
+        if params.get(name):
+            f[key] = [v.strip() for v in params[name].split(",") if v.strip()]
+    for key in ("from", "to"):
+        if params.get(key):
+            f[key] = datetime.fromisoformat(params[key]).isoformat(sep=" ")
+    if params.get("since_id"):
+        f["since_id"] = int(params["since_id"])
+    if params.get("max_missed"):
+        f["max_missed"] = int(params["max_missed"])
+    if params.get("max_jitter"):
+        f["max_jitter"] = float(params["max_jitter"])
+    size = int(params["page_size"]) if params.get("page_size") else None
+    number = int(params.get("page") or 0)
+    if size is not None and not 0 < size <= PAGE_MAX or number < 0:
+        raise ValueError(f"page_size dans [1, {PAGE_MAX}], page ≥ 0")
+    return f, size, number
 
 # ---------- helper CORS -----------------------------------------------------
 def _cors(code: int, body: str = "") -> func.HttpResponse:
@@ -31,7 +62,8 @@ def _cors(code: int, body: str = "") -> func.HttpResponse:
         headers={
             "Access-Control-Allow-Origin" : "*",
             "Access-Control-Allow-Methods": "GET,OPTIONS",
-            "Access-Control-Allow-Headers": "x-api-secret"
+            "Access-Control-Allow-Headers": "x-api-secret,If-None-Match",
+            "Access-Control-Expose-Headers": "ETag"
         })
 
 # ---------- MAIN ------------------------------------------------------------
@@ -45,56 +77,55 @@ def main(req: func.HttpRequest) -> func.HttpResponse:
     if API_SECRET and req.headers.get("x-api-secret") != API_SECRET:
         return _cors(403, "Forbidden")
 
-    # ------------------------------------------------------------------ SQL
-    with pyodbc.connect(SQL_CONN, timeout=30) as cnx:
-        df = pd.read_sql(
-            """
-            SELECT id, word, rt_ms, response, phase,
-                   participant, groupe, nblettres, created_at
-            FROM   dbo.resultats
-            WHERE  phase <> 'practice'         -- on exclut l'entraînement
-            ORDER  BY id
-            """,
-            cnx
-        )
-
-    if df.empty:
-        return _cors(404, "Aucune donnée (table vide)")
-
-    # Ajout du bloc de longueur
-    df["letters_block"] = df["nblettres"].apply(letters_block)
-
-    # ---------------------------------------------------------------- Stats
-    # 1. Stats par participant × groupe
-    part_grp = (df.groupby(["participant", "groupe"])["rt_ms"]
-                  .agg(['count', 'mean', 'std'])
-                  .reset_index()
-                  .rename(columns={'count': 'n',
-                                   'mean' : 'rt_mean',
-                                   'std'  : 'rt_sd'}))
-
-    # 2. Stats par participant × bloc lettres
-    part_blk = (df.groupby(["participant", "letters_block"])["rt_ms"]
-                  .agg(['count', 'mean', 'std'])
-                  .reset_index()
-                  .rename(columns={'count': 'n',
-                                   'mean' : 'rt_mean',
-                                   'std'  : 'rt_sd'}))
+    # Format demandé
+    fmt   = (req.params.get("format") or "xlsx").lower()
+    table = req.params.get("table") or None
+    if fmt not in formats.FORMATS:
+        return _cors(400, f"format inconnu : {fmt} ({', '.join(formats.FORMATS)})")
+    if table and (fmt == "xlsx" or table not in formats.TABLES):
+        return _cors(400, f"table inconnue : {table} ({', '.join(formats.TABLES)})")
+    try:
+        filters, size, number = _filters(req.params)
+    except ValueError as exc:
+        return _cors(400, f"Paramètre invalide : {exc}")
+    query = bool(filters or size)
+    key = f"{fmt}-{table}" if table else fmt
+    if query:                                     # un ETag par jeu de filtres
+        key += "-" + hashlib.sha1(repr((sorted(filters.items()), size, number))
+                                  .encode()).hexdigest()[:12]
+    filename, ctype = formats.content(fmt, table)
 
-    # ---------------------------------------------------------------- Excel
-    buf = io.BytesIO()
-    with pd.ExcelWriter(buf, engine="openpyxl") as wr:
-        df.to_excel      (wr, sheet_name="raw",             index=False)
-        part_grp.to_excel(wr, sheet_name="Stats_ByGroup",   index=False)
-        part_blk.to_excel(wr, sheet_name="Stats_ByLetters", index=False)
-    buf.seek(0)
+    # ------------------------------------------------------------- Export
+    last_id = None
+    with closing(db.connect()) as cnx:
+        hi  = db.max_id(cnx)
+        tag = export_cache.etag(hi, key)
+        if hi and tag in req.headers.get("If-None-Match", ""):
+            resp = _cors(304)
+            resp.headers["ETag"] = tag
+            return resp
+        with timing.stage("export"):
+            if query:
+                src  = formats.Query(cnx, filters, hi, size, number)
+                body = formats.render(fmt, src, table)
+                last_id = src.last_id
+            else:
+                body = export_cache.cached(
+                    cnx, hi, lambda st: formats.render(fmt, formats.Snapshot(cnx, st), table),
+                    key)
+    if body is None:
+        return _cors(404, "Aucune donnée (table vide)" if not query else
+                          "Aucune donnée pour ces filtres")
 
     return func.HttpResponse(
-        buf.read(),
+        body,
         status_code = 200,
-        mimetype = ("application/vnd.openxmlformats-officedocument."
-                    "spreadsheetml.sheet"),
+        mimetype = ctype,
         headers = {
-            "Content-Disposition": "attachment; filename=all_results.xlsx",
-            "Access-Control-Allow-Origin": "*"
+            "Content-Disposition": f"attachment; filename={filename}",
+            "Cache-Control": "no-cache",
+            "ETag": tag,
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Expose-Headers": "ETag,X-Next-Since-Id",
+            **({"X-Next-Since-Id": str(last_id)} if last_id is not None else {})
         })
@@ -0,0 +1,253 @@
+# load_test.py  –  banc de charge en processus de save_results / download_all
+# ---------------------------------------------------
+# Rejoue une « salle de cours » : N participants envoient leurs 82 essais
+# (2 d'entraînement + 80, champs et télémétrie postés par voisins.js) en
+# C requêtes simultanées, réparties sur --ramp secondes ; download_all est
+# appelé --downloads fois pendant la vague puis une fois après la vidange
+# de la file des rapports.  Tout tourne dans le processus, sur des stand-ins
+# locaux : SQLite (SQL_CONN=sqlite:///…), file des rapports, cache d'export
+# et dépôt fichiers (STORAGE_CONN=file://…) dans un répertoire temporaire.
+#
+# Mesures : débit, latence p50 / p95 / p99 par fonction, et par étape
+# (parse, aggregate, insert, commit, enqueue ; parquet, upload pour les
+# rapports ; export pour download_all).  Rapport JSON comparable entre
+# versions : --baseline signale les baisses de débit / hausses de p95.
+#
+# Usage :  python api/load_test.py [--participants 200] [--concurrency 50]
+#                                  [--ramp 0] [--json load.json]
+#                                  [--baseline load_old.json]
+
+from __future__ import annotations
+import argparse, importlib, json, os, platform, random, string, subprocess, sys
+import tempfile, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import numpy as np
+
+PARTICIPANTS = 200
+CONCURRENCY  = 50
+DOWNLOADS    = 3
+SEED         = 2024
+REGRESSION   = 0.20           # baisse de débit / hausse de p95 signalée
+GROUPES      = ("LOW_OLD", "HIGH_OLD", "LOW_PLD", "HIGH_PLD")
+HZ           = (60, 60, 60, 120)  # écrans des participants
+
+
+# ─── charge ─────────────────────────────────────────────────────────────
+def telemetry(rng: random.Random, rt: int, hz: int) -> dict:
+    """Colonnes de frameClock d'un essai ; quelques champs None (absents) ou
+    NaN (horloge sans image), comme la télémétrie partielle réelle."""
+    f      = 1000 / hz
+    missed = rng.choices((0, 1, 2, 6), (90, 6, 3, 1))[0]
+    cross  = 500 + abs(rng.gauss(0, f / 3))
+    show   = rt * rng.uniform(0.2, 0.6)
+    out = {"frame_ms": round(f + rng.gauss(0, 0.05), 2),
+           "frames": round((cross + rt) / f) - missed, "missed_frames": missed,
+           "max_jitter_ms": round(abs(rng.gauss(0, 0.8)) + missed * f, 2),
+           "cross_ms": round(cross, 2), "show_ms": round(show, 2),
+           "hide_ms": round(rt - show, 2)}
+    for k in out:
+        r = rng.random()
+        out[k] = None if r < 0.03 else float("nan") if r < 0.04 else out[k]
+    return out
+
+
+def payload(pid: str, rng: random.Random) -> list:
+    """Envoi de fin d'expérience : 2 essais d'entraînement + 80 de test,
+    20 mots par groupe, blocs de longueur 4_5 … 10_11, avec la télémétrie
+    par essai (absente pour ~5 % des participants : ancien client)."""
+    out, hz, timed = [], rng.choice(HZ), rng.random() >= 0.05
+    for i in range(82):
+        n = rng.choice((4, 5, 6, 7, 8, 9, 10, 11))
+        word = "".join(rng.choice(string.ascii_uppercase) for _ in range(n))
+        rt   = rng.randint(300, 4000)
+        out.append({
+            "word": word, "groupe": GROUPES[(i - 2) // 20 % 4] if i >= 2 else "PRACTICE",
+            "nblettres": n, "nbphons": max(2, n - rng.randint(0, 3)),
+            "old20": round(rng.uniform(1, 4), 2), "pld20": round(rng.uniform(1, 4), 2),
+            "freqfilms2": round(rng.lognormvariate(1, 1.5), 2),
+            "freqlemfilms2": round(rng.lognormvariate(1.5, 1.5), 2),
+            "freqlemlivres": round(rng.lognormvariate(1.5, 1.5), 2),
+            "freqlivres": round(rng.lognormvariate(1, 1.5), 2),
+            "rt_ms": rt, "response": word.lower(),
+            "phase": "practice" if i < 2 else "test", "participant": pid,
+            **(telemetry(rng, rt, hz) if timed else {})})
+    return out
+
+
+def body(trials: list) -> bytes:
+    """JSON posté comme par JSON.stringify : NaN → null."""
+    return json.dumps([{k: None if isinstance(v, float) and v != v else v
+                        for k, v in t.items()} for t in trials]).encode()
+
+
+def _pct(v: List[float]) -> dict:
+    if not v:
+        return {}
+    a = np.asarray(v) * 1e3
+    return {"n": len(v), "p50_ms": round(float(np.percentile(a, 50)), 2),
+            "p95_ms": round(float(np.percentile(a, 95)), 2),
+            "p99_ms": round(float(np.percentile(a, 99)), 2),
+            "max_ms": round(float(a.max()), 2)}
+
+
+def _stages(runs: List[Dict[str, float]]) -> dict:
+    names = sorted({k for r in runs for k in r} - {"total"})
+    return {k: _pct([r[k] for r in runs if k in r]) for k in names}
+
+
+# ─── banc ───────────────────────────────────────────────────────────────
+def run(participants: int = PARTICIPANTS, concurrency: int = CONCURRENCY, ramp: float = 0.0,
+        downloads: int = DOWNLOADS, fmt: str = "xlsx", seed: int = SEED, log=print) -> dict:
+    tmp = tempfile.mkdtemp(prefix="load_test.")
+    # les modules lisent leur configuration à l'import
+    os.environ.update(SQL_CONN=f"sqlite:///{tmp}/results.db",
+                      REPORT_QUEUE=f"{tmp}/report_jobs.sqlite",
+                      EXPORT_CACHE=f"{tmp}/export_cache",
+                      STORAGE_CONN=f"file://{tmp}/blobs")
+    os.environ.pop("API_SECRET", None)
+    import azure.functions as func
+    from shared_code import jobs, reports, timing
+    save_results = importlib.import_module("save_results")
+    download_all = importlib.import_module("download_all")
+
+    rng = random.Random(seed)
+    bodies = [body(payload(f"LT{i:05d}", rng)) for i in range(participants)]
+    lock, saves, dls, reps, errors = threading.Lock(), [], [], [], []
+
+    def call(main, req, sink):
+        with timing.collect() as st:
+            tic = time.perf_counter()
+            resp = main(req)
+            st["total"] = time.perf_counter() - tic
+        with lock:
+            (sink if resp.status_code < 400 else errors).append(
+                st if resp.status_code < 400 else f"{resp.status_code} {resp.get_body()[:80]!r}")
+
+    def save(i):
+        if ramp:
+            time.sleep(max(0.0, t0 + ramp * i / participants - time.perf_counter()))
+        call(save_results.main, func.HttpRequest(
+            method="POST", url="/api/save_results", body=bodies[i],
+            headers={"content-type": "application/json"}), saves)
+
+    def download():
+        call(download_all.main, func.HttpRequest(
+            method="GET", url="/api/download_all", body=b"", params={"format": fmt}), dls)
+
+    # rapports : même traitement, mesuré par job (le worker tourne en fond)
+    process = reports.process
+
+    def timed(pid, data):
+        with timing.collect() as st:
+            tic = time.perf_counter()
+            try:
+                process(pid, data)
+            finally:
+                st["total"] = time.perf_counter() - tic
+                with lock:
+                    reps.append(st)
+    reports.process = timed
+
+    try:
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            futs = [pool.submit(save, i) for i in range(participants)]
+            step = max(1, participants // (downloads + 1))
+            for k in range(downloads):
+                while sum(f.done() for f in futs) < (k + 1) * step:
+                    time.sleep(0.01)
+                download()
+            for f in futs:
+                f.result()
+        wall = time.perf_counter() - t0
+        jobs.kick(timed)
+        while (s := jobs.status()).get("pending", 0) + s.get("running", 0):
+            time.sleep(0.05)
+        drain = time.perf_counter() - t0
+        download()
+    finally:
+        reports.process = process
+
+    rep = {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "revision": _revision(),
+           "python": platform.python_version(), "seed": seed,
+           "params": {"participants": participants, "concurrency": concurrency,
+                      "ramp_s": ramp, "downloads": downloads + 1, "format": fmt,
+                      "store": "sqlite", "cpus": os.cpu_count()},
+           "save_results": {"ok": len(saves), "errors": len(errors),
+                            "wall_s": round(wall, 3),
+                            "throughput_rps": round(len(saves) / wall, 1),
+                            "latency": _pct([s["total"] for s in saves]),
+                            "stages": _stages(saves)},
+           "reports": {"jobs": len(reps), "queue": jobs.status(),
+                       "drained_s": round(drain, 3), "latency": _pct([r["total"] for r in reps]),
+                       "stages": _stages(reps)},
+           "download_all": {"ok": len(dls), "latency": _pct([d["total"] for d in dls]),
+                            "stages": _stages(dls)},
+           "error_samples": errors[:5]}
+    s, r = rep["save_results"], rep["reports"]
+    log(f"save_results  {s['ok']} ok / {s['errors']} err  {s['throughput_rps']} req/s  "
+        f"p50 {s['latency'].get('p50_ms')} ms  p95 {s['latency'].get('p95_ms')} ms  "
+        f"p99 {s['latency'].get('p99_ms')} ms")
+    for k, v in s["stages"].items():
+        log(f"  {k:10s} p50 {v['p50_ms']:8.2f}  p95 {v['p95_ms']:8.2f}  p99 {v['p99_ms']:8.2f} ms")
+    log(f"rapports      {r['jobs']} jobs, file vide après {r['drained_s']} s")
+    for k, v in r["stages"].items():
+        log(f"  {k:10s} p50 {v['p50_ms']:8.2f}  p95 {v['p95_ms']:8.2f}  p99 {v['p99_ms']:8.2f} ms")
+    d = rep["download_all"]["latency"]
+    log(f"download_all  {rep['download_all']['ok']} appels  p50 {d.get('p50_ms')} ms  "
+        f"max {d.get('max_ms')} ms")
+    return rep
+
+
+def _revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(rep: dict, old: dict, threshold: float = REGRESSION) -> List[str]:
+    """Baisse de débit de save_results, ou hausse du p95 (total et par
+    étape) de plus de `threshold` par rapport au rapport `old`."""
+    out, new_s, old_s = [], rep["save_results"], old["save_results"]
+    if new_s["throughput_rps"] < (1 - threshold) * old_s["throughput_rps"]:
+        out.append(f"save_results : {old_s['throughput_rps']} → {new_s['throughput_rps']} req/s")
+    for fn in ("save_results", "reports", "download_all"):
+        pairs = [("total", rep[fn]["latency"], old[fn]["latency"])]
+        pairs += [(k, v, old[fn]["stages"].get(k, {})) for k, v in rep[fn]["stages"].items()]
+        for name, n, o in pairs:
+            if o.get("p95_ms") and n.get("p95_ms", 0) > (1 + threshold) * o["p95_ms"]:
+                out.append(f"{fn}.{name} p95 : {o['p95_ms']} → {n['p95_ms']} ms "
+                           f"({old.get('revision')} → {rep['revision']})")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Banc de charge de save_results / download_all.")
+    ap.add_argument("--participants", type=int, default=PARTICIPANTS)
+    ap.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    ap.add_argument("--ramp", type=float, default=0.0, help="arrivées étalées sur S secondes")
+    ap.add_argument("--downloads", type=int, default=DOWNLOADS,
+                    help="appels à download_all pendant la vague")
+    ap.add_argument("--format", default="xlsx", help="format demandé à download_all")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--json", help="écrit le rapport dans ce fichier")
+    ap.add_argument("--baseline", help="rapport antérieur à comparer")
+    a = ap.parse_args()
+    rep = run(a.participants, a.concurrency, a.ramp, a.downloads, a.format, a.seed)
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as fh:
+            json.dump(rep, fh, ensure_ascii=False, indent=1)
+    if a.baseline:
+        with open(a.baseline, encoding="utf-8") as fh:
+            worse = compare(rep, json.load(fh))
+        for w in worse:
+            print(f"⚠️  régression : {w}")
+        sys.exit(1 if worse else 0)
+
+
+if __name__ == "__main__":
+    main()
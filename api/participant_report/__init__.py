@@ -0,0 +1,68 @@
+# participant_report  –  Azure Static Web App (Functions v1)
+# ---------------------------------------------------
+# Rapport d'un participant, rendu à la demande depuis son artefact
+# Parquet (participants/{participant}.parquet, déposé par la file des
+# rapports) :
+#   ?participant=P            classeur {P}_results.xlsx (feuilles tirage,
+#                             Stats_ByGroup, Stats_ByLetters)
+#   ?participant=P&format=parquet   l'artefact tel quel
+# Un participant antérieur aux artefacts est servi depuis son ancien
+# classeur {P}_results.xlsx s'il existe encore dans le conteneur.
+
+import io, os
+import azure.functions as func
+import pandas as pd
+
+from shared_code import blobs, reports, timing
+
+# ---------- configuration ---------------------------------------------------
+API_SECRET = os.getenv("API_SECRET")        # même secret que save_results
+
+# ---------- helper CORS -----------------------------------------------------
+def _cors(code: int, body: str = "") -> func.HttpResponse:
+    return func.HttpResponse(
+        body, status_code=code,
+        headers={
+            "Access-Control-Allow-Origin" : "*",
+            "Access-Control-Allow-Methods": "GET,OPTIONS",
+            "Access-Control-Allow-Headers": "x-api-secret"
+        })
+
+# ---------- MAIN ------------------------------------------------------------
+def main(req: func.HttpRequest) -> func.HttpResponse:
+
+    # Pré-vol CORS
+    if req.method == "OPTIONS":
+        return _cors(204)
+
+    # Vérification du secret
+    if API_SECRET and req.headers.get("x-api-secret") != API_SECRET:
+        return _cors(403, "Forbidden")
+
+    pid = (req.params.get("participant") or "").strip()
+    fmt = (req.params.get("format") or "xlsx").lower()
+    if not pid:
+        return _cors(400, "participant manquant")
+    if fmt not in ("xlsx", "parquet"):
+        return _cors(400, f"format inconnu : {fmt} (xlsx, parquet)")
+
+    # ------------------------------------------------------------- Rendu
+    bl = blobs.open_blobs()
+    with timing.stage("export"):
+        body = bl.get(reports.artifact_name(pid))
+        if body is None:
+            body = bl.get(reports.legacy_name(pid)) if fmt == "xlsx" else None
+        elif fmt == "xlsx":
+            body = reports.workbook(pd.read_parquet(io.BytesIO(body)))
+    if body is None:
+        return _cors(404, f"Aucun rapport pour {pid} (envoi absent ou encore en file)")
+
+    return func.HttpResponse(
+        body,
+        status_code = 200,
+        mimetype = reports.XLSX if fmt == "xlsx" else reports.PARQUET,
+        headers = {
+            "Content-Disposition": f"attachment; filename*=UTF-8''{reports.slug(pid)}_results.{fmt}",
+            "Cache-Control": "no-cache",
+            "Access-Control-Allow-Origin": "*"
+        })
@@ -0,0 +1,55 @@
+# rebuild_aggregates.py  –  (re)construit dbo.resultats_agg
+# ---------------------------------------------------
+# La table est créée vide à la première connexion des fonctions
+# (db.connect) ; à lancer une fois après le déploiement qui l'introduit,
+# pour reprendre les essais déjà enregistrés, ou pour contrôler la table
+# tenue à jour par save_results : --check compare à un recalcul pandas.
+# Le recalcul tient dbo.resultats verrouillée jusqu'à son COMMIT :
+# save_results peut rester en service, ses insertions attendent (quelques
+# secondes) au lieu d'être perdues.
+#
+# Usage :  SQL_CONN=… python api/rebuild_aggregates.py [--check]
+
+from __future__ import annotations
+import argparse, time
+from contextlib import closing
+
+import numpy as np
+import pandas as pd
+
+from shared_code import db
+
+
+def check(cnx) -> float:
+    """Plus grand écart (ms) entre la table et un groupby sur dbo.resultats."""
+    df = pd.read_sql("SELECT participant, groupe, nblettres, word, rt_ms "
+                     "FROM dbo.resultats WHERE phase <> 'practice'", cnx)
+    df["letters_block"] = df["nblettres"].apply(db.letters_block)
+    worst = 0.0
+    for grain in db.GRAINS:
+        keys = [grain] if grain == "word" else ["participant", grain]
+        ref = (df.groupby(keys)["rt_ms"].agg(["count", "mean", "std"])
+                 .reset_index().sort_values(keys, ignore_index=True))
+        got = db.read_aggregates(cnx, grain).sort_values(keys, ignore_index=True)
+        assert len(ref) == len(got) and (ref["count"].to_numpy() == got["n"].to_numpy()).all(), grain
+        for a, b in (("mean", "rt_mean"), ("std", "rt_sd")):
+            d = np.abs(ref[a].to_numpy(float) - got[b].to_numpy(float))
+            worst = max(worst, float(np.nanmax(d, initial=0)))
+    return worst
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Reconstruit les agrégats RT de dbo.resultats.")
+    ap.add_argument("--check", action="store_true", help="compare sans reconstruire")
+    a = ap.parse_args()
+    with closing(db.connect()) as cnx:
+        tic = time.perf_counter()
+        if a.check:
+            print(f"écart max {check(cnx):.2e} ms")
+        else:
+            print(f"{db.rebuild_aggregates(cnx)} groupes")
+        print(f"{time.perf_counter() - tic:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+# report_worker.py  –  vidange de la file des rapports (shared_code.jobs)
+# ---------------------------------------------------
+# Le worker de save_results tourne dans l'hôte de fonctions ; ce script
+# draine la même file à la main ou depuis un cron (hôte redémarré, jobs
+# en reprise différée, jobs « dead » à relancer).  --compact fond les
+# fichiers par participant d'un jour du jeu consolidé (défaut : la veille,
+# UTC) en un seul Parquet.
+#
+# Usage :  python api/report_worker.py [--loop 60] [--retry-dead] [--status]
+#                                      [--compact [AAAA-MM-JJ]]
+
+from __future__ import annotations
+import argparse, json, logging, time
+from datetime import date, datetime, timedelta, timezone
+
+from shared_code import jobs, reports
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Traite la file des rapports (artefacts Parquet).")
+    ap.add_argument("--batch", type=int, default=jobs.BATCH)
+    ap.add_argument("--loop", type=float, metavar="S", help="recommence toutes les S secondes")
+    ap.add_argument("--retry-dead", action="store_true", help="remet en attente les jobs abandonnés")
+    ap.add_argument("--status", action="store_true", help="affiche l'état de la file et sort")
+    ap.add_argument("--compact", nargs="?", metavar="JOUR", type=date.fromisoformat,
+                    const=datetime.now(timezone.utc).date() - timedelta(days=1),
+                    help="compacte la partition du jour (défaut : la veille) et sort")
+    a = ap.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    if a.compact:
+        logging.info("%s : %d fichier(s) compacté(s)", a.compact, reports.compact(a.compact))
+        return
+    if a.status:
+        print(json.dumps(jobs.status()))
+        return
+    if a.retry_dead:
+        logging.info("%d job(s) relancé(s)", jobs.retry_dead())
+    while True:
+        logging.info("%s  file %s", jobs.drain(reports.process, a.batch), jobs.status())
+        if not a.loop:
+            break
+        time.sleep(a.loop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+# shared_code  –  modules communs aux fonctions (save_results, download_all)
+# Importés par « from shared_code import db » : la racine de l'application
+# de fonctions (api/) est dans sys.path.
@@ -0,0 +1,97 @@
+# shared_code/blobs.py  –  dépôt des artefacts (conteneur Blob ou répertoire)
+# ---------------------------------------------------
+# Même interface put / get / list / delete pour :
+#   • AzureBlobs : conteneur STORAGE_CONTAINER du compte STORAGE_CONN
+#   • LocalBlobs : STORAGE_CONN = « file:///répertoire » ; un fichier par
+#                  blob sous {répertoire}/{conteneur}/, écrit atomiquement
+#                  (banc de charge, sessions hors ligne, essais sans Azure)
+# Les noms de blob sont des chemins relatifs « a/b/c.parquet ».
+
+from __future__ import annotations
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+STO_CONN = os.getenv("STORAGE_CONN")                 # Chaîne connexion Storage
+STO_CONT = os.getenv("STORAGE_CONTAINER", "results")
+LOCAL    = "file://"
+
+
+class LocalBlobs:
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, name: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, name))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"nom de blob invalide : {name!r}")
+        return path
+
+    def put(self, name: str, body: bytes, ctype: str | None = None) -> None:
+        dest = self._path(name)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(body)
+        os.replace(tmp, dest)
+
+    def get(self, name: str) -> Optional[bytes]:
+        try:
+            with open(self._path(name), "rb") as fh:
+                return fh.read()
+        except FileNotFoundError:
+            return None
+
+    def list(self, prefix: str = "") -> List[str]:
+        out = []
+        for d, _, files in os.walk(self.root):
+            rel = os.path.relpath(d, self.root).replace(os.sep, "/")
+            out += [f if rel == "." else f"{rel}/{f}" for f in files if not f.endswith(".tmp")]
+        return sorted(n for n in out if n.startswith(prefix))
+
+    def delete(self, name: str) -> None:
+        try:
+            os.remove(self._path(name))
+        except FileNotFoundError:
+            pass
+
+
+class AzureBlobs:
+
+    def __init__(self, conn_str: str, container: str):
+        from azure.storage.blob import BlobServiceClient
+        self.cnt = BlobServiceClient.from_connection_string(conn_str).get_container_client(container)
+
+    def put(self, name: str, body: bytes, ctype: str | None = None) -> None:
+        from azure.storage.blob import ContentSettings
+        self.cnt.upload_blob(name=name, data=body, overwrite=True,
+                             content_settings=ContentSettings(content_type=ctype) if ctype else None)
+
+    def get(self, name: str) -> Optional[bytes]:
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            return self.cnt.download_blob(name).readall()
+        except ResourceNotFoundError:
+            return None
+
+    def list(self, prefix: str = "") -> List[str]:
+        return sorted(b.name for b in self.cnt.list_blobs(name_starts_with=prefix or None))
+
+    def delete(self, name: str) -> None:
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            self.cnt.delete_blob(name)
+        except ResourceNotFoundError:
+            pass
+
+
+@lru_cache(maxsize=None)
+def open_blobs(conn_str: str | None = None, container: str | None = None):
+    """Dépôt d'une chaîne de connexion (défaut : STORAGE_CONN / STORAGE_CONTAINER)."""
+    conn_str, container = conn_str or STO_CONN, container or STO_CONT
+    if not conn_str:
+        raise RuntimeError("STORAGE_CONN non défini (chaîne Azure Storage ou file:///répertoire)")
+    if conn_str.startswith(LOCAL):
+        return LocalBlobs(os.path.join(conn_str[len(LOCAL):], container))
+    return AzureBlobs(conn_str, container)
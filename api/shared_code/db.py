@@ -0,0 +1,360 @@
+# shared_code/db.py  –  accès SQL commun aux fonctions
+# ---------------------------------------------------
+#   • backend choisi par SQL_CONN (store.py) : Azure SQL via ODBC, ou
+#     « sqlite:///chemin.db » (même schéma, hors ligne : mesures, tests,
+#     sessions de labo)
+#   • une connexion par thread, gardée au niveau du module : les
+#     invocations « chaudes » ne se reconnectent pas à Azure SQL
+#   • schéma (dbo.resultats_agg, index, colonnes ajoutées) vérifié à la
+#     première connexion du processus : un déploiement n'attend aucune
+#     migration manuelle
+#   • insertion des essais en un seul executemany par transaction
+#   • dbo.resultats_agg : statistiques suffisantes du RT (n, Σx, Σx²) par
+#     participant × groupe, participant × letters_block et par mot, mises
+#     à jour dans la transaction de l'insertion ; elles se fusionnent par
+#     addition, download_all les lit en O(groupes) et non en O(lignes)
+#   • iter_results() : lecture de dbo.resultats par paquets (clé id), à
+#     mémoire constante quelle que soit la taille de l'étude ; filtres
+#     (participants, groupes, created_at, since_id) poussés dans le WHERE,
+#     page() pour la pagination OFFSET / FETCH ; index : store.py
+#   • télémétrie d'affichage (store.TIMING) : stockée avec l'essai,
+#     résumée par participant (timing_frame) ; max_missed / max_jitter
+#     écartent les essais mal présentés
+
+from __future__ import annotations
+import math, os, sqlite3, threading
+
+from .store import SQLITE, TIMING, backend, open_store
+from .timing import stage
+
+SQL_CONN = os.getenv("SQL_CONN")            # chaîne ODBC ou sqlite:///…
+
+TIMING_COLS = tuple(c for c, _ in TIMING)
+COLS       = ("word", "rt_ms", "response", "phase", "participant", "groupe", "nblettres",
+              *TIMING_COLS)
+INSERT_SQL = (f"INSERT INTO dbo.resultats ({', '.join(COLS)}) "
+              f"VALUES ({','.join('?' * len(COLS))})")
+
+# grain → clé (participant vide pour le grain « word »)
+GRAINS = ("groupe", "letters_block", "word")
+
+LETTERS_BLOCK_SQL = """CASE WHEN nblettres IN (4, 5) THEN '4_5'
+                            WHEN nblettres IN (6, 7) THEN '6_7'
+                            WHEN nblettres IN (8, 9) THEN '8_9'
+                            ELSE '10_11' END"""
+
+RAW_COLS = ("id", "word", "rt_ms", "response", "phase",
+            "participant", "groupe", "nblettres", "created_at", *TIMING_COLS)
+CHUNK    = 5000
+
+_local = threading.local()
+_ready: set = set()                         # backends dont le schéma est vérifié
+_ready_lock = threading.Lock()
+
+
+# ─── connexions ─────────────────────────────────────────────────────────
+def connect(conn_str: str | None = None):
+    """Nouvelle connexion : ODBC (Azure SQL) ou SQLite (« sqlite:///… ») ;
+    la première du processus pour une base passe ensure_schema (idempotent,
+    rejoué à la connexion suivante s'il échoue)."""
+    st = open_store(conn_str or SQL_CONN)
+    cnx = st.connect()
+    if st not in _ready:
+        with _ready_lock:
+            if st not in _ready:
+                try:
+                    st.ensure_schema(cnx)
+                except Exception:
+                    cnx.close()
+                    raise
+                _ready.add(st)
+    return cnx
+
+
+def connection():
+    """Connexion du thread courant, ouverte au premier appel puis réutilisée."""
+    if getattr(_local, "cnx", None) is None:
+        _local.cnx = connect()
+    return _local.cnx
+
+
+def reset() -> None:
+    """Oublie (et ferme) la connexion du thread, ex. après une coupure."""
+    cnx, _local.cnx = getattr(_local, "cnx", None), None
+    if cnx is not None:
+        try:
+            cnx.close()
+        except Exception:
+            pass
+
+
+def _lost(exc: Exception) -> bool:
+    """Erreur de connexion (et non de données) : on peut rouvrir et rejouer."""
+    name = type(exc).__name__
+    return name in ("OperationalError", "InterfaceError") or \
+           isinstance(exc, sqlite3.ProgrammingError)
+
+
+# ─── insertion ──────────────────────────────────────────────────────────
+def params(data: list) -> list:
+    """Paramètres de INSERT_SQL, construits colonne par colonne."""
+    cols = (
+        [r.get("word", "")        for r in data],
+        [int(r.get("rt_ms", 0))   for r in data],
+        [r.get("response", "")    for r in data],
+        [r.get("phase", "")       for r in data],
+        [r.get("participant", "") for r in data],
+        [r.get("groupe", "")      for r in data],
+        [int(r["nblettres"])      for r in data],
+        *([_number(r.get(c), typ) for r in data] for c, typ in TIMING),
+    )
+    return list(zip(*cols))
+
+
+def _number(v, typ: str):
+    """Valeur de télémétrie : None si absente ou invalide (NaN, ±inf)."""
+    try:
+        x = None if v in (None, "") else float(v)
+    except (TypeError, ValueError):
+        return None
+    if x is None or not math.isfinite(x):
+        return None
+    return int(x) if typ == "INT" else x
+
+
+def letters_block(n: int) -> str:
+    if n in (4, 5):  return "4_5"
+    if n in (6, 7):  return "6_7"
+    if n in (8, 9):  return "8_9"
+    return "10_11"
+
+
+def accumulate(acc: dict, rows) -> dict:
+    """Ajoute à acc {(grain, participant, k): [n, Σrt, Σrt²]} les lignes
+    (participant, groupe, nblettres, word, rt_ms)."""
+    for pid, groupe, nbl, word, rt in rows:
+        rt = float(rt)
+        for key in (("groupe", pid, groupe),
+                    ("letters_block", pid, letters_block(int(nbl))),
+                    ("word", "", word)):
+            a = acc.setdefault(key, [0, 0.0, 0.0])
+            a[0] += 1; a[1] += rt; a[2] += rt * rt
+    return acc
+
+
+def aggregates(data: list) -> list:
+    """(grain, participant, k, n, Σrt, Σrt²) du lot, triés par clé (même
+    ordre de verrouillage pour deux insertions concurrentes)."""
+    acc = accumulate({}, ((r.get("participant", ""), r.get("groupe", ""), r["nblettres"],
+                           r.get("word", ""), r.get("rt_ms", 0))
+                          for r in data if r.get("phase") != "practice"))
+    return [(*key, *a) for key, a in sorted(acc.items())]
+
+
+def insert_results(data: list, cnx=None) -> int:
+    """Insère les essais et met à jour dbo.resultats_agg dans la même
+    transaction ; renvoie le nombre de lignes.  data peut réunir les
+    envois de plusieurs participants (un seul COMMIT pour le lot).  Avec
+    la connexion de module, une connexion tombée (délai d'inactivité,
+    basculement SQL) est rouverte une fois."""
+    rows = params(data)
+    with stage("aggregate"):
+        aggs = aggregates(data)
+    for attempt in (0, 1):
+        c = cnx or connection()
+        try:
+            st, cur = backend(c), c.cursor()
+            with stage("insert"):
+                st.begin(cur)
+                cur.executemany(INSERT_SQL, rows)
+            if aggs:
+                with stage("aggregate"):
+                    cur.executemany(st.UPSERT_AGG, aggs)
+            with stage("commit"):
+                c.commit()
+            cur.close()
+            return len(rows)
+        except Exception as exc:
+            try:
+                c.rollback()
+            except Exception:
+                pass
+            if cnx is not None or attempt or not _lost(exc):
+                raise
+            reset()
+
+
+# ─── lecture ────────────────────────────────────────────────────────────
+def where(filters: dict | None, hi: int) -> tuple:
+    """(clause WHERE, paramètres) : essais hors entraînement d'id ≤ hi,
+    restreints par filters = {participants, groupes : listes ; from, to :
+    bornes de created_at, [from, to[ ; since_id ; max_missed, max_jitter :
+    seuils de télémétrie, les essais sans télémétrie étant conservés}."""
+    f, sql, args = filters or {}, ["phase <> 'practice'", "id <= ?"], [hi]
+    for col, key in (("participant", "participants"), ("groupe", "groupes")):
+        if f.get(key):
+            sql.append(f"{col} IN ({','.join('?' * len(f[key]))})")
+            args += list(f[key])
+    if f.get("from"):
+        sql.append("created_at >= ?"); args.append(f["from"])
+    if f.get("to"):
+        sql.append("created_at < ?"); args.append(f["to"])
+    if f.get("since_id"):
+        sql.append("id > ?"); args.append(int(f["since_id"]))
+    for col, key in (("missed_frames", "max_missed"), ("max_jitter_ms", "max_jitter")):
+        if f.get(key) is not None:
+            sql.append(f"({col} IS NULL OR {col} <= ?)"); args.append(f[key])
+    return " AND ".join(sql), args
+
+
+def iter_results(cnx, chunk: int = CHUNK, hi: int | None = None, lo: int = 0,
+                 filters: dict | None = None):
+    """Essais hors entraînement d'id dans ]lo, hi], par paquets de chunk
+    lignes triés par id (pagination par clé : chaque requête reprend après
+    le dernier id, sans OFFSET).  hi : ex. MAX(id) au début de l'export."""
+    if hi is None:
+        hi = max_id(cnx)
+    cond, args = where(filters, hi)
+    cols = ", ".join(RAW_COLS)
+    top, limit = backend(cnx).first
+    sql = f"SELECT {top}{cols} FROM dbo.resultats WHERE id > ? AND {cond} ORDER BY id{limit}"
+    last, cur = lo, cnx.cursor()
+    while True:
+        rows = cur.execute(sql, [chunk, last, *args] if top else [last, *args, chunk]).fetchall()
+        if not rows:
+            return
+        last = rows[-1][0]
+        yield rows
+
+
+def page(cnx, filters: dict | None, size: int, number: int = 0,
+         hi: int | None = None, chunk: int = CHUNK):
+    """Page number (0, 1, …) de size essais filtrés, triés par id :
+    OFFSET … FETCH (Azure SQL) / LIMIT … OFFSET (SQLite), lue par paquets."""
+    if hi is None:
+        hi = max_id(cnx)
+    cond, args = where(filters, hi)
+    clause, extra = backend(cnx).page(size, number * size)
+    sql = f"SELECT {', '.join(RAW_COLS)} FROM dbo.resultats WHERE {cond} ORDER BY id{clause}"
+    args += extra
+    cur = cnx.cursor()
+    cur.execute(sql, args)
+    while rows := cur.fetchmany(chunk):
+        yield rows
+
+
+def max_id(cnx) -> int:
+    return cnx.execute("SELECT COALESCE(MAX(id), 0) FROM dbo.resultats").fetchone()[0]
+
+
+# ─── agrégats ───────────────────────────────────────────────────────────
+def ensure_schema(cnx) -> None:
+    """Azure SQL : dbo.resultats_agg, index des filtres et colonnes TIMING
+    (idempotent ; déjà passé par connect(), la base SQLite les crée à la
+    connexion)."""
+    backend(cnx).ensure_schema(cnx)
+
+
+def rebuild_aggregates(cnx) -> int:
+    """Recalcule dbo.resultats_agg depuis dbo.resultats (reprise de
+    l'existant, ou contrôle) ; renvoie le nombre de groupes.  Une seule
+    transaction, dbo.resultats verrouillée jusqu'au COMMIT : un
+    insert_results concurrent attend la fin du recalcul (ni compté deux
+    fois, ni perdu)."""
+    src = f"""
+        SELECT participant, groupe, {LETTERS_BLOCK_SQL} AS letters_block,
+               word, CAST(rt_ms AS FLOAT) AS rt
+        FROM   dbo.resultats
+        WHERE  phase <> 'practice'"""
+    ensure_schema(cnx)
+    st, cur = backend(cnx), cnx.cursor()
+    try:
+        st.lock_results(cur)
+        cur.execute("DELETE FROM dbo.resultats_agg")
+        for grain, pid in (("groupe", "participant"), ("letters_block", "participant"),
+                           ("word", "''")):
+            cur.execute(f"""
+                INSERT INTO dbo.resultats_agg(grain, participant, k, n, s1, s2)
+                SELECT '{grain}', {pid}, {grain}, COUNT(*), SUM(rt), SUM(rt * rt)
+                FROM ({src}) AS r
+                GROUP BY {"participant, " if pid != "''" else ""}{grain}""")
+        n = cur.execute("SELECT COUNT(*) FROM dbo.resultats_agg").fetchone()[0]
+        cnx.commit()
+    except Exception:
+        cnx.rollback()
+        raise
+    return n
+
+
+def agg_frame(rows, grain: str):
+    """Feuille de stats d'un grain depuis des (participant, clé, n, Σrt,
+    Σrt²) : participant, clé, n, rt_mean, rt_sd (écart-type corrigé,
+    comme pandas .std())."""
+    import pandas as pd
+    df = pd.DataFrame(list(rows), columns=["participant", "k", "n", "s1", "s2"])
+    n = df["n"].astype(float)
+    var = (df["s2"] - df["s1"] ** 2 / n) / (n - 1)
+    df["rt_mean"] = df["s1"] / n
+    df["rt_sd"]   = var.clip(lower=0) ** 0.5
+    df.loc[n < 2, "rt_sd"] = float("nan")
+    df = df.rename(columns={"k": grain})[["participant", grain, "n", "rt_mean", "rt_sd"]]
+    return df.drop(columns="participant") if grain == "word" else df
+
+
+def read_aggregates(cnx, grain: str):
+    """agg_frame() de dbo.resultats_agg (tenue à jour à l'insertion)."""
+    cur = cnx.cursor()
+    cur.execute("SELECT participant, k, n, s1, s2 FROM dbo.resultats_agg "
+                "WHERE grain = ? ORDER BY participant, k", [grain])
+    return agg_frame([tuple(r) for r in cur.fetchall()], grain)
+
+
+def acc_frame(acc: dict, grain: str):
+    """agg_frame() d'un accumulateur accumulate() (ex. export filtré)."""
+    return agg_frame([(p, k, *a) for (g, p, k), a in sorted(acc.items()) if g == grain],
+                     grain)
+
+
+# ─── télémétrie ─────────────────────────────────────────────────────────
+TIMING_STATS = ("trials", "timed", "bad_trials", "missed_frames", "max_jitter_ms",
+                "frame_ms", "cross_ms", "show_ms", "hide_ms")
+
+
+TIMING_MEANS = ("frame_ms", "cross_ms", "show_ms", "hide_ms")
+
+
+def _measured(v) -> bool:
+    return v is not None and v == v
+
+
+def accumulate_timing(acc: dict, rows) -> dict:
+    """Ajoute à acc {participant: [n, n mesurés, n avec image sautée,
+    Σ sautées, max gigue, n gigue, puis (Σ, n) de chaque TIMING_MEANS]}
+    les lignes (participant, *TIMING_COLS).  Chaque champ est compté à
+    part : None / NaN = non mesuré (télémétrie partielle)."""
+    for pid, frame, _, missed, jitter, cross, show, hide in rows:
+        a = acc.setdefault(pid, [0, 0, 0, 0, 0.0, 0, *[0.0, 0] * len(TIMING_MEANS)])
+        a[0] += 1
+        if _measured(missed):
+            a[1] += 1; a[2] += missed > 0; a[3] += int(missed)
+        if _measured(jitter):
+            a[4] = max(a[4], jitter); a[5] += 1
+        for k, v in enumerate((frame, cross, show, hide)):
+            if _measured(v):
+                a[6 + 2 * k] += v; a[7 + 2 * k] += 1
+    return acc
+
+
+def timing_frame(acc: dict):
+    """Feuille Stats_Timing : par participant, essais, essais mesurés,
+    essais avec image sautée, images sautées, gigue maximale, moyennes
+    de période, croix, mot et masque (chacune sur ses essais mesurés,
+    NaN si aucun)."""
+    import pandas as pd
+    df = pd.DataFrame([(p, *a) for p, a in sorted(acc.items())],
+                      columns=["participant", *TIMING_STATS[:5], "n_jitter",
+                               *(f"{k}{c}" for c in TIMING_MEANS for k in ("s_", "n_"))])
+    df["max_jitter_ms"] = df["max_jitter_ms"].where(df["n_jitter"] > 0)
+    for c in TIMING_MEANS:
+        df[c] = df[f"s_{c}"] / df[f"n_{c}"].where(df[f"n_{c}"] > 0)
+    return df[["participant", *TIMING_STATS]]
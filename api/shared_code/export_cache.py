@@ -0,0 +1,220 @@
+# shared_code/export_cache.py  –  cache incrémental de download_all
+# ---------------------------------------------------
+#   • instantané colonnaire des essais exportés : segments de colonnes
+#     .npy (comme lexicon_cache), relus en mémoire mappée ; created_at en
+#     datetime64[us], textes NULL repérés par un masque (.na.npy) : les
+#     lignes relues valent celles de la base (None, datetime)
+#   • state.json retient le dernier id exporté : un appel ne lit en base
+#     que id > last_id, ajoute un segment puis régénère le classeur
+#   • chaque rendu (format × table) est gardé tel quel ; l'ETag (version,
+#     rendu, MAX(id)) permet de répondre 304 sans rien relire ni rendre
+#   • MAX(id) plus petit que last_id (table vidée) → cache repris à zéro
+#   • les workers Functions d'une même instance partagent le répertoire :
+#     lecture, ajout, publication et ménage se font sous un verrou de
+#     fichier (flock, msvcrt sous Windows) en plus du verrou de threads
+#
+# EXPORT_CACHE = répertoire du cache (défaut : répertoire temporaire).
+
+from __future__ import annotations
+import json, os, shutil, tempfile, threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:                       # Windows (func start en local)
+    fcntl = None
+    import msvcrt
+
+from . import db
+
+CACHE_DIR = Path(os.getenv("EXPORT_CACHE", Path(tempfile.gettempdir()) / "export_cache"))
+VERSION   = 4                     # à incrémenter si le format change
+SEGMENT   = 50_000                # lignes par segment (borne mémoire)
+INTS      = ("id", "rt_ms", "nblettres")
+FLOATS    = db.TIMING_COLS        # télémétrie : float64, NaN si absente
+DATES     = ("created_at",)       # datetime64[us], NaT si absente
+LOCK_FILE = CACHE_DIR.with_name(CACHE_DIR.name + ".lock")   # hors de CACHE_DIR (_reset)
+
+_lock = threading.Lock()
+
+
+@contextmanager
+def _locked():
+    """Accès exclusif au cache : threads du processus, puis processus
+    partageant CACHE_DIR."""
+    with _lock:
+        LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(LOCK_FILE, "a+b") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh, fcntl.LOCK_EX)          # libéré à la fermeture
+                yield
+                return
+            fh.seek(0)
+            msvcrt.locking(fh.fileno(), msvcrt.LK_LOCK, 1)
+            try:
+                yield
+            finally:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def etag(hi: int, key: str = "xlsx") -> str:
+    return f'"v{VERSION}-{key}-{hi}"'
+
+
+# ─── état ───────────────────────────────────────────────────────────────
+def _state() -> dict:
+    try:
+        st = json.loads((CACHE_DIR / "state.json").read_text("utf-8"))
+        if st.get("version") == VERSION:
+            return st
+    except (OSError, ValueError):
+        pass
+    return {"version": VERSION, "last_id": 0, "segments": [], "bodies": {}}
+
+
+def _commit(st: dict) -> None:
+    tmp = CACHE_DIR / f".state.{os.getpid()}.{threading.get_ident()}"
+    tmp.write_text(json.dumps(st), "utf-8")
+    os.replace(tmp, CACHE_DIR / "state.json")       # publication atomique
+
+
+def _reset() -> dict:
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    return _state()
+
+
+# ─── segments ───────────────────────────────────────────────────────────
+def arrays(rows: List[tuple]) -> list:
+    """Lignes de dbo.resultats → colonnes numpy : int64, float64 (NaN),
+    datetime64[us] (NaT), ou '<U…' fixe masqué (np.ma) s'il y a des NULL."""
+    out = []
+    for i, c in enumerate(db.RAW_COLS):
+        v = [r[i] for r in rows]
+        if c in INTS:
+            out.append(np.array(v, dtype=np.int64))
+        elif c in FLOATS:
+            out.append(np.array([np.nan if x is None else x for x in v], dtype=np.float64))
+        elif c in DATES:                # texte ISO (SQLite) ou datetime (pyodbc)
+            out.append(np.array(v, dtype="datetime64[us]"))
+        else:
+            a = np.array(["" if x is None else str(x) for x in v], dtype=str)
+            na = np.array([x is None for x in v])
+            out.append(np.ma.masked_array(a, na) if na.any() else a)
+    return out
+
+
+def _write(rows: List[tuple]) -> dict:
+    name, nulls = f"seg-{rows[0][0]}-{rows[-1][0]}", []
+    for i, a in enumerate(arrays(rows)):
+        if np.ma.isMaskedArray(a):
+            np.save(CACHE_DIR / f"{name}.{i}.na.npy", np.ma.getmaskarray(a), allow_pickle=False)
+            nulls.append(i)
+        np.save(CACHE_DIR / f"{name}.{i}.npy", np.ma.getdata(a), allow_pickle=False)
+    return {"name": name, "n": len(rows), "nulls": nulls}
+
+
+def _columns(seg: dict) -> list:
+    cols = [np.load(CACHE_DIR / f"{seg['name']}.{i}.npy", mmap_mode="r", allow_pickle=False)
+            for i in range(len(db.RAW_COLS))]
+    for i in seg["nulls"]:
+        cols[i] = np.ma.masked_array(cols[i], np.load(CACHE_DIR / f"{seg['name']}.{i}.na.npy",
+                                                      allow_pickle=False))
+    return cols
+
+
+def _gc(st: dict) -> None:
+    """Supprime les segments que state.json ne référence plus (fusionnés,
+    ou écrits par un appel interrompu)."""
+    keep = {s["name"] for s in st["segments"]}
+    for f in CACHE_DIR.glob("seg-*.npy"):
+        if f.name.split(".")[0] not in keep:
+            f.unlink(missing_ok=True)
+
+
+def chunks(st: dict, size: int = db.CHUNK) -> Iterator[List[tuple]]:
+    """Lignes de l'instantané, dans l'ordre des id, par paquets de size
+    (valeurs absentes : None ; created_at : datetime)."""
+    for seg in st["segments"]:
+        cols = _columns(seg)
+        for a in range(0, seg["n"], size):
+            yield list(zip(*(_values(name, c[a:a + size])
+                             for name, c in zip(db.RAW_COLS, cols))))
+
+
+def _values(name: str, a: np.ndarray) -> list:
+    if name not in FLOATS:
+        return a.tolist()
+    cast = int if dict(db.TIMING)[name] == "INT" else float
+    return [None if x != x else cast(x) for x in a.tolist()]
+
+
+def batches(st: dict, size: int = SEGMENT) -> Iterator[list]:
+    """Colonnes de l'instantané (tableaux numpy, ordre de RAW_COLS, cf.
+    arrays) par tranches d'au plus size lignes, pour les formats colonnaires."""
+    for seg in st["segments"]:
+        cols = _columns(seg)
+        for a in range(0, seg["n"], size):
+            yield [c[a:a + size] for c in cols]
+
+
+def _compact(st: dict) -> None:
+    """Fusionne les petits segments consécutifs (appels fréquents) tant que
+    la fusion reste sous SEGMENT lignes."""
+    out, run = [], []
+    for seg in st["segments"] + [None]:
+        if seg is not None and sum(s["n"] for s in run) + seg["n"] <= SEGMENT:
+            run.append(seg)
+            continue
+        if len(run) > 1:
+            rows = [r for rs in chunks({"segments": run}, SEGMENT) for r in rs]
+            out.append(_write(rows))
+        else:
+            out += run
+        run = [seg] if seg is not None else []
+    st["segments"] = out
+
+
+def _refresh(cnx, st: dict, hi: int) -> dict:
+    buf: List[tuple] = []
+    for rows in db.iter_results(cnx, hi=hi, lo=st["last_id"]):
+        buf += rows
+        if len(buf) >= SEGMENT:
+            st["segments"].append(_write(buf)); buf = []
+    if buf:
+        st["segments"].append(_write(buf))
+    st["last_id"] = hi
+    _compact(st)
+    return st
+
+
+# ─── point d'entrée ─────────────────────────────────────────────────────
+def cached(cnx, hi: int, render: Callable[[dict], Optional[bytes]],
+           key: str = "xlsx") -> Optional[bytes]:
+    """Rendu key pour MAX(id) = hi : celui du cache s'il est à jour, sinon
+    instantané complété (id > last_id) puis render(état) mis en cache.
+    key (nom de fichier sûr) distingue les formats / tables."""
+    with _locked():
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        st = _state()
+        if st["last_id"] > hi:
+            st = _reset()
+        body = CACHE_DIR / f"export-{key}.bin"
+        if st["bodies"].get(key) == hi and body.exists():
+            return body.read_bytes()
+        if st["last_id"] < hi:
+            st = _refresh(cnx, st, hi)
+        out = render(st)
+        if out is not None:
+            tmp = CACHE_DIR / f".export.{os.getpid()}.{threading.get_ident()}"
+            tmp.write_bytes(out)
+            os.replace(tmp, body)
+            st["bodies"][key] = hi
+        _commit(st)
+        _gc(st)
+        return out
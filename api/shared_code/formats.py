@@ -0,0 +1,215 @@
+# shared_code/formats.py  –  rendus de download_all
+# ---------------------------------------------------
+#   • xlsx (défaut)  : classeur raw + Stats_*, openpyxl write_only
+#   • parquet, arrow : colonnaires compressés (zstd) via pyarrow ; le brut
+#     part tranche par tranche depuis l'instantané de export_cache
+#   • csv.gz         : CSV UTF-8 compressé, module csv + gzip
+# Sans table précise, les formats autres que xlsx renvoient un zip (non
+# recompressé) d'un fichier par table : raw, Stats_ByGroup, Stats_ByLetters,
+# Stats_ByWord, Stats_Timing (télémétrie d'affichage par participant).
+# Mémoire bornée par une tranche + le nombre de groupes.
+# Source : Snapshot (instantané de export_cache) ou Query (essais filtrés
+# lus en base) ; les stats sont accumulées en une passe sur ces mêmes
+# lignes, donc bornées par le MAX(id) de l'ETag.
+
+from __future__ import annotations
+import csv, gzip, io, tempfile, zipfile
+from typing import Optional
+
+import numpy as np
+
+from . import db, export_cache
+
+# format → (extension, Content-Type)
+FORMATS = {
+    "xlsx":    ("xlsx",    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow":   ("arrow",   "application/vnd.apache.arrow.file"),
+    "csv.gz":  ("csv.gz",  "application/gzip"),
+}
+ZIP     = "application/zip"
+STATS   = (("Stats_ByGroup", "groupe"), ("Stats_ByLetters", "letters_block"),
+           ("Stats_ByWord", "word"), ("Stats_Timing", "timing"))
+TABLES  = ("raw", *(name for name, _ in STATS))
+COLUMNS = (*db.RAW_COLS, "letters_block")
+
+
+def content(fmt: str, table: str | None) -> tuple:
+    """(nom de fichier, Content-Type) de la réponse."""
+    ext, ctype = FORMATS[fmt]
+    if fmt == "xlsx":
+        return "all_results.xlsx", ctype
+    if table:
+        return f"{table}.{ext}", ctype
+    return f"all_results_{ext.replace('.', '_')}.zip", ZIP
+
+
+# ─── sources ────────────────────────────────────────────────────────────
+class Snapshot:
+    """Table complète : instantané incrémental ; stats recalculées sur ses
+    colonnes (dbo.resultats_agg, tenue à jour en continu, peut déjà
+    compter des essais d'id > MAX(id) de l'instantané)."""
+
+    def __init__(self, cnx, st: dict):
+        self.cnx, self.st = cnx, st
+        self.acc: Optional[dict] = None
+        self.timing: Optional[dict] = None
+
+    def empty(self) -> bool:
+        return not any(seg["n"] for seg in self.st["segments"])
+
+    def chunks(self):
+        return export_cache.chunks(self.st)
+
+    def batches(self):
+        return export_cache.batches(self.st)
+
+    def stats(self, grain: str):
+        if self.acc is None:                      # une passe pour tous les grains
+            acc, timing = {}, {}
+            for cols in self.batches():
+                pid = cols[5].tolist()
+                db.accumulate(acc, zip(pid, cols[6].tolist(), cols[7].tolist(),
+                                       cols[1].tolist(), cols[2].tolist()))
+                db.accumulate_timing(timing, zip(pid, *(c.tolist() for c in cols[9:])))
+            self.acc, self.timing = acc, timing
+        if grain == "timing":
+            return db.timing_frame(self.timing)
+        return db.acc_frame(self.acc, grain)
+
+
+class Query:
+    """Essais filtrés (db.where), paginés si size ; les stats viennent
+    d'accumulateurs remplis pendant la lecture du brut."""
+
+    def __init__(self, cnx, filters: dict, hi: int, size: int | None = None, number: int = 0):
+        self.cnx, self.filters, self.hi = cnx, filters, hi
+        self.size, self.number = size, number
+        self.acc: Optional[dict] = None
+        self.timing: Optional[dict] = None
+        self.last_id: Optional[int] = None          # reprise : since_id suivant
+
+    def _rows(self):
+        if self.size:
+            return db.page(self.cnx, self.filters, self.size, self.number, self.hi)
+        return db.iter_results(self.cnx, hi=self.hi, filters=self.filters)
+
+    def empty(self) -> bool:
+        first = self.number * self.size if self.size else 0       # 1re ligne attendue
+        return next(db.page(self.cnx, self.filters, 1, first, self.hi), None) is None
+
+    def chunks(self):
+        acc, timing = {}, {}
+        for rows in self._rows():
+            db.accumulate(acc, ((r[5], r[6], r[7], r[1], r[2]) for r in rows))
+            db.accumulate_timing(timing, ((r[5], *r[9:]) for r in rows))
+            self.last_id = rows[-1][0]
+            yield rows
+        self.acc, self.timing = acc, timing
+
+    def batches(self):
+        for rows in self.chunks():
+            yield export_cache.arrays(rows)
+
+    def stats(self, grain: str):
+        if self.acc is None:
+            for _ in self.chunks():
+                pass
+        if grain == "timing":
+            return db.timing_frame(self.timing)
+        return db.acc_frame(self.acc, grain)
+
+
+def _blocks(nblettres: np.ndarray) -> np.ndarray:
+    """letters_block vectorisé (même découpage que db.letters_block)."""
+    return np.select([np.isin(nblettres, (4, 5)), np.isin(nblettres, (6, 7)),
+                      np.isin(nblettres, (8, 9))], ["4_5", "6_7", "8_9"], "10_11")
+
+
+# ─── xlsx ───────────────────────────────────────────────────────────────
+def _xlsx(src, fh) -> None:
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("raw")
+    ws.append(list(COLUMNS))
+    for rows in src.chunks():
+        for r in rows:
+            ws.append([*r, db.letters_block(r[7])])
+    for name, grain in STATS:
+        df = src.stats(grain)
+        ws = wb.create_sheet(name)
+        ws.append(list(df.columns))
+        for r in df.itertuples(index=False):
+            ws.append([None if isinstance(v, float) and v != v else v for v in r])
+    wb.save(fh)
+
+
+# ─── pyarrow (parquet / arrow) ──────────────────────────────────────────
+def _arrow(fmt: str, src, table: str, fh) -> None:
+    import pyarrow as pa
+    if table == "raw":
+        schema = pa.schema([(c, pa.int64() if c in export_cache.INTS else
+                                pa.float64() if c in export_cache.FLOATS else
+                                pa.timestamp("us") if c in export_cache.DATES else pa.string())
+                            for c in COLUMNS])
+        batches = (pa.record_batch([pa.array(a, f.type, from_pandas=True) for a, f in
+                                    zip([*cols, _blocks(np.asarray(cols[7]))], schema)],
+                                   schema=schema)
+                   for cols in src.batches())
+    else:
+        t = pa.Table.from_pandas(src.stats(dict(STATS)[table]), preserve_index=False)
+        schema, batches = t.schema, t.to_batches()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        with pq.ParquetWriter(fh, schema, compression="zstd") as w:
+            for b in batches:
+                w.write_batch(b)
+    else:
+        opts = pa.ipc.IpcWriteOptions(compression="zstd")
+        with pa.ipc.new_file(fh, schema, options=opts) as w:
+            for b in batches:
+                w.write_batch(b)
+
+
+# ─── csv.gz ─────────────────────────────────────────────────────────────
+def _csv(src, table: str, fh) -> None:
+    with gzip.GzipFile(fileobj=fh, mode="wb", mtime=0) as gz, \
+         io.TextIOWrapper(gz, encoding="utf-8", newline="") as txt:
+        w = csv.writer(txt)
+        if table == "raw":
+            w.writerow(COLUMNS)
+            for rows in src.chunks():
+                w.writerows((*r, db.letters_block(r[7])) for r in rows)
+        else:
+            src.stats(dict(STATS)[table]).to_csv(txt, index=False)
+
+
+def _table(fmt: str, src, table: str, fh) -> None:
+    if fmt == "csv.gz":
+        _csv(src, table, fh)
+    else:
+        _arrow(fmt, src, table, fh)
+
+
+# ─── point d'entrée ─────────────────────────────────────────────────────
+def render(fmt: str, src, table: str | None = None) -> Optional[bytes]:
+    """Corps de la réponse, ou None si la source est vide."""
+    if src.empty():
+        return None
+    with tempfile.TemporaryFile() as fh:
+        if fmt == "xlsx":
+            _xlsx(src, fh)
+        elif table:
+            _table(fmt, src, table, fh)
+        else:
+            ext = FORMATS[fmt][0]
+            with zipfile.ZipFile(fh, "w", zipfile.ZIP_STORED) as zf:
+                for name in TABLES:
+                    with tempfile.TemporaryFile() as part:
+                        _table(fmt, src, name, part)
+                        part.seek(0)
+                        with zf.open(f"{name}.{ext}", "w") as out:
+                            for block in iter(lambda: part.read(1 << 20), b""):
+                                out.write(block)
+        fh.seek(0)
+        return fh.read()
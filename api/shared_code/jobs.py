@@ -0,0 +1,157 @@
+# shared_code/jobs.py  –  file durable des rapports par participant
+# ---------------------------------------------------
+# save_results répond dès le COMMIT SQL ; le classeur et le dépôt Blob
+# passent par cette file (SQLite WAL, survit au redémarrage de l'hôte).
+#   • une ligne par participant : un nouvel envoi remplace la charge et
+#     incrémente version → au plus un rapport en attente par participant
+#   • claim() réserve un lot (BEGIN IMMEDIATE) avec un bail : un job dont
+#     le worker est mort redevient disponible à l'expiration du bail
+#   • échec → nouvel essai après BACKOFF·2^(n-1) s, « dead » après
+#     MAX_ATTEMPTS ; retry_dead() les remet en attente
+#   • done() ne valide que la version traitée : un envoi arrivé pendant
+#     le traitement reste en attente
+#
+# REPORT_QUEUE = chemin du fichier (défaut : répertoire temporaire).
+
+from __future__ import annotations
+import json, logging, os, sqlite3, tempfile, threading, time
+from contextlib import closing
+from typing import Callable, Dict, List, Tuple
+
+QUEUE        = os.getenv("REPORT_QUEUE", os.path.join(tempfile.gettempdir(), "report_jobs.sqlite"))
+BATCH        = 16
+LEASE        = 300          # s, bail d'un job réservé
+BACKOFF      = 30           # s, doublé à chaque échec
+MAX_ATTEMPTS = 6
+POLL         = 60           # s, réveil périodique du worker (reprises différées)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs(
+    participant TEXT PRIMARY KEY,
+    payload     TEXT    NOT NULL,
+    version     INTEGER NOT NULL DEFAULT 1,
+    state       TEXT    NOT NULL DEFAULT 'pending',   -- pending | running | done | dead
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    not_before  REAL    NOT NULL DEFAULT 0,           -- reprise / fin du bail
+    error       TEXT,
+    updated_at  REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_ready ON jobs(state, not_before);
+"""
+
+Job     = Tuple[str, int, list]                       # participant, version, essais
+Handler = Callable[[str, list], None]
+
+
+def _cnx(path: str | None = None) -> sqlite3.Connection:
+    cnx = sqlite3.connect(path or QUEUE, timeout=30, isolation_level=None)
+    cnx.execute("PRAGMA journal_mode=WAL")
+    cnx.executescript(SCHEMA)
+    return cnx
+
+
+# ─── producteur ─────────────────────────────────────────────────────────
+def enqueue(pid: str, data: list, path: str | None = None) -> None:
+    """(Re)met en attente le rapport de pid avec les essais data."""
+    with closing(_cnx(path)) as cnx:
+        cnx.execute("""
+            INSERT INTO jobs(participant, payload, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT(participant) DO UPDATE SET
+                payload = excluded.payload, version = version + 1,
+                state = 'pending', attempts = 0, not_before = 0, error = NULL,
+                updated_at = excluded.updated_at""",
+            (pid, json.dumps(data, ensure_ascii=False), time.time()))
+
+
+# ─── consommateur ───────────────────────────────────────────────────────
+def claim(n: int = BATCH, path: str | None = None) -> List[Job]:
+    """Réserve jusqu'à n jobs prêts (en attente, ou bail expiré)."""
+    now = time.time()
+    with closing(_cnx(path)) as cnx:
+        cnx.execute("BEGIN IMMEDIATE")
+        rows = cnx.execute("""
+            SELECT participant, version, payload FROM jobs
+            WHERE state IN ('pending', 'running') AND not_before <= ?
+            ORDER BY not_before LIMIT ?""", (now, n)).fetchall()
+        cnx.executemany("""
+            UPDATE jobs SET state = 'running', attempts = attempts + 1,
+                            not_before = ?, updated_at = ?
+            WHERE participant = ? AND version = ?""",
+            [(now + LEASE, now, p, v) for p, v, _ in rows])
+        cnx.execute("COMMIT")
+    return [(p, v, json.loads(d)) for p, v, d in rows]
+
+
+def done(pid: str, version: int, path: str | None = None) -> None:
+    with closing(_cnx(path)) as cnx:
+        cnx.execute("""
+            UPDATE jobs SET state = 'done', payload = '', error = NULL, updated_at = ?
+            WHERE participant = ? AND version = ?""", (time.time(), pid, version))
+
+
+def failed(pid: str, version: int, exc: Exception, path: str | None = None) -> None:
+    now = time.time()
+    with closing(_cnx(path)) as cnx:
+        cnx.execute("""
+            UPDATE jobs SET
+                state      = CASE WHEN attempts >= ? THEN 'dead' ELSE 'pending' END,
+                not_before = ? + ? * (1 << (attempts - 1)),
+                error = ?, updated_at = ?
+            WHERE participant = ? AND version = ?""",
+            (MAX_ATTEMPTS, now, BACKOFF, f"{type(exc).__name__}: {exc}", now, pid, version))
+
+
+def drain(handler: Handler, batch: int = BATCH, path: str | None = None) -> Dict[str, int]:
+    """Traite les lots prêts jusqu'à épuisement ; renvoie {ok, failed}."""
+    out = {"ok": 0, "failed": 0}
+    while jobs := claim(batch, path):
+        for pid, version, data in jobs:
+            try:
+                handler(pid, data)
+            except Exception as exc:
+                logging.exception("report job %s", pid)
+                failed(pid, version, exc, path)
+                out["failed"] += 1
+            else:
+                done(pid, version, path)
+                out["ok"] += 1
+    return out
+
+
+def retry_dead(path: str | None = None) -> int:
+    with closing(_cnx(path)) as cnx:
+        return cnx.execute("""
+            UPDATE jobs SET state = 'pending', attempts = 0, not_before = 0
+            WHERE state = 'dead'""").rowcount
+
+
+def status(path: str | None = None) -> Dict[str, int]:
+    with closing(_cnx(path)) as cnx:
+        return dict(cnx.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+
+
+# ─── worker en tâche de fond (un par processus hôte) ────────────────────
+_wake   = threading.Event()
+_lock   = threading.Lock()
+_thread = None
+
+
+def _loop(handler: Handler) -> None:
+    while True:
+        _wake.wait(POLL)
+        _wake.clear()
+        try:
+            drain(handler)
+        except Exception:
+            logging.exception("report worker")
+
+
+def kick(handler: Handler) -> None:
+    """Réveille le worker du processus (le démarre au premier appel)."""
+    global _thread
+    with _lock:
+        if _thread is None or not _thread.is_alive():
+            _thread = threading.Thread(target=_loop, args=(handler,),
+                                       name="report-worker", daemon=True)
+            _thread.start()
+    _wake.set()
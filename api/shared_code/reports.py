@@ -0,0 +1,196 @@
+# shared_code/reports.py  –  artefacts et classeur Excel d'un participant
+# ---------------------------------------------------
+# Le job de la file (process) dépose les essais de la phase test en
+# Parquet (zstd, quelques ko, sans openpyxl) :
+#   • participants/{participant}.parquet        artefact du participant
+#   • dataset/date=AAAA-MM-JJ/p_{participant}.{horodatage}.parquet
+#                                               jeu consolidé partitionné par
+#                                               jour du premier envoi (Hive :
+#                                               pyarrow.dataset / read_parquet
+#                                               lisent dataset/ en une table)
+# L'artefact est écrasé à chaque envoi (job rejouable) et garde le jour de
+# sa partition (métadonnée Parquet) : un nouvel envoi, même un autre jour,
+# remplace le participant dans cette partition au lieu de le dupliquer.
+# Les fragments ne sont jamais réécrits (nom horodaté) ; l'envoi supprime
+# les fragments antérieurs du participant.  compact(jour) fond les
+# fragments d'un jour dans dataset/date=…/part-0.parquet et ne supprime
+# que ceux qu'il a lus.  Un renvoi d'un participant déjà compacté
+# réécrit part-0 (ses lignes remplacées) au lieu d'ajouter un fragment :
+# le jeu ne le compte jamais deux fois.  process et compact d'une même
+# partition ne doivent pas tourner en parallèle (un seul worker de file,
+# compact en cron).
+# Le classeur (tirage, Stats_ByGroup, Stats_ByLetters) n'est plus produit
+# qu'à la demande, depuis l'artefact (fonction participant_report).
+# Dépôt : shared_code.blobs (conteneur Blob, ou répertoire en file://).
+
+from __future__ import annotations
+import io, time
+from datetime import date, datetime, timezone
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .blobs import open_blobs
+from .db import letters_block
+from .timing import stage
+
+XLSX    = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PARQUET = "application/vnd.apache.parquet"
+PART    = "part-0.parquet"                   # fichier compacté d'une partition
+DAY_KEY = b"dataset.date"                    # métadonnée : jour de la partition
+
+# colonnes agrégées (moyenne + écart-type) après n_sd et rt_ms
+MEASURES = ("nblettres", "nbphons", "old20", "pld20",
+            "freqfilms2", "freqlemfilms2", "freqlemlivres", "freqlivres")
+
+
+# ─── noms de blob ───────────────────────────────────────────────────────
+def slug(pid: str) -> str:
+    """Identifiant utilisable comme nom de fichier, réversible (unquote) :
+    encodage pourcent de tout caractère hors [A-Za-z0-9_~-], point compris
+    (ni « .. » ni séparateur ambigu dans les noms de blob ; vide → « % »)."""
+    return quote(pid, safe="").replace(".", "%2E") or "%"
+
+
+def artifact_name(pid: str) -> str:
+    return f"participants/{slug(pid)}.parquet"
+
+
+def partition(day: date) -> str:
+    return f"dataset/date={day.isoformat()}/"
+
+
+def fragments(day: date, pid: str) -> str:
+    """Préfixe des fragments d'un participant (le slug n'a pas de « . »)."""
+    return f"{partition(day)}p_{slug(pid)}."
+
+
+def fragment(day: date, pid: str) -> str:
+    """Nouveau fragment, horodaté (ns, hexadécimal : ordre des envois)."""
+    return f"{fragments(day, pid)}{time.time_ns():x}.parquet"
+
+
+def legacy_name(pid: str) -> str:
+    """Classeur déposé par les versions précédentes."""
+    return f"{pid}_results.xlsx"
+
+
+# ─── données ────────────────────────────────────────────────────────────
+def frame(data: list) -> pd.DataFrame:
+    """Essais postés → table typée : mesures numériques (NaN si absentes),
+    autres champs en texte, + letters_block."""
+    df = pd.DataFrame(data)
+    for c in ("rt_ms", *MEASURES):
+        if c in df:
+            df[c] = pd.to_numeric(df[c], errors="coerce")
+    for c in df.columns[df.dtypes == object]:
+        df[c] = df[c].map(lambda v: v if v is None or isinstance(v, str) else str(v))
+    df["letters_block"] = df["nblettres"].apply(letters_block)
+    return df
+
+
+def parquet(df: pd.DataFrame, day: date | None = None) -> bytes:
+    """Parquet zstd ; day : jour de partition, gardé en métadonnée."""
+    t = pa.Table.from_pandas(df, preserve_index=False)
+    if day is not None:
+        t = t.replace_schema_metadata({**(t.schema.metadata or {}),
+                                       DAY_KEY: day.isoformat().encode()})
+    buf = io.BytesIO()
+    pq.write_table(t, buf, compression="zstd")
+    return buf.getvalue()
+
+
+def partition_day(body: bytes | None) -> date | None:
+    """Jour de partition d'un artefact (None : absent ou antérieur)."""
+    if body is None:
+        return None
+    meta = pq.read_schema(pa.BufferReader(body)).metadata or {}
+    return date.fromisoformat(meta[DAY_KEY].decode()) if DAY_KEY in meta else None
+
+
+def stats_by(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Les 19 colonnes n_sd, rt_ms_*, {mesure}_mean / _sd par valeur de key."""
+    spec = {"n_sd": ("rt_ms", "count"),
+            "rt_ms_mean": ("rt_ms", "mean"), "rt_ms_sd": ("rt_ms", "std")}
+    for c in MEASURES:
+        spec[f"{c}_mean"] = (c, "mean")
+        spec[f"{c}_sd"]   = (c, "std")
+    return (df.groupby(key).agg(**spec)
+              .reset_index()
+              .rename(columns={key: f"{key}_sd"}))
+
+
+def workbook(df: pd.DataFrame) -> bytes:
+    """Classeur en mémoire à partir des essais de la phase test (frame)."""
+    buf = io.BytesIO()
+    with pd.ExcelWriter(buf, engine="openpyxl") as wr:
+        df.to_excel                          (wr, sheet_name="tirage",          index=False)
+        stats_by(df, "groupe").to_excel      (wr, sheet_name="Stats_ByGroup",   index=False)
+        stats_by(df, "letters_block").to_excel(wr, sheet_name="Stats_ByLetters", index=False)
+    return buf.getvalue()
+
+
+# ─── job de la file ─────────────────────────────────────────────────────
+def process(pid: str, data: list) -> None:
+    """Job de la file : artefact Parquet + fragment dans la partition du
+    premier envoi, ou remplacement dans part-0 si le participant y est
+    déjà compacté (lève si échec)."""
+    bl = open_blobs()
+    with stage("upload"):
+        day = (partition_day(bl.get(artifact_name(pid)))
+               or datetime.now(timezone.utc).date())
+        part = bl.get(partition(day) + PART)
+    with stage("parquet"):
+        df = frame(data)
+        body = parquet(df, day)
+        if part is not None and _holds(part, pid):
+            old = pd.read_parquet(io.BytesIO(part))
+            part = parquet(pd.concat([old[old["participant"] != pid], df], ignore_index=True))
+        else:
+            part = None
+    with stage("upload"):
+        name = None if part is not None else fragment(day, pid)
+        bl.put(artifact_name(pid), body, PARQUET)
+        if part is not None:
+            bl.put(partition(day) + PART, part, PARQUET)
+        else:
+            bl.put(name, body, PARQUET)
+        for old in bl.list(fragments(day, pid)):     # envoi précédent non compacté
+            if old != name:
+                bl.delete(old)
+
+
+def _holds(body: bytes, pid: str) -> bool:
+    """Vrai si le Parquet body contient des lignes de pid (colonne seule)."""
+    col = pq.read_table(pa.BufferReader(body), columns=["participant"])["participant"]
+    return pid in set(col.to_pylist())
+
+
+def compact(day: date) -> int:
+    """Fond les fragments de la partition day dans PART ; un fragment
+    remplace les lignes du même participant déjà compactées (le plus
+    récent l'emporte).  Seuls les fragments lus sont supprimés : un envoi
+    concurrent crée un nouveau nom, fondu au passage suivant.
+    Renvoie le nombre de fragments fondus."""
+    bl, prefix = open_blobs(), partition(day)
+    read, latest = [], {}
+    for n in bl.list(prefix + "p_"):                 # ordre : participant, envoi
+        body = bl.get(n) if n.endswith(".parquet") else None
+        if body is None:                             # remplacé entre-temps
+            continue
+        f = pd.read_parquet(io.BytesIO(body))
+        read.append(n)
+        latest |= {p: f for p in f["participant"].unique()}
+    if not read:
+        return 0
+    frags = list({id(f): f for f in latest.values()}.values())
+    old = bl.get(prefix + PART)
+    if old is not None:
+        old = pd.read_parquet(io.BytesIO(old))
+        frags.insert(0, old[~old["participant"].isin(latest)])
+    bl.put(prefix + PART, parquet(pd.concat(frags, ignore_index=True)), PARQUET)
+    for n in read:
+        bl.delete(n)
+    return len(read)
@@ -0,0 +1,207 @@
+# shared_code/store.py  –  backends de stockage des résultats
+# ---------------------------------------------------
+# db.py porte les opérations (insertion, lecture, agrégats) ; chaque
+# backend fournit la connexion, le schéma et les fragments SQL propres
+# au moteur :
+#   • OdbcStore   : Azure SQL via pyodbc (fast_executemany, MERGE,
+#                   TOP / OFFSET … FETCH)
+#   • SqliteStore : fichier local, même schéma sous dbo ; WAL +
+#                   synchronous=NORMAL (pas de fsync par COMMIT),
+#                   transactions BEGIN IMMEDIATE (un écrivain à la fois,
+#                   sans échec de promotion de verrou)
+# SQL_CONN = chaîne ODBC, ou « sqlite:///chemin.db » (mesures hors ligne,
+# petites sessions de labo sur un portable).
+# Colonnes TIMING (télémétrie rAF de l'essai, NULL si le client ne la
+# fournit pas) : ajoutées aux tables existantes par ensure_schema, que
+# db.connect() passe une fois par processus (Azure SQL), ou à chaque
+# connexion (SQLite).
+
+from __future__ import annotations
+import sqlite3
+from functools import lru_cache
+
+SQLITE = "sqlite:///"
+
+# télémétrie d'affichage d'un essai : (colonne, type SQL commun)
+TIMING = (("frame_ms", "FLOAT"),        # période d'image médiane mesurée
+          ("frames", "INT"),            # intervalles rAF observés
+          ("missed_frames", "INT"),     # images sautées (intervalle ≥ 1,5 période)
+          ("max_jitter_ms", "FLOAT"),   # écart maximal à la période nominale
+          ("cross_ms", "FLOAT"),        # durées effectives : croix,
+          ("show_ms", "FLOAT"),         #   mot (cumulé sur les cycles),
+          ("hide_ms", "FLOAT"))         #   masque (idem)
+
+
+class SqliteStore:
+    dialect = "sqlite"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS dbo.resultats(
+        id          INTEGER PRIMARY KEY AUTOINCREMENT,
+        word        TEXT,
+        rt_ms       INTEGER,
+        response    TEXT,
+        phase       TEXT,
+        participant TEXT,
+        groupe      TEXT,
+        nblettres   INTEGER,
+        created_at  TEXT DEFAULT CURRENT_TIMESTAMP,
+        frame_ms    REAL,
+        frames      INTEGER,
+        missed_frames INTEGER,
+        max_jitter_ms REAL,
+        cross_ms    REAL,
+        show_ms     REAL,
+        hide_ms     REAL
+    );
+    CREATE TABLE IF NOT EXISTS dbo.resultats_agg(
+        grain       TEXT,
+        participant TEXT,
+        k           TEXT,
+        n           INTEGER,
+        s1          REAL,
+        s2          REAL,
+        PRIMARY KEY (grain, participant, k)
+    );
+    CREATE INDEX IF NOT EXISTS dbo.ix_resultats_participant ON resultats(participant, created_at);
+    CREATE INDEX IF NOT EXISTS dbo.ix_resultats_created_at  ON resultats(created_at);
+    CREATE INDEX IF NOT EXISTS dbo.ix_resultats_phase       ON resultats(phase, id);
+    """
+
+    UPSERT_AGG = """
+        INSERT INTO dbo.resultats_agg(grain, participant, k, n, s1, s2)
+        VALUES (?,?,?,?,?,?)
+        ON CONFLICT(grain, participant, k) DO UPDATE SET
+            n = n + excluded.n, s1 = s1 + excluded.s1, s2 = s2 + excluded.s2"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @staticmethod
+    def _migrate(cnx) -> None:
+        """Colonnes TIMING d'une base créée avant la télémétrie."""
+        have = {r[1] for r in cnx.execute("PRAGMA dbo.table_info(resultats)")}
+        for col, typ in TIMING:
+            if col not in have:
+                try:
+                    cnx.execute(f"ALTER TABLE dbo.resultats ADD COLUMN {col} {typ}")
+                except sqlite3.OperationalError:   # ajoutée entre-temps par une autre connexion
+                    pass
+
+    def connect(self) -> sqlite3.Connection:
+        # base principale en mémoire, fichier attaché sous le schéma dbo :
+        # « dbo.resultats » se lit alors comme sur Azure SQL
+        cnx = sqlite3.connect(":memory:", timeout=30, check_same_thread=False,
+                              factory=_SqliteConnection)
+        cnx.store = self
+        cnx.execute("ATTACH DATABASE ? AS dbo", (self.path,))
+        cnx.execute("PRAGMA dbo.journal_mode=WAL")
+        cnx.execute("PRAGMA dbo.synchronous=NORMAL")
+        cnx.executescript(self.SCHEMA)
+        self._migrate(cnx)
+        return cnx
+
+    def begin(self, cur) -> None:
+        cur.execute("BEGIN IMMEDIATE")
+
+    def lock_results(self, cur) -> None:
+        self.begin(cur)                           # un seul écrivain jusqu'au COMMIT
+
+    def ensure_schema(self, cnx) -> None:
+        pass                                      # créé à la connexion
+
+    # pagination : (préfixe SELECT, suffixe) de « n premières lignes »,
+    # puis clause et paramètres d'une page
+    first = ("", " LIMIT ?")
+
+    def page(self, size: int, offset: int) -> tuple:
+        return " LIMIT ? OFFSET ?", [size, offset]
+
+
+class _SqliteConnection(sqlite3.Connection):
+    store: SqliteStore
+
+
+class OdbcStore:
+    dialect = "mssql"
+
+    # tables, index et colonnes manquants, créés à la première connexion
+    # du processus (db.connect → ensure_schema) ; les index rendent
+    # seekables les filtres de download_all (id : clé primaire, since_id
+    # et tri) ; INCLUDE évite les lookups de phase
+    SCHEMA = """
+    IF OBJECT_ID('dbo.resultats_agg') IS NULL
+    CREATE TABLE dbo.resultats_agg(
+        grain       VARCHAR(16)   NOT NULL,
+        participant NVARCHAR(100) NOT NULL,
+        k           NVARCHAR(100) NOT NULL,
+        n           INT           NOT NULL,
+        s1          FLOAT         NOT NULL,
+        s2          FLOAT         NOT NULL,
+        CONSTRAINT pk_resultats_agg PRIMARY KEY (grain, participant, k)
+    );
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_resultats_participant')
+        CREATE INDEX ix_resultats_participant ON dbo.resultats(participant, created_at)
+            INCLUDE (phase, groupe);
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_resultats_created_at')
+        CREATE INDEX ix_resultats_created_at ON dbo.resultats(created_at)
+            INCLUDE (phase, participant);
+    IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_resultats_phase')
+        CREATE INDEX ix_resultats_phase ON dbo.resultats(phase, id);
+    """ + "".join(f"""
+    IF COL_LENGTH('dbo.resultats', '{col}') IS NULL
+        ALTER TABLE dbo.resultats ADD {col} {typ} NULL;""" for col, typ in TIMING)
+
+    UPSERT_AGG = """
+        MERGE dbo.resultats_agg WITH (HOLDLOCK) AS t
+        USING (VALUES (?,?,?,?,?,?)) AS s(grain, participant, k, n, s1, s2)
+           ON t.grain = s.grain AND t.participant = s.participant AND t.k = s.k
+        WHEN MATCHED THEN
+            UPDATE SET n = t.n + s.n, s1 = t.s1 + s.s1, s2 = t.s2 + s.s2
+        WHEN NOT MATCHED THEN
+            INSERT (grain, participant, k, n, s1, s2)
+            VALUES (s.grain, s.participant, s.k, s.n, s.s1, s.s2);"""
+
+    def __init__(self, conn_str: str):
+        self.conn_str = conn_str
+
+    def connect(self):
+        import pyodbc
+        return pyodbc.connect(self.conn_str, timeout=10)
+
+    def begin(self, cur) -> None:
+        # transaction implicite (autocommit off) ; pyodbc envoie le
+        # tableau de paramètres d'un executemany en un aller-retour
+        cur.fast_executemany = True
+
+    def lock_results(self, cur) -> None:
+        # verrou partagé de table tenu jusqu'au COMMIT (HOLDLOCK = SERIALIZABLE) :
+        # attend les insertions en cours, bloque les suivantes
+        cur.execute("SELECT COUNT(*) FROM dbo.resultats WITH (TABLOCK, HOLDLOCK)").fetchone()
+
+    def ensure_schema(self, cnx) -> None:
+        cnx.cursor().execute(self.SCHEMA)
+        cnx.commit()
+
+    first = ("TOP (?) ", "")
+
+    def page(self, size: int, offset: int) -> tuple:
+        return " OFFSET ? ROWS FETCH NEXT ? ROWS ONLY", [offset, size]
+
+
+@lru_cache(maxsize=None)
+def open_store(conn_str: str):
+    """Backend d'une chaîne de connexion (un objet par chaîne)."""
+    if not conn_str:
+        raise RuntimeError("SQL_CONN non défini (chaîne ODBC ou sqlite:///chemin.db)")
+    if conn_str.startswith(SQLITE):
+        return SqliteStore(conn_str[len(SQLITE):])
+    return OdbcStore(conn_str)
+
+
+def backend(cnx):
+    """Backend d'une connexion ouverte (une enveloppe peut fixer .store)."""
+    st = getattr(cnx, "store", None)
+    if st is not None:
+        return st
+    return SqliteStore(":memory:") if isinstance(cnx, sqlite3.Connection) else OdbcStore("")
@@ -0,0 +1,38 @@
+# shared_code/timing.py  –  durées par étape d'une requête
+# ---------------------------------------------------
+# Les fonctions balisent leurs étapes avec stage("parse"), stage("insert")…
+# Sans collecteur actif (production), stage() ne mesure rien. Un banc
+# (load_test.py) ouvre collect() autour d'un appel et récupère
+# {étape: secondes} ; le collecteur suit le contexte (contextvars), donc
+# chaque thread ou requête a le sien.
+
+from __future__ import annotations
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+_current: ContextVar[Optional[Dict[str, float]]] = ContextVar("timing", default=None)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    d = _current.get()
+    if d is None:
+        yield
+        return
+    tic = time.perf_counter()
+    try:
+        yield
+    finally:
+        d[name] = d.get(name, 0.0) + time.perf_counter() - tic
+
+
+@contextmanager
+def collect() -> Iterator[Dict[str, float]]:
+    d: Dict[str, float] = {}
+    tok = _current.set(d)
+    try:
+        yield d
+    finally:
+        _current.reset(tok)
@@ -2,16 +2,28 @@
 """
 Génération des 80 mots (tirage contraint) – script autonome.
 En sortie : tirage.json (UTF-8, orient='records').
+Mode lot (--count N) : N listes en JSONL, une ligne par liste, réparties
+sur un pool de processus avec un flux aléatoire indépendant par liste.
 """
 
 from __future__ import annotations
-import random, sys
+import argparse, json, multiprocessing as mp, random, statistics, sys, time
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
+import lexicon_cache, lexique_blocks
+from ld20 import NeighbourIndex
+from sampler import Sampler, TirageStats, stage
+from solver import Infeasible, solve
+
 # ─── paramètres identiques à l’app ──────────────────────────────────────
 XLSX            = Path(__file__).with_name("Lexique.xlsx")
+CSV             = Path(__file__).with_name("Lexique383.csv")
+SOURCE          = "xlsx"          # "xlsx" (Feuil1…4) | "csv" (blocs de longueur du CSV)
 OUT             = Path(__file__).with_name("tirage.json")
+OUT_BATCH       = Path(__file__).with_name("tirages.jsonl")
+OUT_STATS       = Path(__file__).with_name("tirage_stats.json")
 
 MEAN_FACTOR_OLDPLD = 0.40
 MEAN_DELTA         = {"letters": 0.65, "phons": 0.65}
@@ -21,6 +33,8 @@ N_PER_FEUIL_TAG = 5
 TAGS            = ("LOW_OLD", "HIGH_OLD", "LOW_PLD", "HIGH_PLD")
 MAX_TRY_TAG     = 1_000
 MAX_TRY_FULL    = 1_000
+SOLVER          = "random"        # "random" (rejet) | "backtrack" (DFS bornée)
+NO_NEIGHBOURS   = False           # True : pas deux voisins orthographiques dans la liste
 rng             = random.Random()
 NUM_BASE        = ["nblettres", "nbphons", "old20", "pld20"]
 
@@ -39,8 +53,12 @@ def shuffled(df: pd.DataFrame) -> pd.DataFrame:
 def cat_code(tag: str) -> int:          # -1 (LOW) / +1 (HIGH)
     return -1 if "LOW" in tag else 1
 
-# ─── chargement Excel ────────────────────────────────────────────────────
+# ─── chargement Excel / CSV (via le cache binaire) ───────────────────────
 def load_sheets() -> dict[str, dict]:
+    if SOURCE=="csv": return lexique_blocks.load(CSV)
+    return lexicon_cache.load(XLSX, _parse_sheets, "compute_tirage")
+
+def _parse_sheets() -> dict[str, dict]:
     if not XLSX.exists():
         sys.exit(f"{XLSX.name} introuvable.")
     xls = pd.ExcelFile(XLSX)
@@ -72,58 +90,125 @@ def masks(df:pd.DataFrame,s):            # s = stats
             "LOW_PLD":df.pld20<s["m_pld20"]-s["sd_pld20"],
             "HIGH_PLD":df.pld20>s["m_pld20"]+s["sd_pld20"]}
 
-def sd_ok(sub:pd.DataFrame,s,fqs):
-    return (sub.nblettres.std(ddof=0)<=s["sd_nblettres"]*SD_MULTIPLIER["letters"] and
-            sub.nbphons .std(ddof=0)<=s["sd_nbphons"]  *SD_MULTIPLIER["phons"]   and
-            sub.old20   .std(ddof=0)<=s["sd_old20"]    *SD_MULTIPLIER["old20"]   and
-            sub.pld20   .std(ddof=0)<=s["sd_pld20"]    *SD_MULTIPLIER["pld20"]   and
-            all(sub[c].std(ddof=0)<=s[f"sd_{c}"]*SD_MULTIPLIER["freq"] for c in fqs))
-
-def mean_lp_ok(sub:pd.DataFrame,s):
-    return (abs(sub.nblettres.mean()-s["m_nblettres"])<=MEAN_DELTA["letters"]*s["sd_nblettres"] and
-            abs(sub.nbphons.mean() -s["m_nbphons"])   <=MEAN_DELTA["phons"]  *s["sd_nbphons"])
-
-def pick_five(tag,feuille,used,F):
-    df,s,fqs = F[feuille]["df"],F[feuille]["stats"],F[feuille]["freq_cols"]
-    pool=df.loc[masks(df,s)[tag] & ~df.ortho.isin(used)]
-    if len(pool)<N_PER_FEUIL_TAG: return None
-    for _ in range(MAX_TRY_TAG):
-        samp=pool.sample(N_PER_FEUIL_TAG,random_state=rng.randint(0,1_000_000)).copy()
-        if tag=="LOW_OLD" and samp.old20.mean()>=s["m_old20"]-MEAN_FACTOR_OLDPLD*s["sd_old20"]: continue
-        if tag=="HIGH_OLD"and samp.old20.mean()<=s["m_old20"]+MEAN_FACTOR_OLDPLD*s["sd_old20"]: continue
-        if tag=="LOW_PLD" and samp.pld20.mean()>=s["m_pld20"]-MEAN_FACTOR_OLDPLD*s["sd_pld20"]: continue
-        if tag=="HIGH_PLD"and samp.pld20.mean()<=s["m_pld20"]+MEAN_FACTOR_OLDPLD*s["sd_pld20"]: continue
-        if not mean_lp_ok(samp,s):continue
-        if sd_ok(samp,s,fqs):
-            samp["source"]=feuille; samp["group"]=tag
-            samp["old_cat"]=cat_code(tag) if "OLD" in tag else 0
-            samp["pld_cat"]=cat_code(tag) if "PLD" in tag else 0
-            return samp
-    return None
-
-def build_sheet() -> pd.DataFrame:
-    F=load_sheets(); freqs=F["all_freq_cols"]
+def make_sampler(F, no_neighbours:bool|None=None) -> Sampler:
+    nb=NO_NEIGHBOURS if no_neighbours is None else no_neighbours
+    idx=NeighbourIndex(w for sh,d in F.items() if sh!="all_freq_cols"
+                       for w in d["df"]["ortho"]) if nb else None
+    return Sampler(F, masks, n_pick=N_PER_FEUIL_TAG, mean_factor=MEAN_FACTOR_OLDPLD,
+                   mean_delta=MEAN_DELTA, sd_mult=SD_MULTIPLIER, max_try=MAX_TRY_TAG,
+                   neighbours=idx)
+
+def tagged(samp:pd.DataFrame,feuille,tag):
+    samp["source"]=feuille; samp["group"]=tag
+    samp["old_cat"]=cat_code(tag) if "OLD" in tag else 0
+    samp["pld_cat"]=cat_code(tag) if "PLD" in tag else 0
+    return samp
+
+def pick_five(tag,feuille,used,F,S,stats=None):
+    rows=next(S.accepted(tag,feuille,used,rng,stats),None)   # 1er lot NumPy accepté
+    return None if rows is None else tagged(F[feuille]["df"].iloc[rows].copy(),feuille,tag)
+
+def build_sheet(solver:str=SOLVER,F=None,S=None,stats:TirageStats|None=None) -> pd.DataFrame:
+    with stage(stats,"load"):    F=F or load_sheets()
+    with stage(stats,"compile"): S=S or make_sampler(F)
+    freqs=F["all_freq_cols"]
+    order=["ortho"]+NUM_BASE+freqs+["source","group","old_cat","pld_cat"]
+    if solver=="backtrack":
+        try:
+            with stage(stats,"solve"): cells=solve(S,TAGS,rng,stats=stats)
+        except Infeasible as exc:
+            raise RuntimeError(f"Tirage impossible ({exc}).") from exc
+        with stage(stats,"assemble"):
+            groups=[shuffled(pd.concat([tagged(F[sh]["df"].iloc[cells[sh,tag]].copy(),sh,tag)
+                                        for sh in S.sheets],ignore_index=True)) for tag in TAGS]
+            return pd.concat(groups,ignore_index=True)[order]
     for _ in range(MAX_TRY_FULL):
-        taken={sh:set() for sh in F if sh!="all_freq_cols"}; groups=[]; ok=True
+        taken=set(); groups=[]; ok=True          # mots de toute la liste (voisins)
         for tag in TAGS:
             part=[]
-            for sh in taken:
-                sub=pick_five(tag,sh,taken[sh],F)
+            for sh in S.sheets:
+                with stage(stats,"draw"): sub=pick_five(tag,sh,taken,F,S,stats)
                 if sub is None: ok=False; break
-                part.append(sub); taken[sh].update(sub.ortho)
+                part.append(sub); taken.update(sub.ortho)
             if not ok: break
-            groups.append(shuffled(pd.concat(part,ignore_index=True)))
+            with stage(stats,"assemble"): groups.append(shuffled(pd.concat(part,ignore_index=True)))
         if ok:
-            df=pd.concat(groups,ignore_index=True)
-            order=["ortho"]+NUM_BASE+freqs+["source","group","old_cat","pld_cat"]
+            with stage(stats,"assemble"): df=pd.concat(groups,ignore_index=True)
             return df[order]
+        if stats is not None: stats.restarts+=1
     raise RuntimeError("Tirage impossible (contraintes trop strictes).")
 
+# ─── mode lot ────────────────────────────────────────────────────────────
+_W: dict = {}                            # lexique + pools compilés du worker
+
+def _init_worker(F,no_neighbours=None):
+    _W["F"]=F; _W["S"]=make_sampler(F,no_neighbours)
+
+def _one(job):
+    i,seed,solver,with_stats=job
+    rng.seed(seed)                       # flux indépendant, reproductible
+    stats=TirageStats() if with_stats else None
+    tic=time.perf_counter()
+    try:
+        words=build_sheet(solver,_W["F"],_W["S"],stats).to_json(orient="records",force_ascii=False)
+        err=None
+    except RuntimeError as exc:
+        words,err="null",str(exc)
+    dt=time.perf_counter()-tic
+    extra=f',"stats":{stats.to_json()}' if stats else ""
+    line=(f'{{"list":{i},"seed":{seed},"seconds":{dt:.4f},'
+          f'"error":{json.dumps(err,ensure_ascii=False)}{extra},"words":{words}}}')
+    return dt,err,line
+
+def batch(count:int,workers:int,seed:int|None,out:Path,solver:str=SOLVER,
+          with_stats:bool=False) -> dict:
+    ss=np.random.SeedSequence(seed)
+    seeds=[int(x) for x in ss.generate_state(count,np.uint64)]
+    jobs=[(i,sd,solver,with_stats) for i,sd in enumerate(seeds)]
+    F=load_sheets()                      # une seule lecture du lexique
+    times,fails=[],0
+    tic=time.perf_counter()
+    with open(out,"w",encoding="utf-8") as fh:
+        if workers<=1:
+            _init_worker(F,NO_NEIGHBOURS); res=map(_one,jobs); pool=None
+        else:
+            pool=mp.Pool(workers,initializer=_init_worker,initargs=(F,NO_NEIGHBOURS))
+            res=pool.imap_unordered(_one,jobs)
+        try:
+            for dt,err,line in res:      # écriture au fil de l'eau
+                fh.write(line+"\n"); fh.flush()
+                times.append(dt); fails+=err is not None
+        finally:
+            if pool: pool.close(); pool.join()
+    wall=time.perf_counter()-tic
+    return {"count":count,"failures":fails,"entropy":ss.entropy,"wall_s":round(wall,3),
+            "lists_per_s":round(count/wall,2),
+            "p50_s":round(statistics.median(times),4),"max_s":round(max(times),4)}
+
 # ─── main ────────────────────────────────────────────────────────────────
 def main():
-    df=build_sheet()
+    ap=argparse.ArgumentParser(description="Tirage des 80 mots → tirage.json "
+                                           "(ou N listes → JSONL avec --count)")
+    ap.add_argument("--solver",choices=("random","backtrack"),default=SOLVER)
+    ap.add_argument("--count",type=int,help="mode lot : nombre de listes")
+    ap.add_argument("--workers",type=int,default=mp.cpu_count())
+    ap.add_argument("--seed",type=int,help="graine de base (défaut : aléatoire)")
+    ap.add_argument("--out",type=Path,default=OUT_BATCH)
+    ap.add_argument("--stats",action="store_true",
+                    help=f"instrumentation : {OUT_STATS.name} (ou champ 'stats' en mode lot)")
+    ap.add_argument("--no-neighbours",action="store_true",
+                    help="exclut deux voisins orthographiques (distance 1) dans la liste")
+    a=ap.parse_args()
+    global NO_NEIGHBOURS
+    NO_NEIGHBOURS=NO_NEIGHBOURS or a.no_neighbours
+    if a.count:
+        rep=batch(a.count,a.workers,a.seed,a.out,a.solver,a.stats)
+        print(json.dumps(rep)); sys.exit(1 if rep["failures"]==a.count else 0)
+    stats=TirageStats() if a.stats else None
+    df=build_sheet(a.solver,stats=stats)
     df.to_json(OUT, orient="records", force_ascii=False)
+    if stats: OUT_STATS.write_text(stats.to_json(),encoding="utf-8")
     print("OK")
 
 if __name__=="__main__":
-    main()
\ No newline at end of file
+    main()
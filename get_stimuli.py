@@ -11,6 +11,11 @@ from pathlib import Path
 import random, sys, time
 import pandas as pd
 
+import lexicon_cache, lexique_blocks
+from ld20 import NeighbourIndex
+from sampler import Sampler, TirageStats, stage
+from solver import Infeasible, solve
+
 # =============================================================
 # 1) CONTRAINTES RÉGLABLES
 # -------------------------------------------------------------
@@ -30,6 +35,8 @@ SD_MULTIPLIER = {                  # facteur multiplicatif autorisé sur σ
 
 # -------- Fichiers -------------------------------------------------------
 XLSX     = Path("Lexique.xlsx")         # classeur source
+CSV      = Path("Lexique383.csv")       # source alternative (blocs de longueur)
+SOURCE   = "xlsx"                       # "xlsx" | "csv"
 OUTFILE  = "Stimuli_perSheet.xlsx"      # généré quand on exécute ce script
 # -------------------------------------------------------------------------
 
@@ -37,6 +44,8 @@ N_PER_FEUIL_TAG = 5
 TAGS            = ("LOW_OLD", "HIGH_OLD", "LOW_PLD", "HIGH_PLD")
 MAX_TRY_TAG     = 1_000
 MAX_TRY_FULL    = 1_000
+SOLVER          = "random"     # "random" (rejet) | "backtrack" (DFS bornée)
+NO_NEIGHBOURS   = False        # True : pas deux voisins orthographiques dans la liste
 rng = random.Random()          # option : rng.seed(123)
 
 NUM_BASE = ["nblettres", "nbphons", "old20", "pld20"]
@@ -60,40 +69,50 @@ def shuffled(df: pd.DataFrame) -> pd.DataFrame:
 # -------------------------------------------------------------------------
 # CHARGEMENT DES 4 FEUILLES
 # -------------------------------------------------------------------------
-if not XLSX.exists():
-    sys.exit(f"❌  Fichier introuvable : {XLSX.resolve()}")
+def _parse_sheets() -> dict[str, dict]:
+    if not XLSX.exists():
+        sys.exit(f"❌  Fichier introuvable : {XLSX.resolve()}")
+
+    xls = pd.ExcelFile(XLSX)
+    sheet_names = [s for s in xls.sheet_names if s.lower().startswith("feuil")]
+    if len(sheet_names) != 4:
+        sys.exit("❌  Il faut exactement 4 feuilles nommées Feuil1 … Feuil4.")
+
+    feuilles: dict[str, dict] = {}
+    all_freq: set[str] = set()
 
-xls = pd.ExcelFile(XLSX)
-sheet_names = [s for s in xls.sheet_names if s.lower().startswith("feuil")]
-if len(sheet_names) != 4:
-    sys.exit("❌  Il faut exactement 4 feuilles nommées Feuil1 … Feuil4.")
+    for sh in sheet_names:
+        df = xls.parse(sh)
+        df.columns = df.columns.str.strip().str.lower()
 
-FEUILLES: dict[str, dict] = {}          # {feuille: {"df":…, "stats":…, "freq_cols":…}}
-all_freq_cols: set[str] = set()
+        freq_cols_sheet = [c for c in df.columns if c.startswith("freq")]
+        all_freq.update(freq_cols_sheet)
 
-for sh in sheet_names:
-    df = xls.parse(sh)
-    df.columns = df.columns.str.strip().str.lower()
+        need = ["ortho", "old20", "pld20", "nblettres", "nbphons"] + freq_cols_sheet
+        if any(c not in df.columns for c in need):
+            sys.exit(f"❌  Colonnes manquantes dans {sh}")
 
-    freq_cols_sheet = [c for c in df.columns if c.startswith("freq")]
-    all_freq_cols.update(freq_cols_sheet)
+        for col in NUM_BASE + freq_cols_sheet:
+            df[col] = to_float(df[col])
 
-    need = ["ortho", "old20", "pld20", "nblettres", "nbphons"] + freq_cols_sheet
-    if any(c not in df.columns for c in need):
-        sys.exit(f"❌  Colonnes manquantes dans {sh}")
+        df["ortho"] = df["ortho"].astype(str).str.upper()
+        df = df.dropna(subset=need).reset_index(drop=True)
 
-    for col in NUM_BASE + freq_cols_sheet:
-        df[col] = to_float(df[col])
+        # stats feuille
+        st = {f"m_{c}": df[c].mean()  for c in ("old20", "pld20", "nblettres", "nbphons")}
+        st |= {f"sd_{c}": df[c].std(ddof=0) for c in
+               ("old20", "pld20", "nblettres", "nbphons") + tuple(freq_cols_sheet)}
 
-    df["ortho"] = df["ortho"].astype(str).str.upper()
-    df = df.dropna(subset=need).reset_index(drop=True)
+        feuilles[sh] = {"df": df, "stats": st, "freq_cols": freq_cols_sheet}
 
-    # stats feuille
-    st = {f"m_{c}": df[c].mean()  for c in ("old20", "pld20", "nblettres", "nbphons")}
-    st |= {f"sd_{c}": df[c].std(ddof=0) for c in
-           ("old20", "pld20", "nblettres", "nbphons") + tuple(freq_cols_sheet)}
+    feuilles["all_freq_cols"] = sorted(all_freq)
+    return feuilles
 
-    FEUILLES[sh] = {"df": df, "stats": st, "freq_cols": freq_cols_sheet}
+# Classeur nettoyé : relu depuis le cache binaire tant que Lexique.xlsx
+# n'a pas changé (cf. lexicon_cache.py).
+FEUILLES: dict[str, dict] = (lexique_blocks.load(CSV) if SOURCE == "csv" else
+                              lexicon_cache.load(XLSX, _parse_sheets, "get_stimuli"))
+all_freq_cols: list[str]  = FEUILLES.pop("all_freq_cols")
 
 NUM = NUM_BASE + sorted(all_freq_cols)
 
@@ -112,86 +131,81 @@ def cat_code(tag: str) -> int:
     return -1 if "LOW" in tag else 1
 
 # -------------------------------------------------------------------------
-# CONTRÔLES
+# POOLS COMPILÉS (NumPy)
 # -------------------------------------------------------------------------
-def sd_ok(sub: pd.DataFrame, st: dict, fq_cols: list[str]) -> bool:
-    return (
-        sub.nblettres.std(ddof=0) <= st["sd_nblettres"] * SD_MULTIPLIER["letters"] and
-        sub.nbphons.std(ddof=0)   <= st["sd_nbphons"]   * SD_MULTIPLIER["phons"]   and
-        sub.old20.std(ddof=0)     <= st["sd_old20"]     * SD_MULTIPLIER["old20"]   and
-        sub.pld20.std(ddof=0)     <= st["sd_pld20"]     * SD_MULTIPLIER["pld20"]   and
-        all(sub[c].std(ddof=0) <= st[f"sd_{c}"] * SD_MULTIPLIER["freq"] for c in fq_cols)
-    )
-
-def mean_lp_ok(sub: pd.DataFrame, st: dict) -> bool:
-    """Moyennes lettres / phons proches de la moyenne feuille (±delta*σ)."""
-    return (
-        abs(sub.nblettres.mean() - st["m_nblettres"]) <= MEAN_DELTA["letters"] * st["sd_nblettres"] and
-        abs(sub.nbphons.mean()   - st["m_nbphons"])   <= MEAN_DELTA["phons"]   * st["sd_nbphons"]
-    )
+SAMPLER = Sampler(FEUILLES, masks, n_pick=N_PER_FEUIL_TAG,
+                  mean_factor=MEAN_FACTOR_OLDPLD, mean_delta=MEAN_DELTA,
+                  sd_mult=SD_MULTIPLIER, max_try=MAX_TRY_TAG,
+                  neighbours=NeighbourIndex(w for d in FEUILLES.values() for w in d["df"]["ortho"])
+                             if NO_NEIGHBOURS else None)
 
 # -------------------------------------------------------------------------
 # TIRAGE 5 MOTS DANS UNE FEUILLE / TAG
 # -------------------------------------------------------------------------
-def pick_five(tag: str, feuille: str, used: set[str]) -> pd.DataFrame | None:
-    df   = FEUILLES[feuille]["df"]
-    st   = FEUILLES[feuille]["stats"]
-    fqs  = FEUILLES[feuille]["freq_cols"]
-
-    pool = df.loc[masks(df, st)[tag] & ~df.ortho.isin(used)]
-    if len(pool) < N_PER_FEUIL_TAG:
+def tagged(samp: pd.DataFrame, feuille: str, tag: str) -> pd.DataFrame:
+    samp["source"]  = feuille
+    samp["group"]   = tag
+    samp["old_cat"] = cat_code(tag) if "OLD" in tag else 0
+    samp["pld_cat"] = cat_code(tag) if "PLD" in tag else 0
+    return samp
+
+def pick_five(tag: str, feuille: str, used: set[str],
+              stats: TirageStats | None = None) -> pd.DataFrame | None:
+    # -- premier candidat des lots NumPy qui passe toutes les contraintes
+    #    (extrémité, moyennes, dispersion : Sampler.check_parts)
+    rows = next(SAMPLER.accepted(tag, feuille, used, rng, stats), None)
+    if rows is None:
         return None
-
-    for _ in range(MAX_TRY_TAG):
-        samp = pool.sample(N_PER_FEUIL_TAG,
-                           random_state=rng.randint(0, 1_000_000)).copy()
-
-        # -- moyenne old20 / pld20 extrême ?
-        if tag == "LOW_OLD"  and samp.old20.mean() >= st["m_old20"] - MEAN_FACTOR_OLDPLD*st["sd_old20"]:  continue
-        if tag == "HIGH_OLD" and samp.old20.mean() <= st["m_old20"] + MEAN_FACTOR_OLDPLD*st["sd_old20"]:  continue
-        if tag == "LOW_PLD"  and samp.pld20.mean() >= st["m_pld20"] - MEAN_FACTOR_OLDPLD*st["sd_pld20"]:  continue
-        if tag == "HIGH_PLD" and samp.pld20.mean() <= st["m_pld20"] + MEAN_FACTOR_OLDPLD*st["sd_pld20"]:  continue
-
-        # -- moyenne lettres / phons OK ?
-        if not mean_lp_ok(samp, st):
-            continue
-
-        # -- dispersion OK ?
-        if sd_ok(samp, st, fqs):
-            samp["source"]  = feuille
-            samp["group"]   = tag
-            samp["old_cat"] = cat_code(tag) if "OLD" in tag else 0
-            samp["pld_cat"] = cat_code(tag) if "PLD" in tag else 0
-            return samp
-    return None
+    return tagged(FEUILLES[feuille]["df"].iloc[rows].copy(), feuille, tag)
 
 # -------------------------------------------------------------------------
 # CONSTRUCTION DES 80 MOTS
 # -------------------------------------------------------------------------
-def build_sheet() -> pd.DataFrame:
-    """Renvoie un DataFrame (80 lignes) répondant à toutes les contraintes."""
+def build_sheet(solver: str = SOLVER, stats: TirageStats | None = None) -> pd.DataFrame:
+    """Renvoie un DataFrame (80 lignes) répondant à toutes les contraintes.
+    solver = "random" (rejet aléatoire) ou "backtrack" (recherche bornée).
+    stats  = TirageStats facultatif (essais, rejets, relances, temps par étape)."""
+    order = ["ortho"] + NUM + ["source", "group", "old_cat", "pld_cat"]
+
+    if solver == "backtrack":
+        try:
+            with stage(stats, "solve"):
+                cells = solve(SAMPLER, TAGS, rng, stats=stats)
+        except Infeasible as exc:
+            raise RuntimeError(f"⚠️  Impossible de générer la feuille : {exc}") from exc
+        with stage(stats, "assemble"):
+            groups = [
+                shuffled(pd.concat([tagged(FEUILLES[sh]["df"].iloc[cells[sh, tag]].copy(), sh, tag)
+                                    for sh in FEUILLES], ignore_index=True))
+                for tag in TAGS
+            ]
+            return pd.concat(groups, ignore_index=True)[order]
+
     for _ in range(MAX_TRY_FULL):
-        taken  = {sh: set() for sh in FEUILLES}
+        taken  = set()                      # mots de toute la liste (voisins inter-feuilles)
         groups = []
         ok = True
 
         for tag in TAGS:
             parts = []
             for sh in FEUILLES:
-                sub = pick_five(tag, sh, taken[sh])
+                with stage(stats, "draw"):
+                    sub = pick_five(tag, sh, taken, stats)
                 if sub is None:
                     ok = False
                     break
                 parts.append(sub)
-                taken[sh].update(sub.ortho)
+                taken.update(sub.ortho)
             if not ok:
                 break
-            groups.append(shuffled(pd.concat(parts, ignore_index=True)))  # mélange interne
+            with stage(stats, "assemble"):
+                groups.append(shuffled(pd.concat(parts, ignore_index=True)))  # mélange interne
 
         if ok:
             df = pd.concat(groups, ignore_index=True)
-            order = ["ortho"] + NUM + ["source", "group", "old_cat", "pld_cat"]
             return df[order]
+        if stats is not None:
+            stats.restarts += 1
 
     raise RuntimeError("⚠️  Impossible de générer la feuille : relâche les contraintes.")
 
@@ -225,11 +239,14 @@ def _stats_by_block_total(df: pd.DataFrame) -> pd.DataFrame:
 
 if __name__ == "__main__":
     tic = time.perf_counter()
-    df80 = build_sheet()
+    stats = TirageStats()
+    df80 = build_sheet(stats=stats)
     stats_blk = _stats_by_block_total(df80)
 
     with pd.ExcelWriter(OUTFILE, engine="openpyxl") as wr:
         df80.to_excel(wr, sheet_name="tirage", index=False)
         stats_blk.to_excel(wr, sheet_name="Stats_ByLetters", index=False)
 
-    print(f"\n✓  {OUTFILE} généré en {time.perf_counter()-tic:.1f} s")
\ No newline at end of file
+    Path(OUTFILE).with_suffix(".stats.json").write_text(stats.to_json(), encoding="utf-8")
+    print(f"\n✓  {OUTFILE} généré en {time.perf_counter()-tic:.1f} s "
+          f"({stats.restarts} relance(s), {stats.to_dict()['tries']} essais)")
\ No newline at end of file
@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Calcul d'OLD20 / PLD20 (distance de Levenshtein moyenne aux 20 plus
+proches voisins, orthographiques / phonologiques) pour tout un lexique.
+• Formes uniques regroupées en paquets par longueur : |la − lb| est une
+  borne inférieure de la distance, les paquets sont visités par écart de
+  longueur croissant et la recherche s'arrête dès que cet écart atteint
+  la 20ᵉ meilleure distance
+• Distance bornée vectorisée (NumPy) contre tout un paquet à la fois ;
+  les candidats dont la ligne DP dépasse la borne sont abandonnés
+• Répartition des mots entre processus (multiprocessing)
+• Mode incrémental : les listes des 20 voisins sont conservées (SQLite) ;
+  ajouter / retirer des mots ne recalcule que les listes touchées
+• Requêtes : neighbors(mot, k) et within(mot, d) (NeighbourStore,
+  NeighbourIndex) ; Sampler s'en sert pour la contrainte « pas de voisins »
+PLD20 exige une colonne `phon` (transcription Lexique) ; sans elle, la
+colonne pld20 du fichier source est conservée telle quelle.
+
+Usage :  python ld20.py Lexique383.csv [--out lexique_ld20.csv]
+                        [--workbook Lexique.xlsx --workbook-out Lexique_ld20.xlsx]
+                        [--workers 4] [--store]
+         python ld20.py --add nouveaux.txt [--remove retires.txt]
+                        [--workbook --workbook-out Lexique_ld20.xlsx]
+Le classeur source n'est jamais réécrit : les valeurs recalculées vont
+dans une copie (--workbook-out), à relire puis substituer à la main.
+"""
+
+from __future__ import annotations
+import argparse, bisect, multiprocessing as mp, os, sqlite3, time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+N_NEIGH = 20               # voisins retenus (le « 20 » d'OLD20)
+CHUNK   = 256              # mots par tâche envoyée aux workers
+SRC     = Path(__file__).with_name("Lexique383.csv")
+XLSX    = Path(__file__).with_name("Lexique.xlsx")
+STORE   = Path(os.getenv("LD20_STORE", Path(__file__).with_name("ld20.sqlite")))
+
+
+def norm(w) -> str:
+    return str(w).strip().lower()
+
+
+# ─── index par longueur ──────────────────────────────────────────────────
+class Buckets:
+    """Formes uniques codées en entiers (int16), triées par longueur dans
+    une matrice complétée par −1 : les mots d'un intervalle de longueurs
+    forment une tranche contiguë."""
+
+    def __init__(self, forms: Sequence[str]):
+        self.forms = list(forms)
+        self.alpha = alpha = {}
+        self.codes = [np.array([alpha.setdefault(ch, len(alpha)) for ch in f], np.int16)
+                      for f in self.forms]
+        n = np.array([len(c) for c in self.codes], np.int64)
+        self.order = np.argsort(n, kind="stable")          # rang → indice de forme
+        self.rank  = np.empty_like(self.order); self.rank[self.order] = np.arange(len(n))
+        self.lens  = n[self.order]
+        self.P     = np.full((len(n), int(n.max(initial=0))), -1, np.int16)
+        self.H     = np.zeros((len(n), max(len(alpha), 1)), np.int16)   # lettres
+        for r, i in enumerate(self.order):
+            self.P[r, :n[i]] = self.codes[i]
+            np.add.at(self.H[r], self.codes[i], 1)
+
+    def bag(self, i: int, rows: np.ndarray) -> np.ndarray:
+        """Borne inférieure de Levenshtein (distance des multiensembles de
+        lettres) entre la forme i et les rangs `rows`."""
+        r = self.rank[i]
+        return self._bag(self.H[r], self.lens[r], rows)
+
+    def _bag(self, h: np.ndarray, la: int, rows: np.ndarray) -> np.ndarray:
+        pos = np.maximum(self.H[rows] - h, 0).sum(1)               # lettres en trop
+        return np.maximum(pos, pos - (self.lens[rows] - la))       # … manquantes
+
+    def encode(self, word: str) -> np.ndarray:
+        """Codes d'un mot quelconque (−2 : caractère absent du lexique)."""
+        return np.array([self.alpha.get(ch, -2) for ch in word], np.int16)
+
+    def scan(self, word: str, d: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(indices de formes, distances) de toutes les formes à distance
+        ≤ d de `word` (le mot lui-même compris s'il est dans le lexique)."""
+        a  = self.encode(word)
+        sl = self.span(len(a) - d, len(a) + d)
+        rows = np.arange(sl.start, sl.stop)
+        h    = np.bincount(a[a >= 0], minlength=self.H.shape[1]).astype(np.int16)
+        rows = rows[self._bag(h, len(a), rows) <= d]
+        pos, dist = bounded(a, self.P[rows], self.lens[rows], d)
+        return self.order[rows[pos]], dist
+
+    def span(self, lo: int, hi: int) -> slice:
+        """Rangs des formes de longueur lo … hi."""
+        return slice(int(np.searchsorted(self.lens, lo, "left")),
+                     int(np.searchsorted(self.lens, hi, "right")))
+
+
+def bounded(a: np.ndarray, B: np.ndarray, lens: np.ndarray, k: int
+            ) -> Tuple[np.ndarray, np.ndarray]:
+    """Distances de Levenshtein entre `a` et chaque ligne de B (lignes
+    complétées par −1, longueur utile `lens`), limitées à k : renvoie
+    (positions dans B, distances ≤ k).
+    Ligne DP i : cur[j] = min(prev[j]+1, prev[j-1]+coût, cur[j-1]+1) ; le
+    dernier terme est un minimum cumulé de (t[j] − j), d'où une ligne
+    entière par opération NumPy.  Un candidat dont toute la ligne dépasse
+    k est abandonné (le minimum de ligne ne décroît pas)."""
+    m, L = B.shape
+    ar   = np.arange(L + 1, dtype=np.int16)
+    keep = np.arange(m)
+    prev = np.broadcast_to(ar, (m, L + 1))
+    for i, ch in enumerate(a, 1):
+        t = np.empty_like(prev)
+        t[:, 0] = i
+        np.minimum(prev[:, 1:] + 1, prev[:, :-1] + (B != ch), out=t[:, 1:])
+        cur = np.minimum.accumulate(t - ar, axis=1) + ar
+        alive = cur.min(axis=1) <= k
+        if not alive.all():
+            keep, B, lens, cur = keep[alive], B[alive], lens[alive], cur[alive]
+            if not len(keep):
+                return keep, keep
+        prev = cur
+    d  = prev[np.arange(len(keep)), lens]
+    ok = d <= k
+    return keep[ok], d[ok]
+
+
+def nearest(bk: Buckets, i: int, n: int = N_NEIGH) -> Tuple[np.ndarray, np.ndarray]:
+    """(indices, distances) des n formes les plus proches de la forme i,
+    triées par distance.
+    1. même longueur : la n-ième distance de Hamming borne la recherche
+    2. autres longueurs : |la − lb| ≤ distance, seules les longueurs à
+       moins de la n-ième distance trouvée sont examinées, en un appel"""
+    a, la, r0 = bk.codes[i], len(bk.codes[i]), bk.rank[i]
+    big = la + int(bk.lens[-1]) if len(bk.lens) else 0
+    sl  = bk.span(la, la)
+    same = np.r_[sl.start:r0, r0 + 1:sl.stop]
+    k = big
+    if len(same) >= n:
+        k = int(np.partition((bk.P[same, :la] != a).sum(axis=1), n - 1)[n - 1])
+        same = same[bk.bag(i, same) <= k]
+    pos, d = bounded(a, bk.P[same, :la], bk.lens[same], k)
+    rows, dist = same[pos], d
+    kth = int(np.partition(dist, n - 1)[n - 1]) if len(dist) >= n else big + 1
+    w   = kth - 1                      # écart de longueur encore utile
+    if w >= 1:
+        lo, hi = bk.span(la - w, la - 1), bk.span(la + 1, la + w)
+        other = np.r_[lo.start:lo.stop, hi.start:hi.stop]
+        k = kth - 1 if len(dist) >= n else big
+        other = other[bk.bag(i, other) <= k]
+        if len(other):
+            B = bk.P[other, :la + w] if la + w < bk.P.shape[1] else bk.P[other]
+            pos, d = bounded(a, B, bk.lens[other], k)
+            rows, dist = np.r_[rows, other[pos]], np.r_[dist, d]
+    sel = np.lexsort((rows, dist))[:n]
+    return bk.order[rows[sel]].astype(np.int64), dist[sel].astype(np.int16)
+
+
+# ─── requêtes de voisinage ───────────────────────────────────────────────
+def deletions(w: str) -> set:
+    """La forme et ses variantes à une lettre supprimée : deux formes à
+    distance ≤ 1 partagent au moins une variante."""
+    return {w} | {w[:i] + w[i + 1:] for i in range(len(w))}
+
+
+class NeighbourIndex:
+    """Index en mémoire d'un ensemble de formes.
+    • distance 1 : voisinage de suppression (dictionnaire variante → formes)
+    • rayon > 1 et k plus proches : paquets par longueur (Buckets), construits
+      à la première requête"""
+
+    def __init__(self, forms: Iterable[str]):
+        self.forms = list(dict.fromkeys(map(norm, forms)))
+        self.pos   = {f: i for i, f in enumerate(self.forms)}
+        self.dels: Dict[str, List[int]] = {}
+        for i, f in enumerate(self.forms):
+            for v in deletions(f):
+                self.dels.setdefault(v, []).append(i)
+        self._bk: Buckets | None = None
+
+    @property
+    def bk(self) -> Buckets:
+        if self._bk is None:
+            self._bk = Buckets(self.forms)
+        return self._bk
+
+    def within(self, word: str, d: int = 1) -> List[Tuple[int, str]]:
+        """[(distance, forme)] des formes à distance 1 … d de `word`, triées."""
+        w = norm(word)
+        if d < 1:
+            return []
+        if d == 1:
+            cand = {self.forms[j] for v in deletions(w) for j in self.dels.get(v, ())}
+            return sorted((1, f) for f in cand if f != w and _one_edit(w, f))
+        ix, dist = self.bk.scan(w, d)
+        return sorted((int(k), self.forms[j]) for j, k in zip(ix, dist) if self.forms[j] != w)
+
+    def neighbors(self, word: str, k: int = N_NEIGH) -> List[Tuple[int, str]]:
+        """[(distance, forme)] des k formes les plus proches de `word`."""
+        w = norm(word)
+        if w in self.pos:
+            ix, dist = nearest(self.bk, self.pos[w], k)
+            return [(int(d), self.forms[j]) for j, d in zip(ix, dist)]
+        out, d = [], 1                         # mot hors lexique : rayon croissant
+        while len(out) < min(k, len(self.forms)):
+            out, d = self.within(w, d), d + 1
+        return out[:k]
+
+
+def _one_edit(a: str, b: str) -> bool:
+    """Vrai si a et b (distincts) sont à une substitution / insertion près."""
+    if len(a) == len(b):
+        return sum(x != y for x, y in zip(a, b)) == 1
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) - len(a) != 1:
+        return False
+    i = next((i for i, (x, y) in enumerate(zip(a, b)) if x != y), len(a))
+    return a[i:] == b[i + 1:]
+
+
+# ─── calcul parallèle ────────────────────────────────────────────────────
+_W: dict = {}                            # paquets du worker
+
+def _init_worker(forms, n):
+    _W["bk"] = Buckets(forms); _W["n"] = n
+
+def _chunk(ix: List[int]):
+    return [(i, *nearest(_W["bk"], i, _W["n"])) for i in ix]
+
+
+def neighbours(forms: Sequence[str], n: int = N_NEIGH, workers: int = 1,
+               only: Sequence[int] | None = None) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Pour chaque forme (uniques) : (indices, distances) des n plus proches.
+    `only` : indices à calculer (les autres restent None)."""
+    only = list(range(len(forms))) if only is None else list(only)
+    jobs = [only[s:s + CHUNK] for s in range(0, len(only), CHUNK)]
+    out: List = [None] * len(forms)
+    if workers <= 1:
+        _init_worker(forms, n); res: Iterable = map(_chunk, jobs); pool = None
+    else:
+        pool = mp.Pool(workers, initializer=_init_worker, initargs=(list(forms), n))
+        res  = pool.imap_unordered(_chunk, jobs)
+    try:
+        for part in res:
+            for i, ix, d in part:
+                out[i] = (ix, d)
+    finally:
+        if pool: pool.close(); pool.join()
+    return out
+
+
+def ld20(words: Iterable[str], n: int = N_NEIGH, workers: int = 1) -> pd.Series:
+    """Moyenne des n plus petites distances de chaque mot au reste du
+    lexique (homographes regroupés) ; NaN si le lexique est trop petit."""
+    words = pd.Series(list(words), dtype=object).map(norm)
+    forms = list(dict.fromkeys(words))
+    nb    = neighbours(forms, n, workers)
+    val   = {f: float(d.mean()) if len(d) == n else np.nan for f, (_, d) in zip(forms, nb)}
+    return words.map(val).astype(float)
+
+
+# ─── mise à jour incrémentale ────────────────────────────────────────────
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS forms(
+    kind TEXT NOT NULL,                   -- 'ortho' (OLD20) | 'phon' (PLD20)
+    form TEXT NOT NULL,
+    PRIMARY KEY(kind, form)
+);
+CREATE TABLE IF NOT EXISTS neigh(
+    kind TEXT    NOT NULL,
+    form TEXT    NOT NULL,
+    rank INTEGER NOT NULL,                -- 0 = plus proche
+    nb   TEXT    NOT NULL,
+    dist INTEGER NOT NULL,
+    PRIMARY KEY(kind, form, rank)
+);
+CREATE INDEX IF NOT EXISTS ix_neigh_nb ON neigh(kind, nb);
+"""
+
+
+class NeighbourStore:
+    """Listes [(distance, voisin)] des n plus proches voisins de chaque
+    forme, persistées en SQLite.  add() / remove() ne recalculent que les
+    formes dont la liste change ; seules leurs lignes sont réécrites."""
+
+    def __init__(self, path: Path = STORE, kind: str = "ortho", n: int = N_NEIGH):
+        self.path, self.kind, self.n = Path(path), kind, n
+        self.nb: Dict[str, List[Tuple[int, str]]] = {}
+        with closing(self._cnx()) as cnx:
+            cnx.executescript(SCHEMA)
+            for (f,) in cnx.execute("SELECT form FROM forms WHERE kind=?", (kind,)):
+                self.nb[f] = []
+            for f, nb, d in cnx.execute("SELECT form, nb, dist FROM neigh WHERE kind=? "
+                                        "ORDER BY form, rank", (kind,)):
+                self.nb[f].append((d, nb))
+
+    def _cnx(self) -> sqlite3.Connection:
+        cnx = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        cnx.execute("PRAGMA journal_mode=WAL")
+        return cnx
+
+    def _save(self, changed: Iterable[str], gone: Iterable[str] = ()) -> None:
+        k, changed, gone = self.kind, list(changed), list(gone)
+        self._index = None                          # lexique modifié
+        with closing(self._cnx()) as cnx:
+            cnx.execute("BEGIN IMMEDIATE")
+            cnx.executemany("DELETE FROM neigh WHERE kind=? AND form=?",
+                            [(k, f) for f in changed + gone])
+            cnx.executemany("DELETE FROM forms WHERE kind=? AND form=?", [(k, f) for f in gone])
+            cnx.executemany("INSERT OR IGNORE INTO forms VALUES (?,?)", [(k, f) for f in changed])
+            cnx.executemany("INSERT INTO neigh VALUES (?,?,?,?,?)",
+                            [(k, f, r, nb, d) for f in changed
+                             for r, (d, nb) in enumerate(self.nb[f])])
+            cnx.execute("COMMIT")
+
+    # ─── valeurs ────────────────────────────────────────────────────────
+    def value(self, form: str) -> float:
+        lst = self.nb.get(norm(form), ())
+        return float(np.mean([d for d, _ in lst])) if len(lst) == self.n else np.nan
+
+    def values(self, words: Iterable[str]) -> pd.Series:
+        words = list(words)
+        return pd.Series([self.value(w) for w in words], index=words, dtype=float)
+
+    # ─── requêtes ───────────────────────────────────────────────────────
+    @property
+    def index(self) -> NeighbourIndex:
+        if getattr(self, "_index", None) is None:
+            self._index = NeighbourIndex(self.nb)
+        return self._index
+
+    def neighbors(self, word: str, k: int = N_NEIGH) -> List[Tuple[int, str]]:
+        """[(distance, forme)] des k plus proches : lecture directe des listes
+        conservées, calcul à la volée si k > n ou mot hors lexique."""
+        lst = self.nb.get(norm(word))
+        if lst is not None and k <= len(lst):
+            return lst[:k]
+        return self.index.neighbors(word, k)
+
+    def within(self, word: str, d: int = 1) -> List[Tuple[int, str]]:
+        """[(distance, forme)] des formes à distance 1 … d : complet dans la
+        liste conservée si d < n-ième distance, sinon via l'index."""
+        lst = self.nb.get(norm(word))
+        if lst is not None and len(lst) == self.n and d < lst[-1][0]:
+            return [(k, f) for k, f in lst if k <= d]
+        return self.index.within(word, d)
+
+    # ─── calcul ─────────────────────────────────────────────────────────
+    def _lists(self, forms: List[str], only, workers: int) -> Dict[str, List[Tuple[int, str]]]:
+        res = neighbours(forms, self.n, workers, only)
+        return {forms[i]: [(int(d), forms[j]) for j, d in zip(*res[i])] for i in only}
+
+    def rebuild(self, words: Iterable[str], workers: int = 1) -> set:
+        """Recalcul complet sur le lexique `words`."""
+        forms = list(dict.fromkeys(map(norm, words)))
+        gone  = set(self.nb) - set(forms)
+        self.nb = self._lists(forms, range(len(forms)), workers)
+        self._save(forms, gone)
+        return set(forms)
+
+    def add(self, words: Iterable[str], workers: int = 1) -> set:
+        """Ajoute des formes ; renvoie les formes dont la valeur a changé
+        (les nouvelles et les anciennes gagnant un voisin plus proche que
+        leur n-ième)."""
+        new = [w for w in dict.fromkeys(map(norm, words)) if w not in self.nb]
+        if not new:
+            return set()
+        old   = list(self.nb)
+        forms = old + new
+        bk    = Buckets(forms)
+        lists = self._lists(forms, range(len(old), len(forms)), workers)
+        far   = len(max(forms, key=len)) * 2 + 1
+        kth   = np.array([lst[-1][0] if len(lst) == self.n else far
+                          for lst in self.nb.values()], np.int64)
+        rows  = bk.rank[:len(old)]
+        touched = set(new)
+        for i in range(len(old), len(forms)):
+            # candidats : écart de longueur et de lettres < n-ième distance actuelle
+            c = np.flatnonzero(np.abs(bk.lens[rows] - len(forms[i])) < kth)
+            c = c[bk.bag(i, rows[c]) < kth[c]]
+            if not len(c):
+                continue
+            pos, d = bounded(bk.codes[i], bk.P[rows[c]], bk.lens[rows[c]], int(kth[c].max()) - 1)
+            for j, dj in zip(c[pos].tolist(), d.tolist()):
+                if dj >= kth[j]:
+                    continue
+                lst = self.nb[old[j]]
+                bisect.insort(lst, (dj, forms[i]))
+                del lst[self.n:]
+                if len(lst) == self.n:
+                    kth[j] = lst[-1][0]
+                touched.add(old[j])
+        self.nb.update(lists)
+        self._save(touched)
+        return touched
+
+    def remove(self, words: Iterable[str], workers: int = 1) -> set:
+        """Retire des formes ; seules celles qui les avaient pour voisin
+        sont recalculées.  Renvoie ces formes."""
+        gone = {w for w in map(norm, words) if w in self.nb}
+        if not gone:
+            return set()
+        for w in gone:
+            del self.nb[w]
+        forms = list(self.nb)
+        hit   = [i for i, f in enumerate(forms) if any(nb in gone for _, nb in self.nb[f])]
+        self.nb.update(self._lists(forms, hit, workers))
+        touched = {forms[i] for i in hit}
+        self._save(touched, gone)
+        return touched
+
+
+# ─── fichiers ────────────────────────────────────────────────────────────
+def read_lexicon(path: Path) -> pd.DataFrame:
+    """Fichier type Lexique383.csv (';', BOM, 1ʳᵉ colonne = ortho)."""
+    df = pd.read_csv(path, sep=";", encoding="utf-8-sig", dtype={0: str},
+                     keep_default_na=False, na_values=[""])
+    df.columns = ["ortho"] + [c.strip().lower() for c in df.columns[1:]]
+    df["ortho"] = df["ortho"].map(norm)
+    return df
+
+
+def compute(df: pd.DataFrame, workers: int = 1, extra: Iterable[str] = (),
+            store: Path | None = None) -> pd.DataFrame:
+    """Ajoute / remplace old20 (et pld20 si `phon` existe).  `extra` :
+    mots ajoutés au lexique de référence (ex. ceux du classeur).  Avec
+    `store`, les listes de voisins sont conservées pour les mises à jour
+    incrémentales (NeighbourStore)."""
+    known = set(df["ortho"])
+    extra = [w for w in dict.fromkeys(map(norm, extra)) if w not in known]
+    ref   = list(df["ortho"]) + extra
+
+    def run(words, kind):
+        if store is None:
+            return ld20(words, workers=workers)
+        ns = NeighbourStore(store, kind)
+        ns.rebuild(words, workers)
+        return ns.values(map(norm, words)).reset_index(drop=True)
+
+    old   = run(ref, "ortho")
+    out   = df.copy()
+    out["old20"] = old[: len(df)].to_numpy()
+    if "phon" in df:
+        out["pld20"] = run(list(df["phon"].fillna("")), "phon").to_numpy()
+    out.attrs["extra_old20"] = dict(zip(extra, old[len(df):]))
+    return out
+
+
+def update_workbook(xlsx: Path, table: pd.DataFrame, dest: Path) -> int:
+    """Copie du classeur dans `dest` avec old20 (et pld20 si calculé) des
+    feuilles Feuil* remplacés pour chaque mot connu de `table` ; renvoie le
+    nombre de cellules mises à jour.  `xlsx` (classeur curé) n'est jamais
+    modifié : ValueError si dest le désigne."""
+    from openpyxl import load_workbook
+    if Path(dest).resolve() == Path(xlsx).resolve():
+        raise ValueError(f"{dest} : le classeur source ne peut pas être réécrit")
+    vals = {c: dict(zip(table["ortho"], table[c])) | table.attrs.get(f"extra_{c}", {})
+            for c in ("old20", "pld20") if c in table and (c == "old20" or "phon" in table)}
+    wb, n = load_workbook(xlsx), 0
+    for ws in wb.worksheets:
+        if not ws.title.lower().startswith("feuil"):
+            continue
+        head = {str(c.value).strip().lower(): c.column for c in ws[1] if c.value is not None}
+        for row in ws.iter_rows(min_row=2):
+            w = norm(row[head["ortho"] - 1].value)
+            for c, m in vals.items():
+                v = m.get(w)
+                if c in head and v is not None and not np.isnan(v):
+                    row[head[c] - 1].value = round(float(v), 2); n += 1
+    wb.save(dest)
+    return n
+
+
+def read_words(path: Path) -> List[str]:
+    """Mots à ajouter / retirer : CSV type Lexique (1ʳᵉ colonne) ou un mot par ligne."""
+    if path.suffix.lower() == ".csv":
+        return list(read_lexicon(path)["ortho"])
+    return [w for w in map(norm, path.read_text("utf-8-sig").splitlines()) if w]
+
+
+def workbook_words(xlsx: Path) -> List[str]:
+    sheets = pd.read_excel(xlsx, sheet_name=None, usecols=["ortho"])
+    return [w for sh, df in sheets.items() if sh.lower().startswith("feuil")
+            for w in df["ortho"].dropna()]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Calcul d'OLD20 / PLD20.")
+    ap.add_argument("src", nargs="?", type=Path, default=SRC)
+    ap.add_argument("--out", type=Path, help="CSV ';' avec old20 / pld20 recalculés")
+    ap.add_argument("--workbook", type=Path, nargs="?", const=XLSX,
+                    help="classeur dont les mots Feuil* sont ajoutés au calcul (défaut Lexique.xlsx)")
+    ap.add_argument("--workbook-out", type=Path,
+                    help="copie de --workbook avec old20 / pld20 recalculés (jamais le classeur source)")
+    ap.add_argument("--workers", type=int, default=mp.cpu_count())
+    ap.add_argument("--store", type=Path, nargs="?", const=STORE,
+                    help=f"conserve les listes de voisins (défaut {STORE.name})")
+    ap.add_argument("--add", type=Path, help="mode incrémental : mots à ajouter au store")
+    ap.add_argument("--remove", type=Path, help="mode incrémental : mots à retirer du store")
+    a = ap.parse_args()
+    if a.workbook_out and not a.workbook:
+        a.workbook = XLSX
+    if a.workbook_out and a.workbook_out.resolve() == a.workbook.resolve():
+        ap.error("--workbook-out doit différer du classeur source")
+    tic = time.perf_counter()
+    if a.add or a.remove:
+        incremental(a)
+        return
+    df  = read_lexicon(a.src)
+    out = compute(df, a.workers, workbook_words(a.workbook) if a.workbook else (), a.store)
+    print(f"{len(df)} mots (+{len(out.attrs['extra_old20'])} du classeur) en "
+          f"{time.perf_counter()-tic:.1f} s ; pld20 "
+          f"{'recalculé' if 'phon' in df else 'conservé (pas de colonne phon)'}")
+    if a.out:
+        out.to_csv(a.out, sep=";", index=False, encoding="utf-8-sig")
+    if a.workbook_out:
+        print(f"{update_workbook(a.workbook, out, a.workbook_out)} cellules mises à jour "
+              f"dans {a.workbook_out.name}")
+
+
+def incremental(a) -> None:
+    """--add / --remove : met le store (OLD20) à jour puis, avec
+    --workbook-out, écrit la copie du classeur où old20 des seuls mots
+    touchés est remplacé."""
+    if not (a.store or STORE).exists():
+        raise SystemExit("store introuvable : lancer d'abord un calcul complet avec --store")
+    tic, ns, touched = time.perf_counter(), NeighbourStore(a.store or STORE), set()
+    if a.remove:
+        touched |= ns.remove(read_words(a.remove), a.workers)
+    if a.add:
+        touched |= ns.add(read_words(a.add), a.workers)
+    touched &= set(ns.nb)
+    print(f"{len(touched)} formes recalculées sur {len(ns.nb)} en "
+          f"{time.perf_counter()-tic:.2f} s")
+    if a.workbook_out:
+        table = pd.DataFrame({"ortho": sorted(touched)})
+        table["old20"] = ns.values(table["ortho"]).to_numpy()
+        print(f"{update_workbook(a.workbook, table, a.workbook_out)} cellules mises à jour "
+              f"dans {a.workbook_out.name}")
+
+
+if __name__ == "__main__":
+    main()
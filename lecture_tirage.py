@@ -0,0 +1,149 @@
+# ─── lecture_tirage.py ──────────────────────────────────────────────────
+# -*- coding: utf-8 -*-
+"""
+Tirage des 80 mots de l'expérience 3 (profil de contraintes de Lecture_app).
+Module importable sans Streamlit : Lecture_app.py y ajoute le cache par
+processus (st.cache_resource), tirage_bench.py et tirage_pool.py le
+mesurent / le remplissent sans exécuter les pages de l'application.
+"""
+from __future__ import annotations
+import random
+from pathlib import Path
+from typing import Dict
+
+import pandas as pd
+
+import lexicon_cache, lexique_blocks
+from ld20 import NeighbourIndex
+from sampler import Sampler, TirageStats, stage
+from solver import Infeasible, solve
+
+
+# ──────────────────────────── constantes ────────────────────────────────
+XLSX               = Path(__file__).with_name("Lexique.xlsx")
+CSV                = Path(__file__).with_name("Lexique383.csv")
+SOURCE             = "xlsx"            # "xlsx" (Feuil1…4) | "csv" (blocs de longueur du CSV)
+TAGS               = ("LOW_OLD", "HIGH_OLD", "LOW_PLD", "HIGH_PLD")
+N_PER_FEUIL_TAG    = 5
+MAX_TRY_TAG        = MAX_TRY_FULL = 1_000
+SOLVER             = "random"          # "random" (rejet) | "backtrack" (DFS bornée)
+NO_NEIGHBOURS      = False             # True : pas deux voisins orthographiques dans la liste
+rng                = random.Random()   # défaut ; un générateur par thread : build_sheet(g=…)
+
+NUM_BASE           = ["nblettres", "nbphons", "old20", "pld20"]
+
+MEAN_FACTOR_OLDPLD = .35
+MEAN_DELTA         = dict(letters=.68, phons=.68)
+SD_MULT            = dict(letters=2, phons=2, old20=.28, pld20=.28, freq=1.9)
+
+
+# ────────────────────────── petits utilitaires ──────────────────────────
+def to_float(s: pd.Series) -> pd.Series:
+    return pd.to_numeric(
+        s.astype(str).str.replace(r"[ ,\xa0]", "", regex=True).str.replace(",", "."),
+        errors="coerce",
+    )
+
+def shuffled(df: pd.DataFrame, g: random.Random | None = None) -> pd.DataFrame:
+    return df.sample(frac=1, random_state=(g or rng).randint(0, 1_000_000)).reset_index(drop=True)
+
+def cat_code(tag: str) -> int: return -1 if "LOW" in tag else (1 if "HIGH" in tag else 0)
+
+
+# ────── 1. lecture de Lexique.xlsx ──────────────────────────────────────
+def load_sheets() -> Dict[str, Dict]:
+    if SOURCE == "csv": return lexique_blocks.load(CSV)
+    return lexicon_cache.load(XLSX, _parse_sheets, "lecture_app")
+
+def _parse_sheets() -> Dict[str, Dict]:
+    if not XLSX.exists():
+        raise RuntimeError(f"Fichier « {XLSX.name} » introuvable")
+
+    xls  = pd.ExcelFile(XLSX)
+    shs  = [s for s in xls.sheet_names if s.lower().startswith("feuil")]
+    if len(shs) != 4:
+        raise RuntimeError("Il faut exactement 4 feuilles Feuil1 … Feuil4")
+
+    feuilles, all_freq = {}, set()
+    for sh in shs:
+        df = xls.parse(sh)
+        df.columns = df.columns.str.strip().str.lower()
+        freq_cols  = [c for c in df.columns if c.startswith("freq")]
+        all_freq.update(freq_cols)
+
+        need = ["ortho", "old20", "pld20", "nblettres", "nbphons"] + freq_cols
+        if any(c not in df.columns for c in need):
+            raise RuntimeError(f"Colonnes manquantes dans {sh}")
+
+        for c in NUM_BASE + freq_cols:
+            df[c] = to_float(df[c])
+
+        df["ortho"] = df["ortho"].astype(str).str.upper()
+        df          = df.dropna(subset=need).reset_index(drop=True)
+
+        stats = {f"m_{c}": df[c].mean()        for c in NUM_BASE}
+        stats |= {f"sd_{c}": df[c].std(ddof=0) for c in NUM_BASE + freq_cols}
+        feuilles[sh] = dict(df=df, stats=stats, freq_cols=freq_cols)
+
+    feuilles["all_freq_cols"] = sorted(all_freq)
+    return feuilles
+
+
+# ────── 2. tirage aléatoire des 80 mots ─────────────────────────────────
+def masks(df, st_): return dict(
+    LOW_OLD=df.old20 < st_["m_old20"],
+    HIGH_OLD=df.old20 > st_["m_old20"],
+    LOW_PLD=df.pld20 < st_["m_pld20"],
+    HIGH_PLD=df.pld20 > st_["m_pld20"],
+)
+
+def make_sampler(F) -> Sampler:
+    idx = NeighbourIndex(w for sh, d in F.items() if sh != "all_freq_cols"
+                         for w in d["df"]["ortho"]) if NO_NEIGHBOURS else None
+    return Sampler(F, masks, n_pick=N_PER_FEUIL_TAG, mean_factor=MEAN_FACTOR_OLDPLD,
+                   mean_delta=MEAN_DELTA, sd_mult=SD_MULT, max_try=MAX_TRY_TAG,
+                   neighbours=idx)
+
+def tagged(samp, feuille, tag):
+    samp["source"], samp["group"] = feuille, tag
+    samp["old_cat"] = cat_code(tag) if "OLD" in tag else 0
+    samp["pld_cat"] = cat_code(tag) if "PLD" in tag else 0
+    return samp
+
+def pick_five(tag, feuille, used, F, S, stats=None, g=None):
+    rows = next(S.accepted(tag, feuille, used, g or rng, stats), None)   # 1er lot NumPy accepté
+    return None if rows is None else tagged(F[feuille]["df"].iloc[rows].copy(), feuille, tag)
+
+def build_sheet(solver: str = SOLVER, stats: TirageStats | None = None,
+                F: Dict | None = None, S: Sampler | None = None,
+                g: random.Random | None = None) -> pd.DataFrame:
+    """Liste de 80 mots ; g : générateur propre à l'appelant (threads
+    concurrents), sinon `rng` du module."""
+    g = g or rng
+    with stage(stats, "load"):    F = F or load_sheets()
+    with stage(stats, "compile"): S = S or make_sampler(F)
+    ALL= F["all_freq_cols"]
+    cols = ["ortho"]+NUM_BASE+ALL+["source","group","old_cat","pld_cat"]
+    if solver == "backtrack":
+        try:
+            with stage(stats, "solve"): cells = solve(S, TAGS, g, stats=stats)
+        except Infeasible as exc: raise RuntimeError(f"Impossible de générer la liste ({exc}).") from exc
+        with stage(stats, "assemble"):
+            groups = [shuffled(pd.concat([tagged(F[sh]["df"].iloc[cells[sh,tag]].copy(), sh, tag)
+                                          for sh in S.sheets], ignore_index=True), g) for tag in TAGS]
+            return pd.concat(groups, ignore_index=True)[cols]
+    for _ in range(MAX_TRY_FULL):
+        take=set(); groups=[]; ok=True          # mots de toute la liste (voisins)
+        for tag in TAGS:
+            bloc=[]
+            for sh in S.sheets:
+                with stage(stats, "draw"): sub=pick_five(tag,sh,take,F,S,stats,g)
+                if sub is None: ok=False; break
+                bloc.append(sub); take.update(sub.ortho)
+            if not ok: break
+            with stage(stats, "assemble"): groups.append(shuffled(pd.concat(bloc, ignore_index=True), g))
+        if ok:
+            df=pd.concat(groups, ignore_index=True)
+            return df[cols]
+        if stats is not None: stats.restarts += 1
+    raise RuntimeError("Impossible de générer la liste.")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Cache binaire du lexique (Feuil1 … Feuil4 nettoyées).
+• Un répertoire par (script, empreinte SHA-256 de Lexique.xlsx, empreinte
+  du fichier source qui définit parse — nettoyage compris)
+• Une colonne = un fichier .npy, relu en mémoire mappée (mmap_mode="r") ;
+  colonnes texte : '<U…' + masque des valeurs manquantes (relues None)
+• meta.json : feuilles, colonnes, stats, freq_cols, all_freq_cols
+Le classeur n'est relu (openpyxl + to_float) que si son contenu ou le code
+qui le nettoie change.
+"""
+
+from __future__ import annotations
+import hashlib, json, os, shutil, tempfile
+from pathlib import Path
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+CACHE_DIR = Path(os.getenv("LEXIQUE_CACHE", Path(__file__).with_name(".lexique_cache")))
+VERSION   = 2                     # à incrémenter si le format change
+
+
+def digest(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def code_digest(parse: Callable) -> str:
+    """Empreinte du fichier où parse est défini (et de ce module) : une
+    modification du nettoyage invalide le cache."""
+    h = hashlib.sha256(f"v{VERSION}".encode())
+    for f in (parse.__code__.co_filename, __file__):
+        try:
+            h.update(Path(f).read_bytes())
+        except OSError:                             # source introuvable (exec)
+            h.update(f.encode())
+    return h.hexdigest()[:8]
+
+
+# ─── écriture ────────────────────────────────────────────────────────────
+def _write(F: Dict[str, dict], dest: Path) -> None:
+    tmp = Path(tempfile.mkdtemp(prefix=f".{dest.name}.", dir=dest.parent))
+    meta = {"version": VERSION, "all_freq_cols": F["all_freq_cols"], "sheets": {}}
+    for sh, d in F.items():
+        if sh == "all_freq_cols":
+            continue
+        df, cols, nulls = d["df"], [], []
+        for i, c in enumerate(df.columns):
+            a = df[c].to_numpy()
+            if a.dtype == object or not np.issubdtype(a.dtype, np.number):
+                na = df[c].isna().to_numpy()
+                a  = df[c].where(~na, "").astype(str).to_numpy(dtype=str)   # '<U…' fixe
+                if na.any():
+                    np.save(tmp / f"{sh}.{i}.na.npy", na, allow_pickle=False)
+                    nulls.append(i)
+            np.save(tmp / f"{sh}.{i}.npy", a, allow_pickle=False)
+            cols.append(c)
+        meta["sheets"][sh] = {"columns": cols, "nulls": nulls,
+                              "stats": {k: float(v) for k, v in d["stats"].items()},
+                              "freq_cols": d["freq_cols"]}
+    (tmp / "meta.json").write_text(json.dumps(meta, ensure_ascii=False), "utf-8")
+    try:
+        os.replace(tmp, dest)                       # publication atomique
+    except OSError:                                 # un autre process a gagné
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+# ─── lecture ─────────────────────────────────────────────────────────────
+def _read(src: Path) -> Dict[str, dict]:
+    meta = json.loads((src / "meta.json").read_text("utf-8"))
+    if meta.get("version") != VERSION:
+        raise ValueError("format de cache obsolète")
+    F: Dict[str, dict] = {}
+    for sh, m in meta["sheets"].items():
+        data = {}
+        for i, c in enumerate(m["columns"]):
+            a = np.load(src / f"{sh}.{i}.npy", mmap_mode="r", allow_pickle=False)
+            if a.dtype.kind == "U":
+                a = pd.Series(a, dtype=object)
+                if i in m["nulls"]:
+                    a[np.load(src / f"{sh}.{i}.na.npy", allow_pickle=False)] = None
+            data[c] = a
+        F[sh] = {"df": pd.DataFrame(data, copy=False), "stats": m["stats"],
+                 "freq_cols": m["freq_cols"]}
+    F["all_freq_cols"] = meta["all_freq_cols"]
+    return F
+
+
+def load(xlsx: Path, parse: Callable[[], Dict[str, dict]], name: str) -> Dict[str, dict]:
+    """Feuilles nettoyées de `xlsx` : depuis le cache si les empreintes du
+    classeur et du code de `parse` sont connues, sinon via `parse()` puis
+    écriture du cache.  `name` sépare les caches de scripts dont le
+    nettoyage diffère."""
+    if not xlsx.exists():
+        return parse()                   # parse() signale l'erreur à sa façon
+    dest = CACHE_DIR / f"{name}-{digest(xlsx)}-{code_digest(parse)}"
+    if dest.is_dir():
+        try:
+            return _read(dest)
+        except (OSError, ValueError, KeyError):
+            shutil.rmtree(dest, ignore_errors=True)
+    F = parse()
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        for old in CACHE_DIR.glob(f"{name}-*"):     # anciennes empreintes
+            if old.is_dir() and old != dest:
+                shutil.rmtree(old, ignore_errors=True)
+        _write(F, dest)
+    except OSError:                                 # disque en lecture seule
+        pass
+    return F
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Construction des quatre feuilles directement depuis Lexique383.csv.
+• Lecture en flux (pd.read_csv par paquets), colonnes typées d'emblée ;
+  repli tolérant (virgule décimale, espaces) seulement si le typage échoue
+• Le CSV est un tableau croisé : un mot à k homographes a toutes ses
+  colonnes sommées k fois (k = nblettres / longueur) ; elles sont ramenées
+  à une entrée, fréquences comprises : le classeur garde une ligne par
+  homographe, une ligne du CSV vaut donc en moyenne une ligne du classeur
+• ortho normalisé (majuscules) puis rangé par bloc de longueur :
+  Feuil1 4_5, Feuil2 6_7, Feuil3 8_9, Feuil4 10_11 (letters_block de l'API)
+• Colonnes stockées en float32 / int8, stats m_ / sd_ accumulées pendant
+  la lecture (sommes en float64)
+Le résultat a la forme de load_sheets() et passe par lexicon_cache : le
+CSV n'est relu que si son contenu change.
+
+Usage :  python lexique_blocks.py [Lexique383.csv]
+"""
+
+from __future__ import annotations
+import argparse, time
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import numpy as np
+import pandas as pd
+
+import lexicon_cache
+
+CSV    = Path(__file__).with_name("Lexique383.csv")
+BLOCKS = {"Feuil1": (4, 5), "Feuil2": (6, 7), "Feuil3": (8, 9), "Feuil4": (10, 11)}
+CHUNK  = 50_000
+SUMMED = ("nbphons", "old20", "pld20")          # sommés par le tableau croisé (+ freq*)
+INTS   = ("nblettres", "nbphons")               # int8
+NEED   = ("nblettres", "nbphons", "old20", "pld20")
+
+
+def _header(path: Path) -> List[str]:
+    with open(path, encoding="utf-8-sig") as fh:
+        head = fh.readline().rstrip("\r\n").split(";")
+    return ["ortho"] + [c.strip().lower() for c in head[1:]]
+
+
+def _chunks(path: Path, names: List[str], typed: bool) -> Iterator[pd.DataFrame]:
+    num = {c: "float64" for c in names[1:]} if typed else {c: str for c in names[1:]}
+    yield from pd.read_csv(path, sep=";", encoding="utf-8-sig", header=0, names=names,
+                           dtype={"ortho": str} | num, keep_default_na=False,
+                           na_values=[""], chunksize=CHUNK)
+
+
+def _num(s: pd.Series) -> pd.Series:
+    """Repli : « 1 234,5 » → 1234.5 (même règle que to_float)."""
+    return pd.to_numeric(s.str.replace(" ", "", regex=False)
+                          .str.replace("\xa0", "", regex=False)
+                          .str.replace(",", ".", regex=False), errors="coerce")
+
+
+def _clean(df: pd.DataFrame, typed: bool) -> pd.DataFrame:
+    if not typed:
+        for c in df.columns[1:]:
+            df[c] = _num(df[c])
+    df = df.dropna(subset=["ortho", *NEED])
+    word = df["ortho"].str.strip()
+    L = word.str.len()
+    k = (df["nblettres"] / L).round().clip(lower=1)
+    for c in (*SUMMED, *(c for c in df.columns if c.startswith("freq"))):
+        df[c] = df[c] / k
+    df["nbphons"] = df["nbphons"].round()       # homographes non homophones
+    df["nblettres"] = L
+    df["ortho"] = word.str.upper()
+    return df
+
+
+def build(path: Path = CSV) -> Dict[str, dict]:
+    """Feuilles {Feuil1 … Feuil4: {df, stats, freq_cols}} + all_freq_cols."""
+    names = _header(path)
+    freqs = [c for c in names if c.startswith("freq")]
+    cols  = ["ortho", *NEED, *freqs]
+    for typed in (True, False):
+        parts: Dict[str, List[pd.DataFrame]] = {sh: [] for sh in BLOCKS}
+        acc = {sh: np.zeros((3, len(cols) - 1)) for sh in BLOCKS}      # n, Σx, Σx²
+        try:
+            for chunk in _chunks(path, names, typed):
+                df = _clean(chunk, typed)
+                for sh, (lo, hi) in BLOCKS.items():
+                    b = df.loc[df["nblettres"].between(lo, hi), cols]
+                    X = b[cols[1:]].to_numpy(np.float64)
+                    acc[sh] += [np.full(X.shape[1], len(X)), X.sum(0), (X * X).sum(0)]
+                    parts[sh].append(b)
+            break
+        except ValueError:              # décimales exotiques : relecture tolérante
+            continue
+    F: Dict[str, dict] = {}
+    for sh, ps in parts.items():
+        df = pd.concat(ps, ignore_index=True)
+        for c in cols[1:]:
+            df[c] = df[c].astype(np.int8 if c in INTS else np.float32)
+        n, s1, s2 = acc[sh]
+        m  = s1 / np.maximum(n, 1)
+        sd = np.sqrt(np.maximum(s2 / np.maximum(n, 1) - m * m, 0))
+        mean, std = dict(zip(cols[1:], m)), dict(zip(cols[1:], sd))
+        st  = {f"m_{c}": float(mean[c]) for c in ("old20", "pld20", "nblettres", "nbphons")}
+        st |= {f"sd_{c}": float(std[c]) for c in ("old20", "pld20", "nblettres", "nbphons", *freqs)}
+        F[sh] = {"df": df, "stats": st, "freq_cols": freqs}
+    F["all_freq_cols"] = sorted(freqs)
+    return F
+
+
+def load(path: Path = CSV) -> Dict[str, dict]:
+    """build() via le cache binaire (clé : empreinte du CSV)."""
+    return lexicon_cache.load(path, lambda: build(path), "blocks")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Feuilles par blocs de longueur depuis le CSV.")
+    ap.add_argument("csv", nargs="?", type=Path, default=CSV)
+    a = ap.parse_args()
+    tic = time.perf_counter()
+    F = load(a.csv)
+    for sh, (lo, hi) in BLOCKS.items():
+        d = F[sh]
+        print(f"{sh} ({lo}_{hi}) : {len(d['df']):6d} mots  "
+              f"old20 {d['stats']['m_old20']:.2f} ± {d['stats']['sd_old20']:.2f}")
+    print(f"{time.perf_counter()-tic:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Échantillonneur vectorisé (NumPy) pour pick_five.
+Chaque pool feuille × tag est extrait une seule fois en tableaux float
+contigus ; les sous-ensembles candidats de 5 mots sont tirés par lots et
+les contraintes (extrémité old20/pld20, moyennes lettres/phons, écarts-types)
+sont évaluées par réductions sur ces tableaux.  Seul le sous-ensemble
+accepté est transformé en DataFrame, par le script appelant.
+"""
+
+from __future__ import annotations
+import json, random, time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterator, List
+
+import numpy as np
+
+BASE  = ("nblettres", "nbphons", "old20", "pld20")     # colonnes 0..3 de X
+SDKEY = {"nblettres": "letters", "nbphons": "phons",
+         "old20": "old20", "pld20": "pld20"}            # freq* → "freq"
+BATCH = 1_000                                           # candidats par lot
+
+
+class TirageStats:
+    """Compteurs d'un tirage (optionnels : None = aucune mesure).
+    cells    : {"Feuil1/LOW_OLD": {calls, tries, accepted, failures,
+                                    rejections: {contrainte: n}}}
+    restarts : tentatives complètes de build_sheet abandonnées
+    stages   : secondes cumulées par étape (load, compile, draw, …)"""
+
+    def __init__(self):
+        self.cells: Dict[str, dict] = {}
+        self.restarts = 0
+        self.stages: Dict[str, float] = {}
+
+    def cell(self, feuille: str, tag: str) -> dict:
+        return self.cells.setdefault(f"{feuille}/{tag}", {
+            "calls": 0, "tries": 0, "accepted": 0, "failures": 0, "rejections": {}})
+
+    @contextmanager
+    def stage(self, name: str):
+        tic = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - tic
+
+    def to_dict(self) -> dict:
+        return {"restarts": self.restarts,
+                "stages": {k: round(v, 6) for k, v in self.stages.items()},
+                "tries": sum(c["tries"] for c in self.cells.values()),
+                "cells": self.cells}
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False)
+
+
+def stage(stats: TirageStats | None, name: str):
+    """stats.stage(name), ou rien si la mesure est désactivée."""
+    return stats.stage(name) if stats is not None else nullcontext()
+
+
+def _neighbour_pairs(ortho: np.ndarray, nb: Dict[str, List[str]]) -> dict:
+    """Paires de lignes voisines (distance ≤ 1) d'une feuille, codées
+    i·N + j (i < j), et, pour chaque mot de `nb` (toutes feuilles, en
+    minuscules → ses formes voisines), les lignes de la feuille qui lui
+    sont voisines ou homographes."""
+    rows: Dict[str, List[int]] = {}
+    for i, w in enumerate(ortho):
+        rows.setdefault(str(w).lower(), []).append(i)
+    N, pairs, near = len(ortho), set(), {}
+    for w, fs in nb.items():
+        jj = rows.get(w, []) + [j for f in fs for j in rows.get(f, ())]
+        if jj:
+            near[w] = np.array(jj, np.int64)
+    for w, ii in rows.items():
+        for i in ii:
+            pairs.update(min(i, j) * N + max(i, j) for j in near[w] if j != i)
+    return {"pairs": np.array(sorted(pairs), np.int64), "near": near}
+
+
+class Sampler:
+    """Pools compilés d'un classeur F (sortie de load_sheets)."""
+
+    def __init__(self, F: Dict[str, dict], masks: Callable, *, n_pick: int,
+                 mean_factor: float, mean_delta: dict, sd_mult: dict,
+                 max_try: int, neighbours=None):
+        """neighbours : index offrant within(mot, 1) (ld20.NeighbourIndex) ;
+        s'il est fourni, deux voisins orthographiques (ou homographes) ne
+        peuvent figurer dans la même liste, feuilles confondues : `used`
+        (pool, accepted) contient alors les mots déjà pris dans toute la
+        liste."""
+        self.n, self.max_try = n_pick, max_try
+        self.iu = np.triu_indices(n_pick, 1)
+        self.linked = neighbours is not None     # feuilles liées par les voisins
+        self.sheets: Dict[str, dict] = {}
+        for sh, d in F.items():
+            if sh == "all_freq_cols":
+                continue
+            df, s, fqs = d["df"], d["stats"], d["freq_cols"]
+            cols = list(BASE) + list(fqs)
+            m_old = s["m_old20"]; f_old = mean_factor * s["sd_old20"]
+            m_pld = s["m_pld20"]; f_pld = mean_factor * s["sd_pld20"]
+            self.sheets[sh] = dict(
+                cols   = cols,
+                X      = np.ascontiguousarray(df[cols].to_numpy(dtype=np.float64)),
+                ortho  = df["ortho"].to_numpy(dtype=object),
+                pools  = {t: np.flatnonzero(m.to_numpy())
+                          for t, m in masks(df, s).items()},
+                sd_max = np.array([s[f"sd_{c}"] * sd_mult[SDKEY.get(c, "freq")]
+                                   for c in cols]),
+                m_lp   = np.array([s["m_nblettres"], s["m_nbphons"]]),
+                tol_lp = np.array([mean_delta["letters"] * s["sd_nblettres"],
+                                   mean_delta["phons"]   * s["sd_nbphons"]]),
+                # tag → (colonne, signe, borne) : signe·moyenne > signe·borne
+                ext    = {"LOW_OLD":  (2, -1, m_old - f_old),
+                          "HIGH_OLD": (2,  1, m_old + f_old),
+                          "LOW_PLD":  (3, -1, m_pld - f_pld),
+                          "HIGH_PLD": (3,  1, m_pld + f_pld)},
+            )
+        if neighbours is not None:
+            words = {str(w).lower() for P in self.sheets.values() for w in P["ortho"]}
+            nb = {w: [f for _, f in neighbours.within(w, 1)] for w in words}
+            for P in self.sheets.values():
+                P |= _neighbour_pairs(P["ortho"], nb)
+
+    # ─── pool disponible ────────────────────────────────────────────────
+    def pool(self, tag: str, feuille: str, used: set[str]) -> np.ndarray:
+        P = self.sheets[feuille]
+        idx = P["pools"][tag]
+        if used:
+            idx = idx[~np.isin(P["ortho"][idx], list(used))]
+            if "near" in P:                  # voisins des mots pris (toute la liste)
+                keys = (str(w).lower() for w in used)
+                near = [P["near"][k] for k in keys if k in P["near"]]
+                if near:
+                    idx = idx[~np.isin(idx, np.concatenate(near))]
+        return idx
+
+    # ─── contraintes sur un lot (b, n) d'indices de lignes ──────────────
+    def check_parts(self, tag: str, feuille: str,
+                    rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """Un masque booléen (b,) par contrainte élémentaire."""
+        P = self.sheets[feuille]
+        V = P["X"][rows]                                 # (b, n, k)
+        mu, sd = V.mean(axis=1), V.std(axis=1)           # ddof=0
+        col, sign, bound = P["ext"][tag]
+        lp = np.abs(mu[:, :2] - P["m_lp"]) <= P["tol_lp"]
+        sd_ok = sd <= P["sd_max"]
+        parts = {f"ext_{P['cols'][col]}": sign * mu[:, col] > sign * bound,
+                 "mean_nblettres": lp[:, 0], "mean_nbphons": lp[:, 1]}
+        parts |= {f"sd_{c}": sd_ok[:, j] for j, c in enumerate(P["cols"])}
+        if "pairs" in P:
+            a, b = rows[:, self.iu[0]], rows[:, self.iu[1]]
+            code = np.minimum(a, b) * len(P["ortho"]) + np.maximum(a, b)
+            parts["neighbours"] = ~np.isin(code, P["pairs"]).any(axis=1)
+        return parts
+
+    def check(self, tag: str, feuille: str, rows: np.ndarray) -> np.ndarray:
+        return np.logical_and.reduce(list(self.check_parts(tag, feuille, rows).values()))
+
+    # ─── tirage par lots ────────────────────────────────────────────────
+    @staticmethod
+    def subsets(g: np.random.Generator, m: int, n: int, b: int) -> np.ndarray:
+        """Au plus b sous-ensembles uniformes de n indices distincts dans
+        range(m), triés par ligne."""
+        p_distinct = np.prod((m - np.arange(n)) / m)
+        idx = g.integers(0, m, size=(int(np.ceil(b / p_distinct)), n))
+        idx.sort(axis=1)
+        return idx[(np.diff(idx, axis=1) != 0).all(axis=1)][:b]
+
+    def accepted(self, tag: str, feuille: str, used: set[str],
+                 rng: random.Random,
+                 stats: TirageStats | None = None) -> Iterator[np.ndarray]:
+        """Génère, dans l'ordre du tirage, les sous-ensembles (indices de
+        lignes de F[feuille]["df"]) qui passent toutes les contraintes ;
+        au plus max_try candidats distincts sont examinés.  Avec `stats`,
+        essais et rejets sont comptés comme pour un tirage séquentiel :
+        jusqu'au candidat accepté inclus."""
+        c = stats.cell(feuille, tag) if stats is not None else None
+        if c is not None:
+            c["calls"] += 1
+
+        def tally(parts, a, b):                          # candidats [a, b)
+            c["tries"] += int(b - a)
+            rej = c["rejections"]
+            for k, v in parts.items():
+                rej[k] = rej.get(k, 0) + int(b - a - v[a:b].sum())
+
+        pool = self.pool(tag, feuille, used)
+        if len(pool) >= self.n:
+            g = np.random.default_rng(rng.getrandbits(64))
+            left = self.max_try
+            while left > 0:
+                idx = self.subsets(g, len(pool), self.n, min(BATCH, left))
+                left -= len(idx)
+                rows  = pool[idx]
+                parts = self.check_parts(tag, feuille, rows)
+                seen  = 0
+                for i in np.flatnonzero(np.logical_and.reduce(list(parts.values()))):
+                    if c is not None:
+                        tally(parts, seen, i + 1); c["accepted"] += 1
+                    seen = i + 1
+                    yield rows[i]
+                if c is not None:
+                    tally(parts, seen, len(rows))
+        if c is not None:
+            c["failures"] += 1
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Recherche contrainte (DFS bornée) – alternative au rejet aléatoire.
+• Bornes sur sommes partielles old20 / pld20 / nblettres / nbphons
+• Borne sur la variance partielle (toutes colonnes, freq* comprises)
+• Retour arrière limité à la feuille concernée ; avec la contrainte
+  « pas de voisins » (Sampler.linked), les mots des feuilles déjà résolues
+  restreignent les suivantes, et un échec relance la recherche complète
+  (au plus MAX_RESTART fois)
+• Preuve d'infaisabilité dès qu'une cellule épuise son arbre de recherche
+"""
+
+from __future__ import annotations
+import random
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from sampler import Sampler, TirageStats
+
+MAX_NODES = 200_000        # nœuds DFS par cellule avant abandon (non prouvé)
+MAX_ALT   = 50             # solutions essayées par cellule avant retour arrière
+MAX_RESTART = 5            # relances complètes (feuilles liées par les voisins)
+EPS       = 1e-9
+
+
+class Infeasible(RuntimeError):
+    """Aucune solution : `proved` indique une recherche exhaustive."""
+
+    def __init__(self, feuille: str, tag: str | None, proved: bool):
+        self.feuille, self.tag, self.proved = feuille, tag, proved
+        cell = f"{feuille} × {tag}" if tag else feuille
+        why  = "infaisable (prouvé)" if proved else "budget de recherche épuisé"
+        super().__init__(f"{cell} : {why}")
+
+
+# ─── bornes d'une cellule ────────────────────────────────────────────────
+def _bounds(S: Sampler, tag: str, feuille: str, n: int):
+    """Intervalles [lo, hi] sur les sommes de chaque colonne de X."""
+    P = S.sheets[feuille]
+    k = P["X"].shape[1]
+    lo, hi = np.full(k, -np.inf), np.full(k, np.inf)
+    lo[:2] = n * (P["m_lp"] - P["tol_lp"])
+    hi[:2] = n * (P["m_lp"] + P["tol_lp"])
+    col, sign, bound = P["ext"][tag]
+    if sign < 0: hi[col] = min(hi[col], n * bound)
+    else:        lo[col] = max(lo[col], n * bound)
+    return lo, hi, P["sd_max"] ** 2 + EPS
+
+
+def cell_solutions(S: Sampler, tag: str, feuille: str, used: set[str],
+                   rng: random.Random, max_nodes: int = MAX_NODES,
+                   stats: TirageStats | None = None) -> Iterator[np.ndarray]:
+    """Solutions (indices de lignes) d'une cellule, ordre aléatoire.
+    Lève Infeasible(proved=True) si l'arbre est épuisé sans solution,
+    Infeasible(proved=False) si le budget de nœuds est atteint.
+    Avec `stats`, les nœuds visités sont comptés comme essais."""
+    c = stats.cell(feuille, tag) if stats is not None else None
+    if c is not None:
+        c["calls"] += 1
+    n    = S.n
+    pool = S.pool(tag, feuille, used)
+    if len(pool) < n:
+        raise Infeasible(feuille, tag, True)
+    order = np.array(pool)
+    rng.shuffle(order)
+    X = S.sheets[feuille]["X"]
+    lo, hi, var_max = _bounds(S, tag, feuille, n)
+
+    # sommes des r plus petites / plus grandes valeurs du pool (r = 0..n)
+    srt   = np.sort(X[order], axis=0)
+    zero  = np.zeros((1, X.shape[1]))
+    min_r = np.vstack([zero, np.cumsum(srt[:n], axis=0)])
+    max_r = np.vstack([zero, np.cumsum(srt[::-1][:n], axis=0)])
+    if np.any(min_r[n] > hi) or np.any(max_r[n] < lo):
+        raise Infeasible(feuille, tag, True)
+
+    m, nodes, found = len(order), 0, False
+
+    def dfs(start: int, chosen: List[int], s1: np.ndarray, s2: np.ndarray):
+        nonlocal nodes
+        r = n - len(chosen)
+        if r == 1:                                   # dernier mot : vectorisé
+            cand = order[start:]
+            rows = np.column_stack([np.tile(chosen, (len(cand), 1)), cand])
+            nodes += len(cand)
+            ok = rows[S.check(tag, feuille, rows)]
+            yield from ok[rng.sample(range(len(ok)), len(ok))]
+            return
+        # candidats mélangés à chaque niveau (rng de l'appelant : tirage
+        # reproductible) — sinon les premières solutions partagent leurs
+        # premiers mots dans l'ordre du pool
+        idx = list(range(start, m - r + 1))
+        rng.shuffle(idx)
+        for i in idx:
+            nodes += 1
+            if nodes > max_nodes:
+                raise Infeasible(feuille, tag, False)
+            x = X[order[i]]
+            t1, t2, kk = s1 + x, s2 + x * x, len(chosen) + 1
+            if np.any(t1 + min_r[r - 1] > hi) or np.any(t1 + max_r[r - 1] < lo):
+                continue
+            # n·var(total) ≥ k·var(partiel) : borne inférieure sur σ final
+            if np.any((t2 - t1 * t1 / kk) / n > var_max):
+                continue
+            yield from dfs(i + 1, chosen + [order[i]], t1, t2)
+
+    k0 = np.zeros(X.shape[1])
+    try:
+        for rows in dfs(0, [], k0, k0):
+            found = True
+            if c is not None:
+                c["accepted"] += 1
+            yield rows
+    finally:
+        if c is not None:
+            c["tries"] += nodes
+    if not found:
+        if c is not None:
+            c["failures"] += 1
+        raise Infeasible(feuille, tag, True)
+
+
+# ─── une feuille : les 4 tags avec retour arrière ───────────────────────
+def solve_sheet(S: Sampler, feuille: str, tags, rng: random.Random,
+                max_nodes: int = MAX_NODES, max_alt: int = MAX_ALT,
+                stats: TirageStats | None = None,
+                taken: frozenset = frozenset()) -> Dict[str, np.ndarray]:
+    """taken : mots déjà pris dans les autres feuilles de la liste."""
+    ortho = S.sheets[feuille]["ortho"]
+    tags  = list(tags)
+    base  = set(taken)
+
+    def rec(i: int, used: set[str]) -> Dict[str, np.ndarray] | None:
+        if i == len(tags):
+            return {}
+        try:
+            for alt, rows in enumerate(cell_solutions(S, tags[i], feuille, used,
+                                                      rng, max_nodes, stats)):
+                rest = rec(i + 1, used | set(ortho[rows]))
+                if rest is not None:
+                    return {tags[i]: rows, **rest}
+                if alt + 1 >= max_alt:
+                    break
+        except Infeasible:
+            if used == base:               # infaisable sans mot pris dans la feuille
+                raise
+        return None
+
+    out = rec(0, base)
+    if out is None:
+        raise Infeasible(feuille, None, False)
+    return out
+
+
+def solve(S: Sampler, tags, rng: random.Random, max_nodes: int = MAX_NODES,
+          max_alt: int = MAX_ALT, stats: TirageStats | None = None
+          ) -> Dict[Tuple[str, str], np.ndarray]:
+    """{(feuille, tag): indices} pour toutes les cellules.  Chaque cellule
+    est d'abord testée seule (used vide) pour prouver vite une
+    infaisabilité, avant toute recherche combinée."""
+    for sh in S.sheets:
+        for tag in tags:
+            next(cell_solutions(S, tag, sh, set(), rng, max_nodes, stats))
+    for attempt in range(MAX_RESTART):
+        out, taken = {}, set()
+        try:
+            for sh in S.sheets:
+                for tag, rows in solve_sheet(S, sh, tags, rng, max_nodes, max_alt,
+                                             stats, frozenset(taken)).items():
+                    out[sh, tag] = rows
+                    taken.update(S.sheets[sh]["ortho"][rows])
+            return out
+        except Infeasible:
+            if not (S.linked and taken) or attempt + 1 == MAX_RESTART:
+                raise
+            if stats is not None:
+                stats.restarts += 1
@@ -0,0 +1,77 @@
+# tests/test_db.py  –  schéma vérifié et migré à la connexion (déploiement sans migration manuelle)
+import sqlite3, sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api"))
+
+
+class FakeStore:
+    """Backend dont ensure_schema échoue les `fail` premières fois."""
+
+    def __init__(self, fail: int = 0):
+        self.calls, self.fail = 0, fail
+
+    def connect(self):
+        return sqlite3.connect(":memory:")
+
+    def ensure_schema(self, cnx):
+        self.calls += 1
+        if self.calls <= self.fail:
+            raise sqlite3.OperationalError("ALTER refusé")
+
+
+def test_schema_ensured_once_per_process(monkeypatch):
+    from shared_code import db                # SQL_CONN lu à l'import (test_timing)
+    st = FakeStore(fail=1)
+    monkeypatch.setattr(db, "open_store", lambda conn_str: st)
+    monkeypatch.setattr(db, "_ready", set())
+    with pytest.raises(sqlite3.OperationalError):
+        db.connect("odbc")
+    for _ in range(3):
+        db.connect("odbc").close()
+    assert st.calls == 2                      # échec rejoué, puis une seule fois
+
+
+PRE_TELEMETRY = """CREATE TABLE resultats(
+    id INTEGER PRIMARY KEY AUTOINCREMENT, word TEXT, rt_ms INTEGER, response TEXT,
+    phase TEXT, participant TEXT, groupe TEXT, nblettres INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP)"""
+
+
+def rounded(vals) -> list:
+    return [None if v is None or v != v else round(v, 6) for v in vals]   # NaN → NULL
+
+
+def test_pre_telemetry_table_migrated_on_connect(tmp_path, monkeypatch):
+    import importlib, random
+    from contextlib import closing
+    from shared_code import db, store
+    path = tmp_path / "results.db"
+    with closing(sqlite3.connect(path)) as old:               # base déployée avant TIMING
+        old.execute(PRE_TELEMETRY)
+        old.execute("INSERT INTO resultats(word, rt_ms, response, phase, participant, groupe,"
+                    " nblettres) VALUES ('MOT', 500, 'MOT', 'test', 'P0', 'LOW_OLD', 3)")
+        old.commit()
+    monkeypatch.setattr(db, "SQL_CONN", f"{store.SQLITE}{path}")
+    data = [t for t in importlib.import_module("load_test").payload("P1", random.Random(0))
+            if t["phase"] == "test"]                          # comme save_results
+    with closing(db.connect()) as cnx:
+        assert db.insert_results(data, cnx) == len(data)
+        rows = [r for rs in db.iter_results(cnx) for r in rs]
+    with closing(sqlite3.connect(path)) as new:
+        cols = {r[1] for r in new.execute("PRAGMA table_info(resultats)")}
+    assert cols >= set(db.RAW_COLS)
+    assert len(rows) == 1 + len(data)
+    timing = [rounded(r[db.RAW_COLS.index(c)] for c in db.TIMING_COLS) for r in rows]
+    sent = [rounded(t.get(c) for c in db.TIMING_COLS) for t in data]
+    assert timing[0] == [None] * len(db.TIMING_COLS)                 # ancienne ligne : NULL
+    assert timing[1:] == sent and any(map(any, sent))                # nouvelles : télémétrie
+
+
+def test_odbc_schema_adds_each_timing_column():
+    from shared_code import store
+    for col, typ in store.TIMING:                      # ALTER conditionnel, rejoué sans effet
+        assert (f"IF COL_LENGTH('dbo.resultats', '{col}') IS NULL\n"
+                f"        ALTER TABLE dbo.resultats ADD {col} {typ} NULL;") in store.OdbcStore.SCHEMA
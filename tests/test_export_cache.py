@@ -0,0 +1,122 @@
+# tests/test_export_cache.py  –  instantané incrémental et ETag de download_all
+import csv, gzip, importlib, io, os, random, sys, tempfile
+from contextlib import closing
+from pathlib import Path
+
+import pytest
+
+# les modules de l'API lisent leur configuration à l'import
+TMP = tempfile.mkdtemp(prefix="test_export_cache.")
+os.environ.update(SQL_CONN=f"sqlite:///{TMP}/results.db",
+                  REPORT_QUEUE=f"{TMP}/report_jobs.sqlite",
+                  EXPORT_CACHE=f"{TMP}/export_cache",
+                  STORAGE_CONN=f"file://{TMP}/blobs")
+os.environ.pop("API_SECRET", None)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api"))
+
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    """Base et cache propres au test (le module peut avoir été importé par
+    un autre fichier de tests avec sa propre configuration)."""
+    import azure.functions as func
+    from shared_code import db, export_cache
+    download_all = importlib.import_module("download_all")
+    load_test = importlib.import_module("load_test")
+    monkeypatch.setattr(db, "SQL_CONN", f"sqlite:///{tmp_path}/results.db")
+    monkeypatch.setattr(export_cache, "CACHE_DIR", tmp_path / "export_cache")
+    monkeypatch.setattr(export_cache, "LOCK_FILE", tmp_path / "export_cache.lock")
+    monkeypatch.setattr(download_all, "API_SECRET", None)
+    rng = random.Random(0)
+
+    def upload(pid):
+        with closing(db.connect()) as cnx:
+            db.insert_results(load_test.payload(pid, rng), cnx)
+
+    def get(headers=None):
+        return download_all.main(func.HttpRequest(
+            method="GET", url="/api/download_all", body=b"", headers=headers or {},
+            params={"format": "csv.gz", "table": "raw"}))
+    return db, export_cache, upload, get
+
+
+def raw_ids(resp) -> list:
+    rows = csv.DictReader(io.TextIOWrapper(gzip.GzipFile(fileobj=io.BytesIO(resp.get_body()))))
+    return [int(r["id"]) for r in rows]
+
+
+def test_append_after_snapshot(api):
+    db, export_cache, upload, _ = api
+    renders = []
+
+    def render(st):
+        renders.append([r[0] for rs in export_cache.chunks(st) for r in rs])
+        return repr(renders[-1]).encode()
+
+    upload("P1")
+    with closing(db.connect()) as cnx:
+        hi1 = db.max_id(cnx)
+        export_cache.cached(cnx, hi1, render, "ids")
+        assert export_cache.cached(cnx, hi1, render, "ids") is not None
+        assert len(renders) == 1                             # 2ᵉ appel : rendu gardé
+        upload("P2")
+        hi2 = db.max_id(cnx)
+        export_cache.cached(cnx, hi2, render, "ids")
+        full = [r[0] for rs in db.iter_results(cnx, hi=hi2) for r in rs]
+    assert len(renders) == 2 and hi2 > hi1
+    assert renders[1] == full and renders[1][:len(renders[0])] == renders[0]
+    st = export_cache._state()
+    assert st["last_id"] == hi2 and st["bodies"]["ids"] == hi2
+
+
+def test_etag_changes_with_new_rows(api):
+    _, export_cache, upload, get = api
+    upload("P1")
+    r1 = get()
+    assert r1.status_code == 200
+    upload("P2")
+    r2 = get()
+    assert r2.status_code == 200 and r2.headers["ETag"] != r1.headers["ETag"]
+    assert len(raw_ids(r2)) > len(raw_ids(r1))
+    assert raw_ids(r2)[:len(raw_ids(r1))] == raw_ids(r1)
+
+
+def test_if_none_match(api):
+    _, _, upload, get = api
+    upload("P1")
+    tag = get().headers["ETag"]
+    resp = get({"If-None-Match": tag})
+    assert resp.status_code == 304 and resp.headers["ETag"] == tag
+    assert resp.get_body() == b""
+    upload("P2")
+    assert get({"If-None-Match": tag}).status_code == 200        # ETag périmé
+
+
+def test_snapshot_rows_and_stats_match_the_database(api):
+    db, export_cache, upload, _ = api
+    from shared_code import formats
+    load_test = importlib.import_module("load_test")
+    data = load_test.payload("P1", random.Random(1))
+    data[-1]["response"] = None
+    with closing(db.connect()) as cnx:
+        db.insert_results(data, cnx)
+        hi = db.max_id(cnx)
+        seen = {}
+
+        def render(st):
+            upload("P2")                            # arrive après MAX(id) = hi
+            snap = formats.Snapshot(cnx, st)
+            seen["rows"] = [r for rs in snap.chunks() for r in rs]
+            seen["stats"] = {g: snap.stats(g) for _, g in formats.STATS}
+            return b"ok"
+
+        export_cache.cached(cnx, hi, render, "check")
+        ref = [r for rs in db.iter_results(cnx, hi=hi) for r in rs]
+    rows, i = seen["rows"], db.RAW_COLS.index("created_at")
+    assert [r[:i] for r in rows] == [tuple(r[:i]) for r in ref]
+    assert rows[-1][db.RAW_COLS.index("response")] is None
+    assert [str(r[i]) for r in rows] == [r[i] for r in ref]          # datetime ↔ texte SQLite
+    for _, g in formats.STATS:
+        assert set(seen["stats"][g].get("participant", ["P1"])) == {"P1"}, g
+    words = seen["stats"]["word"]
+    assert words["n"].sum() == len(ref)
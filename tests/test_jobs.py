@@ -0,0 +1,96 @@
+# tests/test_jobs.py  –  file des rapports : bail, reprises, « dead », versions
+import sys
+from contextlib import closing
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api"))
+
+from shared_code import jobs
+
+
+@pytest.fixture
+def queue(tmp_path, monkeypatch):
+    """Fichier de file propre au test et horloge manuelle (jobs.time)."""
+    clock = SimpleNamespace(now=1_000.0)
+    monkeypatch.setattr(jobs, "time", SimpleNamespace(time=lambda: clock.now))
+    return str(tmp_path / "jobs.sqlite"), clock
+
+
+def row(path, pid):
+    with closing(jobs._cnx(path)) as cnx:
+        return cnx.execute("SELECT state, version, attempts, not_before, error "
+                           "FROM jobs WHERE participant = ?", (pid,)).fetchone()
+
+
+def test_lease_expiry_makes_job_claimable_again(queue):
+    path, clock = queue
+    jobs.enqueue("P1", [1], path)
+    assert jobs.claim(path=path) == [("P1", 1, [1])]
+    assert jobs.claim(path=path) == []                       # bail en cours
+    clock.now += jobs.LEASE - 1
+    assert jobs.claim(path=path) == []
+    clock.now += 1                                           # worker mort : bail expiré
+    assert jobs.claim(path=path) == [("P1", 1, [1])]
+    assert row(path, "P1")[:3] == ("running", 1, 2)
+
+
+def test_failure_backoff_doubles(queue):
+    path, clock = queue
+    jobs.enqueue("P1", [1], path)
+    for attempt in (1, 2, 3):
+        (pid, version, _), = jobs.claim(path=path)
+        jobs.failed(pid, version, ValueError("boom"), path)
+        state, _, attempts, not_before, error = row(path, "P1")
+        delay = jobs.BACKOFF * 2 ** (attempt - 1)
+        assert (state, attempts, error) == ("pending", attempt, "ValueError: boom")
+        assert not_before == pytest.approx(clock.now + delay)
+        clock.now += delay - 1
+        assert jobs.claim(path=path) == []                   # pas avant le délai
+        clock.now += 1
+
+
+def test_dead_after_max_attempts_then_retry(queue):
+    path, clock = queue
+    jobs.enqueue("P1", [1], path)
+    for _ in range(jobs.MAX_ATTEMPTS):
+        clock.now += jobs.BACKOFF * 2 ** jobs.MAX_ATTEMPTS
+        (pid, version, _), = jobs.claim(path=path)
+        jobs.failed(pid, version, RuntimeError("x"), path)
+    assert row(path, "P1")[0] == "dead"
+    clock.now += 1e9
+    assert jobs.claim(path=path) == [] and jobs.status(path) == {"dead": 1}
+    assert jobs.retry_dead(path) == 1
+    assert jobs.claim(path=path) == [("P1", 1, [1])]
+
+
+def test_resend_during_processing_stays_pending(queue):
+    path, clock = queue
+    jobs.enqueue("P1", [1], path)
+    (pid, version, data), = jobs.claim(path=path)
+    jobs.enqueue("P1", [1, 2], path)                         # nouvel envoi pendant le rapport
+    jobs.done(pid, version, path)                            # version 1 : sans effet
+    assert row(path, "P1")[:3] == ("pending", 2, 0)
+    (pid, version, data), = jobs.claim(path=path)
+    assert (version, data) == (2, [1, 2])
+    jobs.failed(pid, 1, ValueError("périmé"), path)          # échec d'une ancienne version
+    assert row(path, "P1")[0] == "running"
+    jobs.done(pid, version, path)
+    assert jobs.status(path) == {"done": 1}
+
+
+def test_drain_counts_and_batches(queue):
+    path, _ = queue
+    for i in range(5):
+        jobs.enqueue(f"P{i}", [i], path)
+    seen = []
+
+    def handler(pid, data):
+        seen.append(pid)
+        if pid == "P3":
+            raise ValueError("rapport")
+    assert jobs.drain(handler, batch=2, path=path) == {"ok": 4, "failed": 1}
+    assert sorted(seen) == [f"P{i}" for i in range(5)]
+    assert jobs.status(path) == {"done": 4, "pending": 1}
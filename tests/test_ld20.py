@@ -0,0 +1,68 @@
+# tests/test_ld20.py  –  nearest / within comparés à un Levenshtein naïf
+import random, sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import compute_tirage as ct
+from ld20 import NeighbourIndex, nearest, norm
+
+
+def lev(a: str, b: str) -> int:
+    """Distance de Levenshtein de référence (DP complète)."""
+    prev = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        cur = [i]
+        for j, y in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (x != y)))
+        prev = cur
+    return prev[-1]
+
+
+def synthetic(n: int, seed: int) -> list:
+    """Petit alphabet, longueurs 1 … 9 : beaucoup d'égalités et de voisins."""
+    g = random.Random(seed)
+    return ["".join(g.choice("abcde") for _ in range(g.randint(1, 9))) for _ in range(n)]
+
+
+@pytest.fixture(scope="module", params=["synthetic", "lexique"])
+def index(request):
+    if request.param == "synthetic":
+        return NeighbourIndex(synthetic(400, 0))
+    F = ct.load_sheets()
+    words = [w for sh, d in F.items() if sh != "all_freq_cols" for w in d["df"]["ortho"]]
+    return NeighbourIndex(random.Random(1).sample(words, 600))
+
+
+def brute(index, w):
+    return sorted((lev(w, f), f) for f in index.forms if f != w)
+
+
+def test_nearest_matches_brute_force(index):
+    bk = index.bk
+    for i in random.Random(2).sample(range(len(index.forms)), 60):
+        w = index.forms[i]
+        ref = brute(index, w)
+        for n in (1, 5, 20):
+            ix, dist = nearest(bk, i, n)
+            assert list(dist) == [d for d, _ in ref[:n]], (w, n)
+            assert all(lev(w, index.forms[j]) == d for j, d in zip(ix, dist)), (w, n)
+            assert i not in ix
+
+
+@pytest.mark.parametrize("d", [1, 2, 3])
+def test_within_matches_brute_force(index, d):
+    queries = random.Random(3).sample(index.forms, 60) + synthetic(20, 4)
+    for w in map(norm, queries):
+        assert index.within(w, d) == [(k, f) for k, f in brute(index, w) if k <= d], (w, d)
+
+
+def test_neighbors_out_of_lexicon(index):
+    for w in synthetic(20, 5):
+        if w in index.pos:
+            continue
+        ref = brute(index, w)
+        got = index.neighbors(w, 5)
+        assert [k for k, _ in got] == [k for k, _ in ref[:5]], w
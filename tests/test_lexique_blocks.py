@@ -0,0 +1,39 @@
+# tests/test_lexique_blocks.py  –  homographes du tableau croisé (CSV)
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import lexique_blocks
+
+
+def test_homographs_are_one_entry():
+    """Deux homographes (k = 2) sommés par le pivot : toutes les colonnes,
+    fréquences comprises, reviennent à l'échelle d'une ligne du classeur."""
+    raw = pd.DataFrame({"ortho": ["abasourdi", "bondé"],
+                        "freqlemfilms2": [0.95, 2.72], "freqfilms2": [4.0, 1.0],
+                        "nblettres": [18.0, 5.0], "nbphons": [16.0, 4.0],
+                        "old20": [5.9, 2.6], "pld20": [6.2, 2.2]})
+    df = lexique_blocks._clean(raw, typed=True)
+    a, b = df.iloc[0], df.iloc[1]
+    assert (a["ortho"], a["nblettres"], a["nbphons"]) == ("ABASOURDI", 9, 8)
+    assert a[["old20", "pld20"]].tolist() == pytest.approx([2.95, 3.1])
+    assert a[["freqlemfilms2", "freqfilms2"]].tolist() == pytest.approx([0.475, 2.0])
+    assert b[["freqlemfilms2", "freqfilms2", "nbphons", "old20"]].tolist() == \
+        pytest.approx([2.72, 1.0, 4, 2.6])                          # k = 1 : inchangé
+
+
+def test_block_stats_match_frames(tmp_path):
+    csv = tmp_path / "lex.csv"
+    csv.write_text("Étiquettes de lignes;freqlemfilms2;nblettres;nbphons;old20;pld20\n"
+                   "abaissai;4.93;8;5;1.85;1.5\n"
+                   "abasourdi;0.95;18;16;5.9;6.2\n"
+                   "bondé;2,72;10;8;2.6;2.2\n", encoding="utf-8")
+    F = lexique_blocks.build(csv)
+    for sh in ("Feuil1", "Feuil3"):
+        df, st = F[sh]["df"], F[sh]["stats"]
+        assert st["sd_freqlemfilms2"] == pytest.approx(df["freqlemfilms2"].std(ddof=0), abs=1e-6)
+    assert F["Feuil1"]["df"]["freqlemfilms2"].tolist() == pytest.approx([1.36])
@@ -0,0 +1,49 @@
+# tests/test_neighbours.py  –  contrainte « pas de voisins » sur toute la liste
+import itertools, sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import compute_tirage as ct
+from ld20 import NeighbourIndex, norm
+
+
+@pytest.fixture(scope="module")
+def lexicon():
+    F = ct.load_sheets()
+    words = [w for sh, d in F.items() if sh != "all_freq_cols" for w in d["df"]["ortho"]]
+    return F, ct.make_sampler(F, True), NeighbourIndex(words)
+
+
+def close_pairs(words, index):
+    """Paires de la liste à distance ≤ 1 (homographes compris)."""
+    ws = {norm(w) for w in words}
+    out = {tuple(sorted((a, b))) for a, b in itertools.combinations(map(norm, words), 2) if a == b}
+    return out | {tuple(sorted((w, f))) for w in ws for _, f in index.within(w, 1) if f in ws}
+
+
+def test_pool_excludes_neighbours_from_other_sheets(lexicon):
+    F, S, index = lexicon
+    sheets = list(S.sheets)
+    for src, dst in itertools.permutations(sheets, 2):
+        P = S.sheets[dst]
+        for w in S.sheets[src]["ortho"]:
+            near = {f for _, f in index.within(w, 1)}
+            for tag, idx in P["pools"].items():
+                if {norm(o) for o in P["ortho"][idx]} & near:
+                    pool = P["ortho"][S.pool(tag, dst, {w})]
+                    assert not {norm(o) for o in pool} & near, (w, dst, tag)
+                    return
+    pytest.skip("aucun voisin inter-feuilles dans le lexique")
+
+
+@pytest.mark.parametrize("solver", ["random", "backtrack"])
+def test_whole_list_has_no_neighbours(lexicon, solver):
+    F, S, index = lexicon
+    for seed in range(10):
+        ct.rng.seed(seed)
+        df = ct.build_sheet(solver, F, S)
+        assert len(df) == 80
+        assert close_pairs(df["ortho"], index) == set(), (solver, seed)
@@ -0,0 +1,49 @@
+# tests/test_reports.py  –  jeu consolidé : un renvoi ne duplique pas le participant
+import importlib, random, sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api"))
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    from shared_code import blobs, reports
+    bl = blobs.open_blobs(f"file://{tmp_path}", "results")
+    monkeypatch.setattr(reports, "open_blobs", lambda: bl)
+    load_test = importlib.import_module("load_test")
+    rng = random.Random(0)
+
+    def send(pid):
+        data = [t for t in load_test.payload(pid, rng) if t["phase"] == "test"]
+        reports.process(pid, data)
+        return data
+    return reports, bl, send, tmp_path / "results" / "dataset"
+
+
+def dataset(root) -> pd.DataFrame:
+    return pd.concat([pd.read_parquet(f) for f in sorted(root.rglob("*.parquet"))],
+                     ignore_index=True)
+
+
+def test_resend_after_compaction_replaces_rows(store):
+    reports, bl, send, root = store
+    send("P1"); send("P2")
+    (day,) = {p.name[len("date="):] for p in root.iterdir()}
+    assert reports.compact(pd.Timestamp(day).date()) == 2
+    new = send("P1")                                   # renvoi après compactage
+    df = dataset(root)
+    assert sorted(p.name for p in root.rglob("*.parquet")) == [reports.PART]
+    assert df.groupby("participant").size().to_dict() == {"P1": len(new), "P2": len(new)}
+    assert df.loc[df["participant"] == "P1", "rt_ms"].tolist() == [t["rt_ms"] for t in new]
+
+
+def test_resend_before_compaction_keeps_one_fragment(store):
+    reports, bl, send, root = store
+    send("P1")
+    new = send("P1")
+    files = list(root.rglob("*.parquet"))
+    assert len(files) == 1 and files[0].name.startswith("p_P1.")
+    assert dataset(root)["rt_ms"].tolist() == [t["rt_ms"] for t in new]
@@ -0,0 +1,93 @@
+# tests/test_solver.py  –  recherche bornée : preuves d'infaisabilité, relances
+import random, sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import solver
+from sampler import BASE, Sampler, TirageStats
+from solver import Infeasible, solve
+
+TAGS = ("LOW_OLD", "HIGH_OLD", "LOW_PLD", "HIGH_PLD")
+COLS = (*BASE, "freqfilms2")
+
+
+def sheets(n_rows: int = 40, n_sheets: int = 2, seed: int = 0) -> dict:
+    """Classeur synthétique au format de load_sheets."""
+    g, F = np.random.default_rng(seed), {}
+    for k in range(n_sheets):
+        df = pd.DataFrame({"ortho": [f"W{k}X{i:03d}" for i in range(n_rows)],
+                           "nblettres": g.integers(4, 12, n_rows).astype(float),
+                           "nbphons": g.integers(3, 10, n_rows).astype(float),
+                           "old20": g.uniform(1, 4, n_rows), "pld20": g.uniform(1, 4, n_rows),
+                           "freqfilms2": g.lognormal(1, 1, n_rows)})
+        st = {f"m_{c}": df[c].mean() for c in COLS} | {f"sd_{c}": df[c].std(ddof=0) for c in COLS}
+        F[f"Feuil{k + 1}"] = dict(df=df, stats=st, freq_cols=["freqfilms2"])
+    F["all_freq_cols"] = ["freqfilms2"]
+    return F
+
+
+def masks(df, s):
+    return {"LOW_OLD": df.old20 < s["m_old20"], "HIGH_OLD": df.old20 > s["m_old20"],
+            "LOW_PLD": df.pld20 < s["m_pld20"], "HIGH_PLD": df.pld20 > s["m_pld20"]}
+
+
+def sampler(F, *, mean_factor=0.2, sd=2.0, neighbours=None) -> Sampler:
+    return Sampler(F, masks, n_pick=3, mean_factor=mean_factor,
+                   mean_delta={"letters": 3.0, "phons": 3.0},
+                   sd_mult=dict(letters=sd, phons=sd, old20=sd, pld20=sd, freq=sd),
+                   max_try=1_000, neighbours=neighbours)
+
+
+class NoNeighbours:
+    def within(self, w, d=1):
+        return []
+
+
+def test_solution_satisfies_constraints():
+    S = sampler(sheets())
+    cells = solve(S, TAGS, random.Random(0))
+    assert set(cells) == {(sh, t) for sh in S.sheets for t in TAGS}
+    for (sh, t), rows in cells.items():
+        assert S.check(t, sh, np.asarray(rows)[None, :]).all()
+
+
+def test_bounds_prove_infeasibility():
+    S = sampler(sheets(), mean_factor=50.0)              # extrémité inatteignable
+    with pytest.raises(Infeasible) as exc:
+        solve(S, TAGS, random.Random(0))
+    assert exc.value.proved and exc.value.tag is not None
+
+
+def test_exhausted_search_proves_infeasibility():
+    S = sampler(sheets(n_rows=14), sd=1e-6)              # sommes possibles, σ ≈ 0 non
+    stats = TirageStats()
+    with pytest.raises(Infeasible) as exc:
+        solve(S, TAGS, random.Random(0), stats=stats)
+    assert exc.value.proved
+    assert sum(c["failures"] for c in stats.to_dict()["cells"].values()) == 1
+
+
+@pytest.mark.parametrize("linked", [False, True])
+def test_restart_only_for_linked_sheets(monkeypatch, linked):
+    F = sheets()
+    S = sampler(F, neighbours=NoNeighbours() if linked else None)
+    assert S.linked is linked
+    real, calls = solver.solve_sheet, []
+
+    def second_fails(S, sh, *a, **kw):                  # la 2ᵉ feuille échoue toujours
+        calls.append(sh)
+        if sh == "Feuil2":
+            raise Infeasible(sh, None, False)
+        return real(S, sh, *a, **kw)
+    monkeypatch.setattr(solver, "solve_sheet", second_fails)
+    stats = TirageStats()
+    with pytest.raises(Infeasible):
+        solve(S, TAGS, random.Random(0), stats=stats)
+    runs = solver.MAX_RESTART if linked else 1
+    assert calls == ["Feuil1", "Feuil2"] * runs
+    assert stats.restarts == runs - 1
@@ -0,0 +1,88 @@
+# tests/test_timing.py  –  Stats_Timing avec télémétrie partielle (None / NaN)
+import csv, gzip, importlib, io, math, os, random, sys, tempfile
+from pathlib import Path
+
+import pytest
+
+# les modules de l'API lisent leur configuration à l'import
+TMP = tempfile.mkdtemp(prefix="test_timing.")
+os.environ.update(SQL_CONN=f"sqlite:///{TMP}/results.db",
+                  REPORT_QUEUE=f"{TMP}/report_jobs.sqlite",
+                  EXPORT_CACHE=f"{TMP}/export_cache",
+                  STORAGE_CONN=f"file://{TMP}/blobs")
+os.environ.pop("API_SECRET", None)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "api"))
+
+NAN = float("nan")
+# (frame_ms, frames, missed_frames, max_jitter_ms, cross_ms, show_ms, hide_ms)
+TELEMETRY = [
+    (16.7, 90, 0, 1.5, 500.0, 300.0, 900.0),
+    (None, 88, 2, None, 510.0, None, 700.0),
+    (16.6, None, None, 4.0, None, 200.0, None),
+    (None, None, None, None, None, None, None),
+]
+KEYS = ("frame_ms", "frames", "missed_frames", "max_jitter_ms", "cross_ms", "show_ms", "hide_ms")
+
+
+def mean(vals):
+    vals = [v for v in vals if v is not None]
+    return sum(vals) / len(vals)
+
+
+def test_accumulate_timing_counts_each_field():
+    from shared_code import db
+    rows = [("P", *t) for t in TELEMETRY] + [("P", NAN, NAN, NAN, NAN, NAN, 250.0, NAN)]
+    df = db.timing_frame(db.accumulate_timing({}, rows)).set_index("participant")
+    r = df.loc["P"]
+    assert (r.trials, r.timed, r.bad_trials, r.missed_frames) == (5, 2, 1, 2)
+    assert r.max_jitter_ms == 4.0
+    assert r.frame_ms == pytest.approx(mean([16.7, 16.6]))
+    assert r.cross_ms == pytest.approx(mean([500.0, 510.0]))
+    assert r.show_ms == pytest.approx(mean([300.0, 200.0, 250.0]))
+    assert r.hide_ms == pytest.approx(mean([900.0, 700.0]))
+
+
+def test_accumulate_timing_without_measures():
+    from shared_code import db
+    r = db.timing_frame(db.accumulate_timing({}, [("Q", *TELEMETRY[3])])).iloc[0]
+    assert (r.trials, r.timed) == (1, 0)
+    assert all(math.isnan(r[c]) for c in ("max_jitter_ms", "frame_ms", "cross_ms"))
+
+
+@pytest.fixture(scope="module")
+def api():
+    import azure.functions as func
+    load_test = importlib.import_module("load_test")
+    trials = load_test.payload("P1", random.Random(1))
+    for i, t in enumerate(trials):
+        t.update(zip(KEYS, TELEMETRY[i % len(TELEMETRY)]))
+    resp = importlib.import_module("save_results").main(func.HttpRequest(
+        method="POST", url="/api/save_results", body=load_test.body(trials),
+        headers={"content-type": "application/json"}))
+    assert resp.status_code < 400, resp.get_body()
+    test = [t for t in trials if t["phase"] == "test"]
+
+    def get(**params):
+        return importlib.import_module("download_all").main(func.HttpRequest(
+            method="GET", url="/api/download_all", body=b"", params=params))
+    return get, test
+
+
+@pytest.mark.parametrize("params", [{}, {"participant": "P1"}])
+def test_download_stats_timing(api, params):
+    get, test = api
+    resp = get(format="csv.gz", table="Stats_Timing", **params)
+    assert resp.status_code == 200, resp.get_body()[:200]
+    rows = list(csv.DictReader(io.TextIOWrapper(gzip.GzipFile(fileobj=io.BytesIO(resp.get_body())))))
+    assert [r["participant"] for r in rows] == ["P1"]
+    r = rows[0]
+    assert int(r["trials"]) == len(test)
+    assert int(r["timed"]) == sum(t["missed_frames"] is not None for t in test)
+    assert float(r["max_jitter_ms"]) == 4.0
+    for k in ("frame_ms", "cross_ms", "show_ms", "hide_ms"):
+        assert float(r[k]) == pytest.approx(mean([t[k] for t in test])), k
+
+
+def test_download_xlsx_filtered(api):
+    get, _ = api
+    assert get(participant="P1").status_code == 200
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Banc de mesure du tirage des 80 mots.
+• Trois profils de contraintes : compute_tirage, get_stimuli, lecture_tirage
+  (celui de Lecture_app, sans les pages Streamlit)
+• Lexiques synthétiques 1× … 50× : chaque feuille de Lexique.xlsx est
+  recopiée k fois (ortho suffixé, old20 / pld20 / freq* légèrement bruités,
+  nblettres / nbphons inchangés), stats m_ / sd_ recalculées
+• Graines fixes (SeedSequence) : deux exécutions tirent les mêmes listes
+• Mesures : listes/s, latence p50 / p99, mémoire de pointe d'un tirage (tracemalloc,
+  passe séparée pour ne pas fausser les temps), taux d'échec
+Le rapport JSON sert de référence : --baseline compare à un rapport
+antérieur et signale les régressions de débit.
+
+Usage :  python tirage_bench.py [--profiles compute_tirage get_stimuli]
+                                [--scales 1 10 50] [--runs 20] [--json bench.json]
+                                [--baseline bench_old.json]
+"""
+
+from __future__ import annotations
+import argparse, importlib, json, platform, subprocess, sys, time, tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from sampler import Sampler
+
+PROFILES   = ("compute_tirage", "get_stimuli", "lecture_tirage")
+SCALES     = (1, 5, 10, 50)
+RUNS       = 20               # listes mesurées par (profil, échelle)
+SEED       = 2024
+JITTER     = 0.05             # bruit des copies, en écarts-types de la colonne
+REGRESSION = 0.20             # baisse de listes/s signalée par --baseline
+
+
+# ─── lexiques synthétiques ──────────────────────────────────────────────
+def scaled(F: Dict[str, dict], k: int, seed: int = SEED) -> Dict[str, dict]:
+    """Copie de F où chaque feuille compte k fois plus de mots."""
+    if k == 1:
+        return F
+    g, out = np.random.default_rng(seed), {"all_freq_cols": F["all_freq_cols"]}
+    for sh, d in F.items():
+        if sh == "all_freq_cols":
+            continue
+        df, parts = d["df"], [d["df"]]
+        for i in range(1, k):
+            cp = df.copy()
+            cp["ortho"] = df["ortho"].astype(str) + f"_{i}"
+            for c in ["old20", "pld20"] + d["freq_cols"]:
+                v = df[c].to_numpy(dtype=float)
+                cp[c] = np.clip(v + g.normal(0, JITTER * v.std(), len(v)), 0, None)
+            parts.append(cp)
+        big = pd.concat(parts, ignore_index=True)
+        st  = {key: (big[key[2:]].mean() if key.startswith("m_")
+                     else big[key[3:]].std(ddof=0)) for key in d["stats"]}
+        out[sh] = {"df": big, "stats": st, "freq_cols": d["freq_cols"]}
+    return out
+
+
+# ─── profils : lexique de base + fonction de tirage ─────────────────────
+@contextmanager
+def patched(mod, **attrs):
+    old = {k: getattr(mod, k) for k in attrs}
+    for k, v in attrs.items():
+        setattr(mod, k, v)
+    try:
+        yield
+    finally:
+        for k, v in old.items():
+            setattr(mod, k, v)
+
+
+def base_lexicon(mod) -> Dict[str, dict]:
+    if hasattr(mod, "load_sheets"):
+        return mod.load_sheets()
+    return {**mod.FEUILLES, "all_freq_cols": mod.all_freq_cols}      # get_stimuli
+
+
+def sampler_for(mod, F) -> Sampler:
+    if hasattr(mod, "make_sampler"):
+        return mod.make_sampler(F)
+    return Sampler(F, mod.masks,
+                   n_pick=mod.N_PER_FEUIL_TAG, mean_factor=mod.MEAN_FACTOR_OLDPLD,
+                   mean_delta=mod.MEAN_DELTA, sd_mult=mod.SD_MULTIPLIER,
+                   max_try=mod.MAX_TRY_TAG)
+
+
+@contextmanager
+def builder(mod, F, solver: str):
+    """Fonction sans argument qui tire une liste sur le lexique F."""
+    name = mod.__name__
+    if name == "get_stimuli":
+        sheets = {k: v for k, v in F.items() if k != "all_freq_cols"}
+        with patched(mod, FEUILLES=sheets, SAMPLER=sampler_for(mod, F)):
+            yield lambda: mod.build_sheet(solver)
+    else:                           # compute_tirage, lecture_tirage : pools compilés une fois
+        S = sampler_for(mod, F)
+        yield lambda: mod.build_sheet(solver, F=F, S=S)
+
+
+# ─── mesure ──────────────────────────────────────────────────────────────
+def measure(build: Callable, rng, seeds: List[int]) -> dict:
+    lat, errors = [], {}
+    for s in seeds:
+        rng.seed(s)
+        tic = time.perf_counter()
+        try:
+            build()
+        except Exception as exc:            # RuntimeError …
+            errors[type(exc).__name__] = errors.get(type(exc).__name__, 0) + 1
+        lat.append(time.perf_counter() - tic)
+    rng.seed(seeds[0])
+    tracemalloc.start()
+    try:
+        build()
+    except Exception:
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    lat_a, fails = np.array(lat), sum(errors.values())
+    return {"runs": len(seeds), "failures": fails, "failure_rate": fails / len(seeds),
+            "errors": errors,
+            "lists_per_s": round((len(seeds) - fails) / lat_a.sum(), 3),
+            "mean_s": round(float(lat_a.mean()), 4),
+            "p50_s": round(float(np.percentile(lat_a, 50)), 4),
+            "p99_s": round(float(np.percentile(lat_a, 99)), 4),
+            "peak_mib": round(peak / 2**20, 2)}
+
+
+def bench(profiles=PROFILES, scales=SCALES, runs: int = RUNS, seed: int = SEED,
+          solver: str = "random", log=print) -> dict:
+    rows = []
+    for name in profiles:
+        mod  = importlib.import_module(name)
+        base = base_lexicon(mod)
+        # mêmes graines pour chaque échelle : seule la taille du lexique varie
+        seeds = [int(x) for x in np.random.SeedSequence([seed, PROFILES.index(name)])
+                 .generate_state(runs, np.uint64)]
+        for k in scales:
+            F = scaled(base, k, seed)
+            n = sum(len(d["df"]) for sh, d in F.items() if sh != "all_freq_cols")
+            tic = time.perf_counter()
+            with builder(mod, F, solver) as build:
+                setup = time.perf_counter() - tic
+                r = {"profile": name, "scale": k, "words": n, "solver": solver,
+                     "setup_s": round(setup, 4)} | measure(build, mod.rng, seeds)
+            rows.append(r)
+            log(f"{name:15s} ×{k:<3d} {n:7d} mots  {r['lists_per_s']:8.2f} listes/s  "
+                f"p50 {r['p50_s']:.3f} s  p99 {r['p99_s']:.3f} s  "
+                f"{r['peak_mib']:7.1f} Mio  échecs {r['failure_rate']:.0%}")
+    return {"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "revision": _revision(),
+            "python": platform.python_version(), "numpy": np.__version__,
+            "pandas": pd.__version__, "seed": seed, "runs": runs, "results": rows}
+
+
+def _revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(rep: dict, old: dict, threshold: float = REGRESSION) -> List[str]:
+    """Cellules (profil, échelle, solveur) dont le débit a baissé de plus
+    de `threshold` par rapport au rapport `old`."""
+    ref = {(r["profile"], r["scale"], r.get("solver", "random")): r for r in old["results"]}
+    out = []
+    for r in rep["results"]:
+        o = ref.get((r["profile"], r["scale"], r["solver"]))
+        if o and o["lists_per_s"] and r["lists_per_s"] < (1 - threshold) * o["lists_per_s"]:
+            out.append(f"{r['profile']} ×{r['scale']} : {o['lists_per_s']} → "
+                       f"{r['lists_per_s']} listes/s ({old.get('revision')} → {rep['revision']})")
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Banc de mesure du tirage.")
+    ap.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=PROFILES)
+    ap.add_argument("--scales", nargs="+", type=int, default=list(SCALES))
+    ap.add_argument("--runs", type=int, default=RUNS)
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--solver", default="random", choices=("random", "backtrack"))
+    ap.add_argument("--json", help="écrit le rapport dans ce fichier")
+    ap.add_argument("--baseline", help="rapport antérieur à comparer")
+    a = ap.parse_args()
+    rep = bench(a.profiles, a.scales, a.runs, a.seed, a.solver)
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as fh:
+            json.dump(rep, fh, ensure_ascii=False, indent=1)
+    if a.baseline:
+        with open(a.baseline, encoding="utf-8") as fh:
+            worse = compare(rep, json.load(fh))
+        for w in worse:
+            print(f"⚠️  régression : {w}")
+        sys.exit(1 if worse else 0)
+
+
+if __name__ == "__main__":
+    main()
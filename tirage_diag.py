@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Diagnostic de faisabilité des contraintes de tirage.
+Pour chaque cellule Feuil × tag : taille du pool (masks), taux
+d'acceptation Monte-Carlo de chaque contrainte élémentaire et de leur
+conjonction, essais attendus avant succès, probabilité d'échec d'un
+pick_five en MAX_TRY_TAG essais.  Les cellules où cette probabilité
+dépasse P_FAIL_MAX sont signalées.
+
+Usage :  python tirage_diag.py [--profile get_stimuli] [--samples 50000] [--json diag.json]
+"""
+
+from __future__ import annotations
+import argparse, importlib, json, math
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from sampler import Sampler
+
+SAMPLES    = 20_000       # sous-ensembles tirés par cellule
+N_REF      = 200          # dont recontrôlés en pandas (reference_ok)
+P_FAIL_MAX = 0.01         # échec toléré d'un pick_five (MAX_TRY_TAG essais)
+
+
+def profile(mod) -> Tuple[dict, Sampler]:
+    """Lexique et pools compilés d'un script de tirage."""
+    if hasattr(mod, "make_sampler"):
+        F = mod.load_sheets()
+        return F, mod.make_sampler(F)
+    return mod.FEUILLES, mod.SAMPLER                     # get_stimuli
+
+
+def reference_ok(sub: pd.DataFrame, st: dict, fq, mod) -> bool:
+    """Prédicat de référence (pandas, ddof=0) des moyennes lettres / phons
+    et des écarts-types, d'après les constantes du script ; contrôle
+    croisé de Sampler.check_parts."""
+    sd_mult = getattr(mod, "SD_MULTIPLIER", None) or mod.SD_MULT
+    key = {"nblettres": "letters", "nbphons": "phons", "old20": "old20", "pld20": "pld20"}
+    return (all(abs(sub[c].mean() - st[f"m_{c}"]) <= mod.MEAN_DELTA[k] * st[f"sd_{c}"]
+                for c, k in (("nblettres", "letters"), ("nbphons", "phons"))) and
+            all(sub[c].std(ddof=0) <= st[f"sd_{c}"] * sd_mult[key.get(c, "freq")]
+                for c in [*key, *fq]))
+
+
+def diagnose(mod, samples: int = SAMPLES, seed: int = 0) -> pd.DataFrame:
+    F, S = profile(mod)
+    g    = np.random.default_rng(seed)
+    rows = []
+    for sh in S.sheets:
+        df, st, fq = F[sh]["df"], F[sh]["stats"], F[sh]["freq_cols"]
+        for tag in mod.TAGS:
+            pool = S.pool(tag, sh, set())
+            d = {"feuille": sh, "tag": tag, "pool": len(pool)}
+            if len(pool) < S.n:
+                rows.append(d | {"p_all": 0.0, "p_fail": 1.0, "flag": True})
+                continue
+            cand  = pool[S.subsets(g, len(pool), S.n, samples)]
+            parts = S.check_parts(tag, sh, cand)
+            d |= {f"p_{k}": float(v.mean()) for k, v in parts.items()}
+            ok = np.logical_and.reduce(list(parts.values()))
+            p  = float(ok.mean())
+
+            # contrôle croisé avec le prédicat de référence en pandas
+            lp_sd = parts["mean_nblettres"] & parts["mean_nbphons"]
+            lp_sd &= np.logical_and.reduce([v for k, v in parts.items() if k.startswith("sd_")])
+            ref = [reference_ok(s, st, fq, mod)
+                   for s in (df.iloc[r] for r in cand[:N_REF])]
+            d["ref_agree"] = float(np.mean(np.array(ref) == lp_sd[:N_REF]))
+
+            p_fail = (1 - p) ** mod.MAX_TRY_TAG
+            d |= {"p_all": p,
+                  "tries_expected": (1 / p) if p else math.inf,
+                  "tries_99": (math.log(0.01) / math.log1p(-p)) if 0 < p < 1 else
+                              (1.0 if p == 1 else math.inf),
+                  "p_fail": p_fail,
+                  "flag": p_fail > P_FAIL_MAX}
+            rows.append(d)
+    return pd.DataFrame(rows)
+
+
+def summary(diag: pd.DataFrame) -> dict:
+    """Réussite d'une tentative complète de build_sheet (cellules supposées
+    indépendantes, sans l'effet des mots déjà pris)."""
+    p_list = float(np.prod(1 - diag["p_fail"]))
+    return {"p_list_attempt": p_list,
+            "restarts_expected": (1 / p_list) if p_list else math.inf,
+            "flagged": diag.loc[diag["flag"], ["feuille", "tag"]].values.tolist()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Diagnostic des contraintes de tirage.")
+    ap.add_argument("--profile", default="compute_tirage",
+                    help="module de tirage (compute_tirage, get_stimuli)")
+    ap.add_argument("--samples", type=int, default=SAMPLES)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", help="écrit le diagnostic complet dans ce fichier")
+    a = ap.parse_args()
+    mod  = importlib.import_module(a.profile)
+    diag = diagnose(mod, a.samples, a.seed)
+    summ = summary(diag)
+
+    p_cols = [c for c in diag.columns if c.startswith("p_")]
+    show = ["feuille", "tag", "pool"] + sorted(p_cols, key=lambda c: not c.startswith("p_ext")) \
+         + ["tries_expected", "tries_99", "ref_agree", "flag"]
+    with pd.option_context("display.width", 200, "display.max_columns", None,
+                           "display.float_format", "{:.4g}".format):
+        print(diag[[c for c in show if c in diag]].to_string(index=False))
+    print(f"\nMAX_TRY_TAG = {mod.MAX_TRY_TAG} ; réussite d'une tentative complète "
+          f"≈ {summ['p_list_attempt']:.3g} ; relances attendues ≈ "
+          f"{summ['restarts_expected']:.3g}")
+    for sh, tag in summ["flagged"]:
+        print(f"⚠️  {sh} × {tag} : MAX_TRY_TAG insuffisant (p_fail > {P_FAIL_MAX})")
+    if a.json:
+        with open(a.json, "w", encoding="utf-8") as fh:
+            json.dump({"profile": a.profile, "samples": a.samples, "summary": summ,
+                       "cells": json.loads(diag.to_json(orient="records"))},
+                      fh, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Réserve de tirages pré-générés (SQLite).
+• Un producteur remplit la réserve de listes de 80 mots validées
+• claim() réserve atomiquement la plus ancienne liste libre (lecture indexée)
+• Un thread de fond recharge la réserve sous le seuil bas
+Les listes sont rangées par profil : nom du script + empreinte de ses
+constantes de tirage et de Lexique.xlsx ; changer une contrainte ou le
+classeur rend donc les anciennes listes invisibles.
+
+Usage CLI :  python tirage_pool.py --profile compute_tirage --count 200
+"""
+
+from __future__ import annotations
+import argparse, hashlib, importlib, io, json, logging, os, sqlite3, threading, time
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Callable, Mapping
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+import lexicon_cache
+
+DB         = Path(os.getenv("TIRAGE_POOL", Path(__file__).with_name("tirage_pool.sqlite")))
+LOW_WATER  = 20              # recharge déclenchée sous ce nombre de listes libres
+HIGH_WATER = 100             # … jusqu'à ce nombre
+YIELD      = 0.05            # s, attente de la recharge pendant un tirage au premier plan
+N_WORDS    = 80
+CONSTS     = ("TAGS", "N_PER_FEUIL_TAG", "MEAN_FACTOR_OLDPLD", "MEAN_DELTA",
+              "SD_MULTIPLIER", "SD_MULT", "SOLVER", "NO_NEIGHBOURS", "SOURCE")
+log        = logging.getLogger("tirage_pool")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS lists(
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    profile    TEXT    NOT NULL,
+    payload    BLOB    NOT NULL,          -- Parquet (anciennes listes : JSON records)
+    created_at REAL    NOT NULL,
+    claimed_at REAL,
+    claimed_by TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_lists_free
+    ON lists(profile, id) WHERE claimed_at IS NULL;
+"""
+
+
+def profile_key(name: str, ns: Mapping, xlsx: Path | None = None) -> str:
+    """Nom + empreinte des constantes de tirage (et du classeur)."""
+    consts = {k: ns[k] for k in CONSTS if k in ns}
+    h = hashlib.sha1(json.dumps(consts, sort_keys=True, default=str).encode())
+    if xlsx is not None and xlsx.exists():
+        h.update(lexicon_cache.digest(xlsx).encode())
+    return f"{name}-{h.hexdigest()[:10]}"
+
+
+def validate(df: pd.DataFrame) -> None:
+    """Lève ValueError si la liste n'a pas la forme attendue."""
+    if not isinstance(df, pd.DataFrame):
+        raise TypeError(f"liste attendue (DataFrame), reçu {type(df).__name__}")
+    if len(df) != N_WORDS:
+        raise ValueError(f"{len(df)} mots au lieu de {N_WORDS}")
+    if df.groupby(["source", "group"]).size().nunique() != 1:
+        raise ValueError("cellules feuille × groupe de tailles inégales")
+    if df.drop(columns=["ortho", "source", "group"]).isna().any().any():
+        raise ValueError("valeurs manquantes")
+
+
+def _pack(df: pd.DataFrame) -> bytes:
+    """Liste → Parquet : types des colonnes conservés (int, float, texte)."""
+    buf = io.BytesIO()
+    df.to_parquet(buf, index=False)
+    return buf.getvalue()
+
+
+def _unpack(payload) -> pd.DataFrame:
+    if isinstance(payload, str):              # liste d'avant Parquet
+        return pd.DataFrame.from_records(json.loads(payload))
+    table = pq.read_table(io.BytesIO(payload))
+    df = table.to_pandas()
+    for col in table.schema.pandas_metadata["columns"]:   # texte object ≠ str
+        if col["numpy_type"] == "object" and col["name"] in df:
+            df[col["name"]] = df[col["name"]].astype(object)
+    return df
+
+
+class TiragePool:
+    def __init__(self, profile: str, path: Path = DB):
+        self.profile, self.path = profile, Path(path)
+        self._wake   = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._busy   = 0                      # tirages au premier plan en cours
+        self._lock   = threading.Lock()
+        with closing(self._cnx()) as cnx:
+            cnx.executescript(SCHEMA)
+
+    def _cnx(self) -> sqlite3.Connection:
+        cnx = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        cnx.execute("PRAGMA journal_mode=WAL")
+        return cnx
+
+    # ─── lecture / écriture ─────────────────────────────────────────────
+    def count(self) -> int:
+        with closing(self._cnx()) as cnx:
+            return cnx.execute("SELECT COUNT(*) FROM lists "
+                               "WHERE profile=? AND claimed_at IS NULL",
+                               (self.profile,)).fetchone()[0]
+
+    def put(self, df: pd.DataFrame) -> None:
+        validate(df)
+        with closing(self._cnx()) as cnx:
+            cnx.execute("INSERT INTO lists(profile, payload, created_at) VALUES (?,?,?)",
+                        (self.profile, _pack(df), time.time()))
+
+    def claim(self, who: str = "") -> pd.DataFrame | None:
+        """Réserve la plus ancienne liste libre ; None si la réserve est vide."""
+        with closing(self._cnx()) as cnx:
+            cnx.execute("BEGIN IMMEDIATE")
+            row = cnx.execute("SELECT id, payload FROM lists "
+                              "WHERE profile=? AND claimed_at IS NULL "
+                              "ORDER BY id LIMIT 1", (self.profile,)).fetchone()
+            if row:
+                cnx.execute("UPDATE lists SET claimed_at=?, claimed_by=? WHERE id=?",
+                            (time.time(), who, row[0]))
+            cnx.execute("COMMIT")
+        self._wake.set()                      # le thread vérifie le seuil bas
+        return _unpack(row[1]) if row else None
+
+    @contextmanager
+    def foreground(self):
+        """Tirage d'un participant (claim, ou tirage direct si la réserve
+        est vide) : la recharge de fond ne commence pas de liste pendant ce
+        temps et ne lui dispute pas le GIL."""
+        with self._lock:
+            self._busy += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._busy -= 1
+
+    # ─── production ─────────────────────────────────────────────────────
+    def fill(self, build: Callable[[], pd.DataFrame], target: int = HIGH_WATER,
+             yield_: bool = False) -> int:
+        """Produit des listes jusqu'à `target` listes libres ; renvoie le
+        nombre de listes ajoutées.  yield_ : attend avant chaque liste
+        qu'aucun tirage au premier plan ne tourne (foreground)."""
+        added = 0
+        while self.count() < target:
+            while yield_ and self._busy:
+                time.sleep(YIELD)
+            self.put(build())
+            added += 1
+        return added
+
+    def start_refill(self, build: Callable[[], pd.DataFrame],
+                     low: int = LOW_WATER, high: int = HIGH_WATER,
+                     period: float = 60.0) -> threading.Thread:
+        """Thread démon : recharge jusqu'à `high` dès que la réserve passe
+        sous `low` (vérifié à chaque claim() et au moins toutes les `period` s),
+        une liste à la fois, en cédant la place aux tirages foreground().
+        `build` doit lever en cas d'échec (pas de st.error / st.stop hors du
+        thread de script) ; l'erreur est journalisée, la recharge retentée."""
+        if self._thread and self._thread.is_alive():
+            return self._thread
+
+        def run():
+            while True:
+                try:
+                    if self.count() < low:
+                        self.fill(build, high, yield_=True)
+                except Exception:             # tirage raté : on réessaiera
+                    log.exception("recharge de la réserve %s", self.profile)
+                    time.sleep(period)
+                self._wake.wait(period)
+                self._wake.clear()
+
+        self._thread = threading.Thread(target=run, name="tirage-refill", daemon=True)
+        self._thread.start()
+        return self._thread
+
+
+# ─── CLI : remplissage hors ligne ────────────────────────────────────────
+def main():
+    ap = argparse.ArgumentParser(description="Remplit la réserve de tirages.")
+    ap.add_argument("--profile", default="compute_tirage",
+                    help="module fournissant build_sheet() (compute_tirage, get_stimuli, "
+                         "lecture_tirage)")
+    ap.add_argument("--count", type=int, default=HIGH_WATER,
+                    help="nombre de listes libres visé")
+    a = ap.parse_args()
+    mod  = importlib.import_module(a.profile)
+    src  = getattr(mod, "CSV" if getattr(mod, "SOURCE", "") == "csv" else "XLSX", None)
+    pool = TiragePool(profile_key(a.profile, vars(mod), src))
+    tic  = time.perf_counter()
+    added = pool.fill(mod.build_sheet, a.count)
+    print(f"{added} listes ajoutées ({pool.count()} libres, "
+          f"profil {pool.profile}) en {time.perf_counter()-tic:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
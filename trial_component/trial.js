@@ -0,0 +1,186 @@
+/* trial_component/trial.js  –  essais masqués (composant Streamlit déclaré)
+ * ---------------------------------------------------
+ * Arguments (message streamlit:render) : words, start_f, step_f, cycle_f,
+ * cross_f (en images), frame_ms (période nominale), touch, fullscreen,
+ * end_msg, height, batch, acked.
+ * Chaque essai renvoie {word, rt_ms, response} + la télémétrie de
+ * frameClock (images sautées, gigue, durées effectives croix/mot/masque).
+ * Valeur renvoyée : {from, results} = essais non encore acquittés
+ * (acked : essais déjà reçus côté Python), envoyés tous les `batch` essais
+ * et à la fin ; renvoyés tant que acked n'a pas avancé.  batch=0 : rien
+ * n'est renvoyé (entraînement).
+ */
+
+/* ---------- protocole des composants (sans bibliothèque) ---------- */
+const Streamlit={
+  send(type,data){window.parent.postMessage({isStreamlitMessage:true,type,...data},"*");},
+  ready(){this.send("streamlit:componentReady",{apiVersion:1});},
+  setFrameHeight(h){this.send("streamlit:setFrameHeight",{height:h});},
+  setComponentValue(v){this.send("streamlit:setComponentValue",{value:v,dataType:"json"});}
+};
+
+/* ---------- outils ---------- */
+function gid(x){return document.getElementById(x);}
+function resizeAll(){
+  let w=innerWidth,h=innerHeight,base=Math.min(w,h);
+  gid('scr').style.fontSize=Math.max(Math.round(base*0.08),26)+'px';
+  gid('ans').style.fontSize=Math.max(Math.round(base*0.054),20)+'px';
+  gid('ans').style.width=Math.min(w*0.7,650)+'px';
+}
+addEventListener('resize',resizeAll);
+addEventListener('orientationchange',resizeAll);
+addEventListener('load',()=>{document.body.focus();setTimeout(resizeAll,80);});
+
+const IS_TOUCH = ('ontouchstart' in window) || (navigator.maxTouchPoints>0);
+let A=null,trial=0,results=[],acked=0,scr=gid('scr'),ans=gid('ans'),vk=gid('vk');
+let finishAnswer=()=>{};
+
+/* ---------- horloge d’images : horodatages rAF d’un essai ---------- */
+/* tick(ts) à chaque image, mark(phase, ts) à chaque changement d’écran
+   (croix, mot, masque) ; summary(fin) → colonnes de télémétrie */
+function frameClock(frameMs){
+  const dts=[],marks=[];let last=null;
+  const r2=x=>Math.round(x*100)/100;
+  return {
+    tick(ts){if(ts===last)return;if(last!==null)dts.push(ts-last);last=ts;},
+    mark(phase,ts){marks.push([phase,ts]);},
+    summary(end){
+      const dur={cross:0,word:0,mask:0},sorted=[...dts].sort((a,b)=>a-b);
+      marks.forEach(([ph,t],i)=>{dur[ph]+=(i+1<marks.length?marks[i+1][1]:end)-t;});
+      return {
+        frame_ms     :r2(sorted.length?sorted[sorted.length>>1]:frameMs),
+        frames       :dts.length,
+        missed_frames:dts.reduce((s,d)=>s+Math.max(0,Math.round(d/frameMs)-1),0),
+        max_jitter_ms:r2(dts.reduce((m,d)=>Math.max(m,Math.abs(d-frameMs)),0)),
+        cross_ms:r2(dur.cross),show_ms:r2(dur.word),hide_ms:r2(dur.mask)};
+    }};
+}
+
+/* ---------- renvoi des résultats par lots ---------- */
+function flush(){
+  const pending=results.length-acked;
+  if(!A.batch||pending<=0)return;
+  if(pending>=A.batch||trial>=A.words.length)
+    Streamlit.setComponentValue({from:acked,results:results.slice(acked)});
+}
+
+/* ---------- clavier virtuel ---------- */
+function buildVK(){
+  if(vk.firstChild)return;
+  const rows=[
+    "QWERTZUIOP",
+    "ASDFGHJKL",
+    "YXCVBNM",
+    "ÇÉÈÊÏÔ←↵"
+  ];
+  rows.forEach(r=>{
+    const div=document.createElement('div');div.className='krow';
+    [...r].forEach(ch=>{
+      const b=document.createElement('button');b.className='key';b.textContent=ch;
+      div.appendChild(b);
+    });
+    vk.appendChild(div);
+  });
+  vk.addEventListener('pointerdown',e=>{
+    const t=e.target;if(!t.classList.contains('key'))return;
+    e.preventDefault();
+    const k=t.textContent;
+    if(k==="←"){ans.value=ans.value.slice(0,-1);}
+    else if(k==="↵"){finishAnswer();}
+    else{ans.value+=k;}
+  },{passive:false});
+}
+
+/* ---------- déroulement d’un essai ---------- */
+function nextTrial(){
+  if(trial>=A.words.length){fin();return;}
+  const w=A.words[trial],mask="#".repeat(w.length);let active=true;
+  const clk=frameClock(A.frame_ms);
+  scr.textContent="+";let frame=0;
+  const crossLoop=ts=>{if(!active)return;
+    clk.tick(ts);if(frame===0)clk.mark("cross",ts);
+    if(++frame>=A.cross_f)startStimulus();else requestAnimationFrame(crossLoop);}
+  requestAnimationFrame(crossLoop);
+
+  function startStimulus(){
+    let showF=A.start_f,phase="show",f2=0;
+    const t0=performance.now();
+    function stimLoop(ts){
+      if(!active)return;
+      clk.tick(ts);
+      if(phase==="show"){
+        if(f2===0){scr.textContent=w;clk.mark("word",ts);}
+        if(++f2>=showF){phase="mask";f2=0;scr.textContent=mask;clk.mark("mask",ts);}
+      }else{
+        const hideF=Math.max(0,A.cycle_f-showF);
+        if(++f2>=hideF){showF=Math.min(showF+A.step_f,A.cycle_f);phase="show";f2=0;}
+      }
+      requestAnimationFrame(stimLoop);
+    }
+    requestAnimationFrame(stimLoop);
+
+    function onTrig(e){
+      if(e instanceof KeyboardEvent && e.code!=="Space")return;
+      if(e instanceof PointerEvent)e.preventDefault();
+      if(!active)return;
+      active=false;
+      removeEventListener('keydown',onTrig);
+      if(A.touch)removeEventListener('pointerdown',onTrig);
+      const end=performance.now();
+      promptAnswer(Math.round(end-t0),clk.summary(end));
+    }
+    addEventListener('keydown',onTrig);
+    if(A.touch)addEventListener('pointerdown',onTrig,{passive:false});
+  }
+
+  function promptAnswer(rt,timing){
+    scr.textContent="";
+    ans.value="";ans.style.display="block";
+    if(IS_TOUCH){ans.readOnly=true;buildVK();vk.style.display="flex";}
+    else{ans.readOnly=false;setTimeout(()=>ans.focus(),40);}
+    resizeAll();
+
+    function keyEnter(ev){if(ev.key==="Enter"){ev.preventDefault();finishAnswer();}}
+    addEventListener('keydown',keyEnter);
+
+    finishAnswer=function(){
+      removeEventListener('keydown',keyEnter);
+      ans.style.display="none";vk.style.display="none";
+      results.push({word:w,rt_ms:rt,response:ans.value.trim(),...timing});
+      trial++;flush();nextTrial();
+    };
+  }
+}
+/* ------------- fin d’expérience ------------- */
+function fin(){
+  scr.style.fontSize="min(6vw,48px)";
+  scr.textContent=A.end_msg;
+  resizeAll();
+}
+
+/* ---------- démarrage ---------- */
+function start(){
+  if(!A.fullscreen){nextTrial();return;}
+  scr.textContent="Touchez l’écran ou appuyez sur ESPACE pour commencer";
+  function first(e){
+    if((e instanceof KeyboardEvent && e.code==="Space")||
+       (e instanceof PointerEvent)){
+      removeEventListener("keydown",first);
+      removeEventListener("pointerdown",first);
+      document.documentElement.requestFullscreen?.();
+      nextTrial();
+    }}
+  addEventListener("keydown",first);
+  addEventListener("pointerdown",first,{passive:false});
+}
+
+/* une seule expérience par montage : les rendus suivants (reruns)
+   n'apportent que le nouvel acquittement */
+addEventListener("message",e=>{
+  if(e.data.type!=="streamlit:render")return;
+  const args=e.data.args;
+  acked=Math.max(acked,args.acked||0);
+  if(A===null){A=args;Streamlit.setFrameHeight(A.height);start();}
+  else flush();
+});
+Streamlit.ready();
@@ -365,6 +365,29 @@ function page_TestReady(){
   };
 }
 
+/********************************************************************
+ * 5-bis. HORLOGE D’IMAGES — horodatages rAF d’un essai
+ ********************************************************************/
+/* tick(ts) à chaque image, mark(phase, ts) à chaque changement d’écran
+   (croix, mot, masque) ; summary(fin) → colonnes de télémétrie */
+function frameClock(frameMs){
+  const dts=[],marks=[];let last=null;
+  const r2=x=>Math.round(x*100)/100;
+  return {
+    tick(ts){if(ts===last)return;if(last!==null)dts.push(ts-last);last=ts;},
+    mark(phase,ts){marks.push([phase,ts]);},
+    summary(end){
+      const dur={cross:0,word:0,mask:0},sorted=[...dts].sort((a,b)=>a-b);
+      marks.forEach(([ph,t],i)=>{dur[ph]+=(i+1<marks.length?marks[i+1][1]:end)-t;});
+      return {
+        frame_ms     :r2(sorted.length?sorted[sorted.length>>1]:frameMs),
+        frames       :dts.length,
+        missed_frames:dts.reduce((s,d)=>s+Math.max(0,Math.round(d/frameMs)-1),0),
+        max_jitter_ms:r2(dts.reduce((m,d)=>Math.max(m,Math.abs(d-frameMs)),0)),
+        cross_ms:r2(dur.cross),show_ms:r2(dur.word),hide_ms:r2(dur.mask)};
+    }};
+}
+
 /********************************************************************
  * 6. RUN BLOCK  (présentation / réponses)
  ********************************************************************/
@@ -377,26 +400,29 @@ function runBlock(wordArr, phaseLabel, onFinish){
     const w   = obj.word || obj;
     const mask="#".repeat(w.length);
     scr.textContent="+"; let frame=0, active=true;
+    const clk=frameClock(FRAME_MS);
 
-    const crossLoop=()=>{ if(!active) return;
-      if(++frame>=CROSS_F) startStimulus(); else requestAnimationFrame(crossLoop); };
+    const crossLoop=ts=>{ if(!active) return;
+      clk.tick(ts); if(frame===0) clk.mark("cross",ts);
+      if(++frame>=CROSS_F) startStimulus(ts); else requestAnimationFrame(crossLoop); };
     requestAnimationFrame(crossLoop);
 
-    function startStimulus(){
+    function startStimulus(ts0){
       let showF=START_F, subF=0, phase="show";
       const t0=performance.now();
 
-      (function anim(){
+      (function anim(ts){
         if(!active) return;
+        clk.tick(ts);
         if(phase==="show"){
-          if(subF===0) scr.textContent=w;
-          if(++subF>=showF){phase="mask"; subF=0; scr.textContent=mask;}
+          if(subF===0){scr.textContent=w; clk.mark("word",ts);}
+          if(++subF>=showF){phase="mask"; subF=0; scr.textContent=mask; clk.mark("mask",ts);}
         }else{
           const hideF=Math.max(0,CYCLE_F-showF);
           if(++subF>=hideF){showF=Math.min(showF+STEP_F,CYCLE_F); phase="show"; subF=0;}
         }
         requestAnimationFrame(anim);
-      })();
+      })(ts0);
 
       function trigger(e){
         if(e instanceof KeyboardEvent && e.code!=="Space") return;
@@ -406,7 +432,8 @@ function runBlock(wordArr, phaseLabel, onFinish){
         removeEventListener('keydown',trigger);
         if(CFG.TOUCH_TRIGGER) removeEventListener('pointerdown',trigger);
 
-        promptAnswer(Math.round(performance.now()-t0), obj);   // correction
+        const end=performance.now();
+        promptAnswer(Math.round(end-t0), obj, clk.summary(end));   // correction
       }
       addEventListener('keydown',trigger);
       if(CFG.TOUCH_TRIGGER) addEventListener('pointerdown',trigger,{passive:false});
@@ -414,7 +441,7 @@ function runBlock(wordArr, phaseLabel, onFinish){
   };
 
   /* ----------- PROMPT ANSWER (corrigé + clavier virtuel) ----------- */
-  function promptAnswer(rt, obj){
+  function promptAnswer(rt, obj, timing){
     scr.textContent   = "";
     ans.value         = "";
     ans.style.display = 'block';
@@ -460,6 +487,7 @@ function runBlock(wordArr, phaseLabel, onFinish){
 
       results.push({
         ...obj,
+        ...timing,                           // télémétrie d’affichage
         rt_ms      : rt,
         response   : ans.value.trim(),
         phase      : phaseLabel,